@@ -1,3 +1,253 @@
-from django.contrib import admin
+"""
+博客应用的管理后台
 
-# Register your models here.
+文章表和评论表很大，列表页按以下方式控制查询：
+- list_select_related 一次查询取出作者、分类和所属文章，评论的 __str__ 不再每行查询两次；
+- EstimatedCountPaginator 不对整张表 COUNT(*)，show_full_result_count=False 不再额外计数；
+- 列表页不读取正文和内容HTML等大字段；
+- 搜索和过滤条件都能走索引，作者和文章使用自动完成输入框，不生成包含全部用户的下拉框。
+  默认的搜索把每个词拆开，对每个字段做不区分大小写的 LIKE 再用 OR 连接，大表上只能全表扫描；
+  这里改为标题前缀的范围条件（区分大小写）和用户名精确匹配。
+
+批量发布、下线和删除使用 blog.bulk 按块执行集合操作，替换默认的逐行删除操作。
+"""
+
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.contrib.admin.views.main import ChangeList
+from django.contrib.auth.models import User
+from django.db.models import Q
+from django.template.response import TemplateResponse
+from django.utils.text import Truncator
+
+from . import bulk
+from .models import AuthorPostStat, Category, Comment, Post, Tag
+from .pagination import EstimatedCountPaginator
+
+
+class DeferredChangeList(ChangeList):
+    """
+    列表页查询时延迟加载 ModelAdmin.list_defer 中的字段
+    """
+
+    def get_queryset(self, request, exclude_parameters=None):
+        queryset = super().get_queryset(request, exclude_parameters)
+        return queryset.defer(*self.model_admin.list_defer)
+
+
+class AuthorListFilter(admin.SimpleListFilter):
+    """
+    按作者过滤
+
+    默认的外键过滤器会列出全部用户，这里只列出文章最多的作者（读取 AuthorPostStat 统计表）
+    和当前选中的作者；其他作者可以在URL中指定 ?author=用户ID。
+    """
+    title = '作者'
+    parameter_name = 'author'
+
+    # 列出的作者数
+    size = 20
+
+    def lookups(self, request, model_admin):
+        stats = AuthorPostStat.objects.select_related('author').order_by('-post_count')[:self.size]
+        choices = [(str(stat.author_id), stat.author.username) for stat in stats]
+        value = self.value()
+        if value and value.isdigit() and value not in dict(choices):
+            stat = AuthorPostStat.objects.select_related('author').filter(author_id=value).first()
+            if stat is not None:
+                choices.insert(0, (value, stat.author.username))
+        return choices
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if value and value.isdigit():
+            return queryset.filter(author_id=value)
+        return queryset
+
+
+class CommenterListFilter(admin.SimpleListFilter):
+    """
+    按评论者过滤
+
+    评论者没有统计表，列出评论最多的用户需要对整张评论表分组计数，这里只列出URL中 ?author=用户ID
+    选中的评论者；查找评论者使用按用户名搜索。
+    """
+    title = '评论者'
+    parameter_name = 'author'
+
+    def lookups(self, request, model_admin):
+        value = self.value()
+        if not (value and value.isdigit()):
+            return []
+        return [(str(pk), username) for pk, username in User.objects.filter(pk=value).values_list('pk', 'username')]
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if value and value.isdigit():
+            return queryset.filter(author_id=value)
+        return queryset
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    大表列表页的公共配置
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
+    # 列表页延迟加载的字段
+    list_defer = ()
+
+    def get_changelist(self, request, **kwargs):
+        return DeferredChangeList
+
+    def confirm_bulk_delete(self, request, queryset, delete):
+        """
+        批量删除操作：第一次提交显示确认页面（只显示行数，不像默认的删除操作那样列出所有关联对象），
+        确认后调用 delete 按块删除
+
+        参数:
+            request (HttpRequest): HTTP请求对象
+            queryset (QuerySet): 选中的行
+            delete (callable): blog.bulk 中的删除函数，返回删除的行数
+
+        返回:
+            HttpResponse: 确认页面，确认删除后返回None回到列表页
+        """
+        opts = self.model._meta
+        if request.POST.get('post') == 'yes':
+            deleted = delete(queryset)
+            self.message_user(request, f'删除了 {deleted} 个{opts.verbose_name}。', messages.SUCCESS)
+            return None
+        # 确认时原样提交选中的主键和 select_across：changelist_view 只在提交了选中的主键时才执行操作，
+        # 选择了全部页面时由 select_across 决定删除整个查询集
+        context = {
+            **self.admin_site.each_context(request),
+            'title': f'批量删除{opts.verbose_name}',
+            'opts': opts,
+            'count': queryset.count(),
+            'select_across': request.POST.get('select_across') == '1',
+            'selected': request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+        }
+        return TemplateResponse(request, 'admin/blog/bulk_delete_confirmation.html', context)
+
+
+def _author_matches(term):
+    """
+    返回用户名等于搜索词的用户主键子查询
+    """
+    return User.objects.filter(username=term).values('pk')
+
+
+@admin.register(Post)
+class PostAdmin(LargeTableAdmin):
+    """
+    文章管理
+    """
+    list_display = ('title', 'author', 'category', 'published', 'views', 'created_at')
+    list_select_related = ('author', 'category')
+    list_filter = ('published', AuthorListFilter)
+    # 实际的搜索条件见 get_search_results
+    search_fields = ('title', 'author__username')
+    search_help_text = '按标题开头（区分大小写）或作者用户名搜索'
+    autocomplete_fields = ('author', 'category')
+    ordering = ('-created_at', '-id')
+    list_defer = ('content', 'content_html', 'excerpt')
+    actions = ('publish_selected', 'unpublish_selected', 'delete_selected')
+
+    @admin.action(description='发布所选的文章', permissions=['change'])
+    def publish_selected(self, request, queryset):
+        """
+        批量发布
+        """
+        changed = bulk.set_published(queryset, True)
+        self.message_user(request, f'发布了 {changed} 篇文章。', messages.SUCCESS)
+
+    @admin.action(description='下线所选的文章', permissions=['change'])
+    def unpublish_selected(self, request, queryset):
+        """
+        批量下线
+        """
+        changed = bulk.set_published(queryset, False)
+        self.message_user(request, f'下线了 {changed} 篇文章。', messages.SUCCESS)
+
+    @admin.action(description='删除所选的文章', permissions=['delete'])
+    def delete_selected(self, request, queryset):
+        """
+        批量删除，替换默认的删除操作
+        """
+        return self.confirm_bulk_delete(request, queryset, bulk.delete_posts)
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        标题前缀用范围条件匹配，可以走 blog_post_title_idx；作者按用户名精确匹配，走作者索引
+        评论的文章自动完成输入框也使用这里的搜索
+        """
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        title_prefix = Q(title__gte=term, title__lt=term + '\U0010ffff')
+        return queryset.filter(title_prefix | Q(author__in=_author_matches(term))), False
+
+
+@admin.register(Comment)
+class CommentAdmin(LargeTableAdmin):
+    """
+    评论管理
+    """
+    list_display = ('summary', 'author', 'post', 'created_at')
+    list_select_related = ('author', 'post')
+    list_filter = (CommenterListFilter,)
+    # 实际的搜索条件见 get_search_results
+    search_fields = ('author__username',)
+    search_help_text = '按评论者用户名搜索'
+    autocomplete_fields = ('post', 'author')
+    ordering = ('-created_at', '-id')
+    list_defer = ('post__content', 'post__content_html', 'post__excerpt')
+    actions = ('delete_selected',)
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        按用户名精确匹配评论者，走评论的作者索引
+        """
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        return queryset.filter(author__in=_author_matches(term)), False
+
+    @admin.action(description='删除所选的评论', permissions=['delete'])
+    def delete_selected(self, request, queryset):
+        """
+        批量删除，替换默认的删除操作
+        """
+        return self.confirm_bulk_delete(request, queryset, bulk.delete_comments)
+
+    @admin.display(description='评论内容')
+    def summary(self, comment):
+        """
+        截取评论内容的开头
+        """
+        return Truncator(comment.content).chars(50)
+
+
+@admin.register(Category)
+class CategoryAdmin(admin.ModelAdmin):
+    """
+    分类管理
+    """
+    list_display = ('name', 'slug')
+    search_fields = ('name',)
+    prepopulated_fields = {'slug': ('name',)}
+
+
+@admin.register(Tag)
+class TagAdmin(admin.ModelAdmin):
+    """
+    标签管理
+    """
+    list_display = ('name', 'slug', 'post_count')
+    search_fields = ('name',)
+    readonly_fields = ('post_count',)
+    ordering = ('-post_count',)
@@ -0,0 +1,246 @@
+"""
+只读JSON接口（v1）
+
+直接使用 values() 取出字典行并用 orjson（未安装时退回标准库json）序列化，
+不实例化模型对象。每个请求的查询次数固定，与分页大小无关。
+"""
+
+import hashlib
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, HttpResponseNotModified
+from django.views.decorators.http import require_safe
+
+from myblog.routers import replica_read
+from .models import Comment, Post
+from .pagination import paginate_keyset
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 可选依赖
+    orjson = None
+
+# 每页默认行数和最大行数
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# 批量查询一次最多允许的ID个数
+MAX_BATCH_IDS = 100
+
+# 主键（BigAutoField）的最大值，超出范围的ID传给数据库会引发溢出错误
+MAX_ID = 2 ** 63 - 1
+
+# 接口字段到ORM字段的映射，id 始终返回
+POST_FIELDS = {
+    'id': 'id',
+    'title': 'title',
+    'excerpt': 'excerpt',
+    'content': 'content',
+    'author': 'author__username',
+    'created_at': 'created_at',
+    'updated_at': 'updated_at',
+}
+COMMENT_FIELDS = {
+    'id': 'id',
+    'post': 'post_id',
+    'author': 'author__username',
+    'content': 'content',
+    'created_at': 'created_at',
+}
+
+# 未指定 fields 时文章列表返回的默认字段，不包含正文
+DEFAULT_POST_LIST_FIELDS = ['id', 'title', 'excerpt', 'author', 'created_at', 'updated_at']
+
+
+def _dumps(data):
+    """
+    把数据序列化为JSON字节串
+    """
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _json_response(request, data, status=200):
+    """
+    生成带ETag的JSON响应，客户端缓存仍然有效时返回304
+
+    参数:
+        request (HttpRequest): HTTP请求对象
+        data (dict): 响应数据
+        status (int): HTTP状态码
+
+    返回:
+        HttpResponse: JSON响应或304响应
+    """
+    body = _dumps(data)
+    if status != 200:
+        return HttpResponse(body, status=status, content_type='application/json')
+    etag = '"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest()
+    if_none_match = [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]
+    if etag in if_none_match or '*' in if_none_match:
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    return response
+
+
+def _error(request, message, status=400):
+    """
+    生成JSON格式的错误响应
+    """
+    return _json_response(request, {'error': message}, status=status)
+
+
+def _select_fields(request, allowed, default):
+    """
+    解析 ?fields= 稀疏字段参数
+
+    参数:
+        request (HttpRequest): HTTP请求对象
+        allowed (dict): 接口字段到ORM字段的映射
+        default (list): 未指定时返回的接口字段
+
+    返回:
+        list: 接口字段列表（始终包含 id）
+
+    异常:
+        ValueError: 包含未知字段时抛出
+    """
+    raw = request.GET.get('fields')
+    fields = [name.strip() for name in raw.split(',') if name.strip()] if raw else list(default)
+    unknown = [name for name in fields if name not in allowed]
+    if unknown:
+        raise ValueError(f'未知字段: {", ".join(unknown)}')
+    if 'id' not in fields:
+        fields.insert(0, 'id')
+    return fields
+
+
+def _page_size(request):
+    """
+    解析 ?limit= 分页大小参数，限制在 1 到 MAX_PAGE_SIZE 之间
+    """
+    try:
+        size = int(request.GET.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise ValueError('limit 必须是整数') from None
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def _rows(queryset, fields, allowed):
+    """
+    构造只取所需列的 values() 查询，created_at 始终取出用于生成游标
+    """
+    columns = {allowed[name] for name in fields} | {'id', 'created_at'}
+    return queryset.values(*columns)
+
+
+def _shape(rows, fields, allowed):
+    """
+    把 values() 行按接口字段名重新组织
+    """
+    return [{name: row[allowed[name]] for name in fields} for row in rows]
+
+
+@require_safe
+@replica_read
+def post_list(request):
+    """
+    文章列表接口
+
+    查询参数:
+        fields: 逗号分隔的返回字段
+        ids: 逗号分隔的文章ID，批量获取指定文章（不分页）
+        cursor: 上一页返回的游标
+        limit: 每页行数
+
+    参数:
+        request (HttpRequest): HTTP请求对象
+
+    返回:
+        HttpResponse: {"data": [...], "next": 游标或null}
+    """
+    try:
+        fields = _select_fields(request, POST_FIELDS, DEFAULT_POST_LIST_FIELDS)
+        size = _page_size(request)
+    except ValueError as exc:
+        return _error(request, str(exc))
+    posts = Post.objects.filter(published=True)
+
+    if 'ids' in request.GET:
+        try:
+            ids = [int(value) for value in request.GET['ids'].split(',') if value.strip()]
+        except ValueError:
+            return _error(request, 'ids 必须是逗号分隔的整数')
+        if any(not 0 < pk <= MAX_ID for pk in ids):
+            return _error(request, 'ids 超出有效范围')
+        if len(ids) > MAX_BATCH_IDS:
+            return _error(request, f'一次最多获取 {MAX_BATCH_IDS} 篇文章')
+        # 一次查询取出全部文章，并按请求中的顺序返回
+        rows = {row['id']: row for row in _rows(posts.filter(pk__in=ids), fields, POST_FIELDS)}
+        ordered = [rows[pk] for pk in dict.fromkeys(ids) if pk in rows]
+        return _json_response(request, {'data': _shape(ordered, fields, POST_FIELDS), 'next': None})
+
+    try:
+        rows, next_cursor = paginate_keyset(
+            _rows(posts, fields, POST_FIELDS), request.GET.get('cursor'), size,
+        )
+    except ValueError as exc:
+        return _error(request, str(exc))
+    return _json_response(request, {'data': _shape(rows, fields, POST_FIELDS), 'next': next_cursor})
+
+
+@require_safe
+@replica_read
+def post_detail(request, pk):
+    """
+    单篇文章接口，默认返回全部字段
+
+    参数:
+        request (HttpRequest): HTTP请求对象
+        pk (int): 文章的主键ID
+
+    返回:
+        HttpResponse: {"data": {...}}，文章不存在或未发布时返回404
+    """
+    try:
+        fields = _select_fields(request, POST_FIELDS, list(POST_FIELDS))
+    except ValueError as exc:
+        return _error(request, str(exc))
+    row = _rows(Post.objects.filter(pk=pk, published=True), fields, POST_FIELDS).first()
+    if row is None:
+        return _error(request, '文章不存在', status=404)
+    return _json_response(request, {'data': _shape([row], fields, POST_FIELDS)[0]})
+
+
+@require_safe
+@replica_read
+def comment_list(request, pk):
+    """
+    文章评论列表接口，按评论时间正序分页
+
+    参数:
+        request (HttpRequest): HTTP请求对象
+        pk (int): 文章的主键ID
+
+    返回:
+        HttpResponse: {"data": [...], "next": 游标或null}，文章不存在或未发布时返回404
+    """
+    if pk > MAX_ID:
+        return _error(request, '文章不存在', status=404)
+    try:
+        fields = _select_fields(request, COMMENT_FIELDS, list(COMMENT_FIELDS))
+        size = _page_size(request)
+        rows, next_cursor = paginate_keyset(
+            _rows(Comment.objects.filter(post_id=pk, post__published=True), fields, COMMENT_FIELDS),
+            request.GET.get('cursor'), size, descending=False,
+        )
+    except ValueError as exc:
+        return _error(request, str(exc))
+    # 只有没有评论时才需要额外确认文章是否存在
+    if not rows and not Post.objects.filter(pk=pk, published=True).exists():
+        return _error(request, '文章不存在', status=404)
+    return _json_response(request, {'data': _shape(rows, fields, COMMENT_FIELDS), 'next': next_cursor})
@@ -4,3 +4,14 @@ from django.apps import AppConfig
 class BlogConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'blog'
+
+    def ready(self):
+        # 导入信号和任务模块，注册信号处理、后台任务和发件箱消费函数
+        from . import signals, tasks  # noqa: F401
+
+    def start_worker(self):
+        """
+        工作进程初始化时由 myblog.warmup.start_worker 调用：启动阅读计数的后台写入线程
+        """
+        from . import hits
+        hits.start_flusher()
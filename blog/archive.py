@@ -0,0 +1,135 @@
+"""
+作者和日期归档的统计维护
+
+AuthorPostStat 和 MonthlyPostStat 在文章保存或删除时只重新统计受影响的作者和月份，
+统计结果用一条 INSERT ... ON CONFLICT 写回。归档侧边栏和条件请求只读取这两张小表。
+"""
+
+from datetime import datetime
+
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .models import AuthorPostStat, MonthlyPostStat, Post
+
+
+def month_range(year, month):
+    """
+    计算某个月在当前时区下的起止时间
+
+    参数:
+        year (int): 年份
+        month (int): 月份
+
+    返回:
+        tuple: (月初, 下月初)，均为带时区的时间
+
+    异常:
+        ValueError: 年月不合法时抛出
+    """
+    tz = timezone.get_current_timezone()
+    start = datetime(year, month, 1, tzinfo=tz)
+    end = datetime(year + month // 12, month % 12 + 1, 1, tzinfo=tz)
+    return start, end
+
+
+def year_range(year):
+    """
+    计算某一年在当前时区下的起止时间
+
+    参数:
+        year (int): 年份
+
+    返回:
+        tuple: (年初, 下一年年初)
+    """
+    tz = timezone.get_current_timezone()
+    return datetime(year, 1, 1, tzinfo=tz), datetime(year + 1, 1, 1, tzinfo=tz)
+
+
+def refresh_author_stats(author_ids):
+    """
+    重新统计指定作者的已发布文章数
+
+    参数:
+        author_ids (iterable): 作者主键ID
+    """
+    author_ids = set(author_ids)
+    if not author_ids:
+        return
+    totals = {
+        row['author_id']: row
+        for row in Post.objects.filter(author_id__in=author_ids, published=True)
+        .values('author_id').annotate(total=Count('id'), latest=Max('created_at'))
+    }
+    stats = [
+        AuthorPostStat(
+            author_id=author_id,
+            post_count=totals.get(author_id, {}).get('total', 0),
+            last_post_at=totals.get(author_id, {}).get('latest'),
+        )
+        for author_id in author_ids
+    ]
+    AuthorPostStat.objects.bulk_create(
+        stats, update_conflicts=True, unique_fields=['author'],
+        update_fields=['post_count', 'last_post_at', 'updated_at'],
+    )
+
+
+def refresh_month_stats(months):
+    """
+    重新统计指定月份的已发布文章数
+    每个月一次按 created_at 范围的计数查询，可以走 (published, created_at) 索引
+
+    参数:
+        months (iterable): (year, month) 元组
+    """
+    stats = []
+    for year, month in set(months):
+        start, end = month_range(year, month)
+        total = Post.objects.filter(published=True, created_at__gte=start, created_at__lt=end).count()
+        stats.append(MonthlyPostStat(year=year, month=month, post_count=total))
+    if stats:
+        MonthlyPostStat.objects.bulk_create(
+            stats, update_conflicts=True, unique_fields=['year', 'month'],
+            update_fields=['post_count', 'updated_at'],
+        )
+
+
+def refresh_for_posts(rows):
+    """
+    重新统计一批文章所属作者和月份的统计
+
+    参数:
+        rows (iterable): (author_id, created_at) 元组，已删除的文章也可以传入
+    """
+    rows = list(rows)
+    refresh_author_stats(author_id for author_id, _ in rows)
+    months = []
+    for _, created_at in rows:
+        local = timezone.localtime(created_at)
+        months.append((local.year, local.month))
+    refresh_month_stats(months)
+
+
+def refresh_posts(post_ids):
+    """
+    按文章主键重新统计，用于批量更新发布状态之后
+
+    参数:
+        post_ids (list): 文章主键ID列表
+    """
+    refresh_for_posts(Post.objects.filter(pk__in=post_ids).values_list('author_id', 'created_at'))
+
+
+def get_archive_months():
+    """
+    读取有已发布文章的月份列表，用于归档侧边栏
+
+    返回:
+        list: 每项包含 year、month、post_count
+    """
+    return list(
+        MonthlyPostStat.objects.filter(post_count__gt=0)
+        .order_by('-year', '-month').values('year', 'month', 'post_count')
+    )
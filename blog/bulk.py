@@ -0,0 +1,231 @@
+"""
+文章、评论和用户的批量操作
+
+逐行 save()/delete() 批量处理成千上万行时，每行都要读写一次数据库并触发一次信号，
+删除还要经过 ORM 的 Collector 把所有级联的关联行读进内存。这里按主键分块，每块在一个事务中：
+- 用一条 UPDATE 或 DELETE 修改整块行，删除前先按块删除（或置空）引用它们的关联行；
+- 重新统计受影响的作者、月份和标签；
+- 用一条 INSERT 为块内的文章写入 post.changed 事件（删除评论时为涉及的每篇文章写入 comment.changed 事件），
+  与逐行 save()/delete() 一样由发件箱消费函数完成其余的派生数据（如热门排行）。
+派生数据每块刷新一次，而不是每行一次。直接删除行只在 _raw_delete 中进行，见其说明。
+
+管理后台的批量操作和 bulk_moderate 命令都调用这里的函数。
+"""
+
+from django.db import models, router, transaction
+from django.utils import timezone
+
+from . import archive, outbox, taxonomy
+from .models import Comment, Post, PostTag
+from .tasks import cancel_publish_jobs
+
+# 默认每块处理的行数
+CHUNK_SIZE = 1000
+
+
+def _chunks(queryset, chunk_size):
+    """
+    按主键升序分块读取查询集中的主键
+
+    每块从上一块的最大主键之后继续，处理过程中行被修改或删除也不会漏行或重复。
+
+    参数:
+        queryset (QuerySet): 查询集
+        chunk_size (int): 每块的行数
+
+    返回:
+        generator: 依次产生主键列表
+    """
+    queryset = queryset.order_by('pk')
+    last = None
+    while True:
+        page = queryset if last is None else queryset.filter(pk__gt=last)
+        pks = list(page.values_list('pk', flat=True)[:chunk_size])
+        if not pks:
+            return
+        yield pks
+        last = pks[-1]
+
+
+def _primary(queryset):
+    """
+    让查询集读取主库，避免按副本上过期的数据分块
+    """
+    return queryset.using(router.db_for_write(queryset.model))
+
+
+def _reverse_relations(model):
+    """
+    返回引用该模型的外键和一对一关系，与 Collector 收集级联关系的方式相同
+    """
+    return [
+        field for field in model._meta.get_fields(include_hidden=True)
+        if field.auto_created and not field.concrete and (field.one_to_one or field.one_to_many)
+    ]
+
+
+def _delete_children(model, pks, chunk_size):
+    """
+    按关系的 on_delete 设置处理引用这些行的关联行：CASCADE 按块删除，SET_NULL 用一条 UPDATE 置空
+
+    参数:
+        model (type): 模型类
+        pks (list): 即将删除的行的主键
+        chunk_size (int): 级联删除时每块的行数
+
+    异常:
+        ValueError: 关系使用了 PROTECT 等需要逐行检查的删除方式时抛出
+    """
+    for relation in _reverse_relations(model):
+        name = relation.field.name
+        related = relation.related_model._base_manager.using(router.db_for_write(relation.related_model))
+        related = related.filter(**{f'{name}__in': pks})
+        if relation.on_delete is models.CASCADE:
+            _delete_rows(related, chunk_size)
+        elif relation.on_delete is models.SET_NULL:
+            related.update(**{name: None})
+        elif relation.on_delete is not models.DO_NOTHING:
+            raise ValueError(f'{relation.related_model.__name__}.{name} 的删除方式不支持批量删除')
+
+
+def _raw_delete(model, pks, using, chunk_size):
+    """
+    删除一块行：先按 on_delete 处理引用它们的关联行，再用一条 DELETE 删除这些行
+
+    本模块只在这里绕过 Collector 直接删除行，不发送 pre_delete/post_delete 信号，
+    信号原本完成的工作由调用方按块完成。各模型由 _delete_children 手工处理的关系：
+    - Post：评论、草稿（PostDraft）、历史版本（PostRevision）和标签关联（PostTag）级联删除；
+      作者和月份统计、标签计数由 delete_posts 重新统计，并写入 post.changed 事件；
+    - Comment：没有引用评论的关系；delete_comments 写入 comment.changed 事件，随文章级联删除的评论不写事件；
+    - User：管理日志（LogEntry）、用户组和权限关联、作者统计（AuthorPostStat）级联删除，
+      历史版本的 author 和附件的 uploaded_by 置空；文章和评论由 delete_users 先行删除。
+    新增的关系如果使用 PROTECT 等需要逐行检查的删除方式，_delete_children 会抛出 ValueError。
+
+    参数:
+        model (type): 模型类
+        pks (list): 要删除的行的主键
+        using (str): 数据库别名
+        chunk_size (int): 级联删除关联行时每块的行数
+
+    返回:
+        int: 删除的行数（不含关联行）
+    """
+    _delete_children(model, pks, chunk_size)
+    return model._base_manager.using(using).filter(pk__in=pks)._raw_delete(using)
+
+
+def _delete_rows(queryset, chunk_size):
+    """
+    按块删除查询集中的行和级联的关联行，不发送删除信号
+
+    参数:
+        queryset (QuerySet): 要删除的行
+        chunk_size (int): 每块的行数
+
+    返回:
+        int: 删除的行数（不含关联行）
+    """
+    deleted = 0
+    for pks in _chunks(queryset, chunk_size):
+        deleted += _raw_delete(queryset.model, pks, queryset.db, chunk_size)
+    return deleted
+
+
+def set_published(queryset, published, chunk_size=CHUNK_SIZE):
+    """
+    批量发布或下线文章，发布状态已经符合的文章不做修改，每块为修改的文章写入 post.changed 事件
+    同时删除这些文章等待中的定时发布任务；下线时还会取消所选草稿的定时发布，它们不会再被任务自动发布
+
+    参数:
+        queryset (QuerySet): 文章查询集
+        published (bool): 目标发布状态
+        chunk_size (int): 每块的行数
+
+    返回:
+        int: 修改的文章数
+    """
+    queryset = _primary(queryset)
+    changed = 0
+    for pks in _chunks(queryset.exclude(published=published), chunk_size):
+        with transaction.atomic(using=queryset.db):
+            changed += Post.objects.filter(pk__in=pks).update(published=published, updated_at=timezone.now())
+            archive.refresh_posts(pks)
+            taxonomy.refresh_post_tags(pks)
+            cancel_publish_jobs(pks)
+            outbox.record_many('post.changed', pks)
+    if not published:
+        scheduled = queryset.filter(published=False, publish_at__gt=timezone.now())
+        for pks in _chunks(scheduled, chunk_size):
+            with transaction.atomic(using=queryset.db):
+                Post.objects.filter(pk__in=pks).update(publish_at=None)
+                cancel_publish_jobs(pks)
+                outbox.record_many('post.changed', pks)
+    return changed
+
+
+def delete_posts(queryset, chunk_size=CHUNK_SIZE):
+    """
+    批量删除文章及其评论、标签关联、草稿和历史版本，每块为删除的文章写入 post.changed 事件
+
+    参数:
+        queryset (QuerySet): 文章查询集
+        chunk_size (int): 每块的行数
+
+    返回:
+        int: 删除的文章数
+    """
+    queryset = _primary(queryset)
+    deleted = 0
+    for pks in _chunks(queryset, chunk_size):
+        with transaction.atomic(using=queryset.db):
+            # 删除前记下受影响的作者、月份和标签
+            rows = list(Post.objects.filter(pk__in=pks).values_list('author_id', 'created_at'))
+            tag_ids = set(PostTag.objects.filter(post_id__in=pks).values_list('tag_id', flat=True))
+            deleted += _raw_delete(Post, pks, queryset.db, chunk_size)
+            archive.refresh_for_posts(rows)
+            taxonomy.recount_tags(tag_ids)
+            cancel_publish_jobs(pks)
+            outbox.record_many('post.changed', pks)
+    return deleted
+
+
+def delete_comments(queryset, chunk_size=CHUNK_SIZE):
+    """
+    批量删除评论，每块为涉及的每篇文章写入一个 comment.changed 事件
+
+    参数:
+        queryset (QuerySet): 评论查询集
+        chunk_size (int): 每块的行数
+
+    返回:
+        int: 删除的评论数
+    """
+    queryset = _primary(queryset)
+    deleted = 0
+    for pks in _chunks(queryset, chunk_size):
+        with transaction.atomic(using=queryset.db):
+            post_ids = set(Comment.objects.filter(pk__in=pks).values_list('post_id', flat=True))
+            deleted += _raw_delete(Comment, pks, queryset.db, chunk_size)
+            outbox.record_many('comment.changed', post_ids)
+    return deleted
+
+
+def delete_users(queryset, chunk_size=CHUNK_SIZE):
+    """
+    批量删除用户，先按块删除他们的文章和评论（同时刷新派生数据），再删除用户和其余关联行
+
+    参数:
+        queryset (QuerySet): 用户查询集
+        chunk_size (int): 每块的行数
+
+    返回:
+        dict: 删除的用户数、文章数和评论数
+    """
+    queryset = _primary(queryset)
+    result = {'users': 0, 'posts': 0, 'comments': 0}
+    for pks in _chunks(queryset, chunk_size):
+        result['posts'] += delete_posts(Post.objects.filter(author_id__in=pks), chunk_size)
+        result['comments'] += delete_comments(Comment.objects.filter(author_id__in=pks), chunk_size)
+        with transaction.atomic(using=queryset.db):
+            result['users'] += _delete_rows(queryset.model._base_manager.filter(pk__in=pks), chunk_size)
+    return result
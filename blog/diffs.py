@@ -0,0 +1,82 @@
+"""
+文本增量操作
+
+增量由若干个替换操作组成，每个操作是 [start, end, text]，表示把基准文本中
+[start, end) 区间替换为 text。操作的位置都以基准文本为准，按 start 升序排列且互不重叠。
+"""
+
+from difflib import SequenceMatcher
+
+
+def apply_ops(text, ops):
+    """
+    把增量操作应用到基准文本上
+
+    参数:
+        text (str): 基准文本
+        ops (list): 替换操作列表
+
+    返回:
+        str: 应用增量后的新文本
+
+    异常:
+        ValueError: 操作格式不正确、越界或互相重叠时抛出
+    """
+    parts = []
+    position = 0
+    for op in ops:
+        if not isinstance(op, (list, tuple)) or len(op) != 3:
+            raise ValueError('增量操作必须是 [start, end, text] 格式')
+        start, end, replacement = op
+        if not isinstance(start, int) or not isinstance(end, int) or not isinstance(replacement, str):
+            raise ValueError('增量操作的类型不正确')
+        if start < position or end < start or end > len(text):
+            raise ValueError('增量操作越界或互相重叠')
+        parts.append(text[position:start])
+        parts.append(replacement)
+        position = end
+    parts.append(text[position:])
+    return ''.join(parts)
+
+
+def compute_ops(old, new):
+    """
+    计算把 old 变为 new 所需的增量操作
+
+    先去掉公共前缀和后缀，一次连续编辑只需线性时间；剩余部分按行比较，
+    避免对长文本做逐字符的二次复杂度比较。
+
+    参数:
+        old (str): 基准文本
+        new (str): 目标文本
+
+    返回:
+        list: 替换操作列表
+    """
+    limit = min(len(old), len(new))
+    start = 0
+    while start < limit and old[start] == new[start]:
+        start += 1
+    old_end, new_end = len(old), len(new)
+    while old_end > start and new_end > start and old[old_end - 1] == new[new_end - 1]:
+        old_end -= 1
+        new_end -= 1
+    if start == old_end and start == new_end:
+        return []
+
+    old_lines = old[start:old_end].splitlines(keepends=True)
+    new_lines = new[start:new_end].splitlines(keepends=True)
+    # 每行在原文本中的起始偏移量，用于把行号换算成字符位置
+    old_offsets = [start]
+    for line in old_lines:
+        old_offsets.append(old_offsets[-1] + len(line))
+    new_offsets = [start]
+    for line in new_lines:
+        new_offsets.append(new_offsets[-1] + len(line))
+
+    matcher = SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    return [
+        [old_offsets[i1], old_offsets[i2], new[new_offsets[j1]:new_offsets[j2]]]
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes()
+        if tag != 'equal'
+    ]
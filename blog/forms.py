@@ -1,16 +1,28 @@
 from django import forms
+from django.utils import timezone
 from .models import Post
+from .taxonomy import parse_tags
 
 class PostForm(forms.ModelForm):
     """
     文章表单，用于创建和编辑文章的表单类
     继承自Django的ModelForm，与Post模型关联
     """
+    # 标签以逗号分隔的文本输入，保存时由视图写入关联表
+    tags = forms.CharField(
+        required=False,
+        label='标签',
+        widget=forms.TextInput(attrs={
+            'class': 'form-control',
+            'placeholder': '多个标签用逗号分隔'
+        })
+    )
+    
     class Meta:
         # 指定关联的模型
         model = Post
         # 指定表单包含的字段
-        fields = ['title', 'content', 'published']
+        fields = ['title', 'content', 'category', 'published', 'publish_at']
         # 为表单字段定义HTML属性和CSS类
         widgets = {
             # 标题字段使用TextInput控件，并添加Bootstrap样式
@@ -24,12 +36,29 @@ class PostForm(forms.ModelForm):
                 'rows': 10,
                 'placeholder': '请输入文章内容'
             }),
+            # 分类字段使用下拉选择控件，并添加Bootstrap样式
+            'category': forms.Select(attrs={
+                'class': 'form-select'
+            }),
             # 发布状态字段使用CheckboxInput控件，并添加Bootstrap样式
             'published': forms.CheckboxInput(attrs={
                 'class': 'form-check-input'
-            })
+            }),
+            # 定时发布时间使用浏览器原生的日期时间选择控件
+            'publish_at': forms.DateTimeInput(attrs={
+                'class': 'form-control',
+                'type': 'datetime-local'
+            }, format='%Y-%m-%dT%H:%M')
         }
     
+    def __init__(self, *args, **kwargs):
+        """
+        初始化表单，编辑已有文章时用当前标签填充标签输入框
+        """
+        super().__init__(*args, **kwargs)
+        if self.instance.pk and 'tags' not in self.initial:
+            self.initial['tags'] = ', '.join(self.instance.tags.values_list('name', flat=True))
+    
     def clean_title(self):
         """
         自定义标题字段验证方法
@@ -69,4 +98,35 @@ class PostForm(forms.ModelForm):
         if len(content) < 10:
             raise forms.ValidationError("文章内容至少需要10个字符")
         # 返回验证通过的内容
-        return content
\ No newline at end of file
+        return content
+    
+    def clean_tags(self):
+        """
+        自定义标签字段验证方法
+        把逗号分隔的文本解析为标签名称列表
+        
+        返回:
+            list: 去重后的标签名称列表
+            
+        异常:
+            forms.ValidationError: 当标签数量超过限制时抛出验证错误
+        """
+        names = parse_tags(self.cleaned_data['tags'])
+        # 每篇文章最多10个标签
+        if len(names) > 10:
+            raise forms.ValidationError("每篇文章最多10个标签")
+        return names
+    
+    def clean(self):
+        """
+        表单整体验证方法
+        设置了未来的定时发布时间时，文章先保存为草稿，到时间后由后台任务发布
+        
+        返回:
+            dict: 验证通过的表单数据
+        """
+        cleaned_data = super().clean()
+        publish_at = cleaned_data.get('publish_at')
+        if publish_at and publish_at > timezone.now():
+            cleaned_data['published'] = False
+        return cleaned_data
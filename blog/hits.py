@@ -0,0 +1,212 @@
+"""
+文章阅读计数与热门排行
+
+每次阅读只在进程内存中累加，由工作进程的后台线程每 VIEW_COUNT_FLUSH_SECONDS 秒
+（或累积次数达到 VIEW_COUNT_FLUSH_THRESHOLD 时被唤醒）把累积的计数用一条 UPDATE ... CASE 语句
+批量写入数据库，避免每次阅读都争抢SQLite写锁，请求本身不写数据库。
+写入后重新计算带时间衰减的热门排行并放入缓存；没有新的阅读时，后台线程也会在缓存过期之前刷新排行，
+页面读取排行时不需要查询数据库，也不会在请求中重新计算。
+
+后台线程由 start_flusher() 在工作进程初始化时启动（见 BlogConfig.start_worker）。
+没有后台线程的进程（管理命令、测试）退回到由当次请求写入和计算。
+进程退出时会写入剩余的计数；进程异常终止最多丢失一个写入周期内的计数。
+"""
+
+import atexit
+import os
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from myblog import metrics
+from myblog.routers import use_primary
+from utils.logger import logger
+from .models import Post
+
+# 热门排行的缓存键
+POPULAR_CACHE_KEY = 'blog:popular-posts'
+
+# 参与排行计算的候选文章数（按总阅读次数选取）
+POPULAR_CANDIDATES = 200
+
+# 尚未写入数据库的阅读次数
+_pending = Counter()
+_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+# 后台线程所在的进程号和上次刷新排行的时间
+_state = {'pid': None, 'refreshed_at': float('-inf')}
+# 累积次数达到上限或排行缓存缺失时唤醒后台线程
+_wake = threading.Event()
+
+
+def start_flusher():
+    """
+    在当前进程中启动写入阅读次数、刷新热门排行的后台线程
+    fork 出的子进程不会继承父进程的线程，进程号变化时重新启动
+
+    返回:
+        bool: 是否启动了新线程
+    """
+    pid = os.getpid()
+    with _lock:
+        if _state['pid'] == pid:
+            return False
+        _state['pid'] = pid
+    # 启动后立即执行一次，尽快把排行放入缓存
+    _wake.set()
+    threading.Thread(target=_flush_loop, name='hits-flush', daemon=True).start()
+    return True
+
+
+def _flusher_running():
+    """
+    判断当前进程的后台线程是否已经启动
+    """
+    return _state['pid'] == os.getpid()
+
+
+def _flush_loop():
+    """
+    后台线程：定期写入阅读次数并刷新排行，被唤醒时立即执行
+    """
+    pid = os.getpid()
+    while _state['pid'] == pid:
+        _wake.wait(settings.VIEW_COUNT_FLUSH_SECONDS)
+        _wake.clear()
+        tick()
+
+
+def tick():
+    """
+    后台线程的一个周期：写入累积的阅读次数；没有可写入的计数时，
+    距上次刷新超过缓存有效期的一半就重新计算排行，保证读取时缓存总是有效
+    异常只记录日志，不让后台线程退出
+    """
+    try:
+        if not flush() and time.monotonic() - _state['refreshed_at'] >= settings.POPULAR_POSTS_TIMEOUT / 2:
+            with use_primary():
+                refresh_popular()
+    except Exception as exc:
+        logger.warning(f'阅读次数后台写入失败: {exc!r}')
+
+
+def record_hit(post_id):
+    """
+    记录一次文章阅读
+    后台线程运行时只在累积次数达到上限时唤醒它；没有后台线程时由当次请求批量写入数据库
+
+    参数:
+        post_id (int): 文章主键ID
+    """
+    global _last_flush
+    with _lock:
+        _pending[post_id] += 1
+        full = sum(_pending.values()) >= settings.VIEW_COUNT_FLUSH_THRESHOLD
+        if _flusher_running():
+            if full:
+                _wake.set()
+            return
+        if not full and time.monotonic() - _last_flush < settings.VIEW_COUNT_FLUSH_SECONDS:
+            return
+        batch = dict(_pending)
+        _pending.clear()
+        _last_flush = time.monotonic()
+    # 写数据库在锁外进行，不阻塞其他请求的计数
+    flush(batch)
+
+
+def flush(batch=None):
+    """
+    把累积的阅读次数写入数据库并刷新热门排行
+
+    参数:
+        batch (dict): 文章ID到阅读次数的映射，为空时写入当前全部累积计数
+
+    返回:
+        int: 更新的文章数
+    """
+    if batch is None:
+        with _lock:
+            batch = dict(_pending)
+            _pending.clear()
+    if not batch:
+        return 0
+    # 写入发生在只读视图中时，排行也要从主库读取刚写入的计数
+    with use_primary():
+        return _write(batch)
+
+
+def _write(batch):
+    """
+    执行批量写入，失败时把计数放回内存
+    """
+    try:
+        # 一条语句为所有文章加上各自的增量
+        updated = Post.objects.filter(pk__in=batch).update(views=F('views') + Case(
+            *[When(pk=pk, then=Value(count)) for pk, count in batch.items()],
+            default=Value(0), output_field=IntegerField(),
+        ))
+    except Exception as exc:
+        # 写入失败时把计数放回，等待下一次写入
+        with _lock:
+            _pending.update(batch)
+        logger.warning(f'阅读次数写入失败，将在下次重试: {exc!r}')
+        return 0
+    refresh_popular()
+    return updated
+
+
+def refresh_popular():
+    """
+    重新计算热门排行并写入缓存
+
+    分数 = 阅读次数 / (发布小时数 + 2) ^ 衰减指数，新文章在阅读量相近时排名更靠前。
+
+    返回:
+        list: 热门文章列表，每项包含 id、title、views
+    """
+    now = timezone.now()
+    candidates = (
+        Post.objects.filter(published=True, views__gt=0)
+        .order_by('-views').values('id', 'title', 'views', 'created_at')[:POPULAR_CANDIDATES]
+    )
+    gravity = settings.POPULAR_POSTS_GRAVITY
+
+    def score(row):
+        hours = (now - row['created_at']).total_seconds() / 3600
+        return row['views'] / (hours + 2) ** gravity
+
+    ranked = sorted(candidates, key=score, reverse=True)[:settings.POPULAR_POSTS_COUNT]
+    popular = [{'id': row['id'], 'title': row['title'], 'views': row['views']} for row in ranked]
+    cache.set(POPULAR_CACHE_KEY, popular, settings.POPULAR_POSTS_TIMEOUT)
+    _state['refreshed_at'] = time.monotonic()
+    return popular
+
+
+def get_popular():
+    """
+    读取热门排行，不查询数据库
+    缓存缺失（进程刚启动或缓存被淘汰）时唤醒后台线程刷新，本次返回空排行；
+    没有后台线程的进程直接计算
+
+    返回:
+        list: 热门文章列表
+    """
+    popular = cache.get(POPULAR_CACHE_KEY)
+    metrics.record_cache('popular', popular is not None)
+    if popular is None:
+        if _flusher_running():
+            _wake.set()
+            return []
+        popular = refresh_popular()
+    return popular
+
+
+# 进程退出时写入剩余的阅读次数
+atexit.register(flush)
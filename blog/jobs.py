@@ -0,0 +1,201 @@
+"""
+轻量级后台任务运行器
+
+任务持久化在 Job 表中，通过 enqueue 入队，由 run_jobs 管理命令启动的工作进程执行。
+领取任务使用条件UPDATE实现乐观锁，多个工作进程可以同时运行而不会重复执行同一任务；
+失败的任务按指数退避重试，超过最大次数后标记为失败。
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from utils.logger import logger
+from .models import Job
+
+# 已注册的任务处理函数，键为任务名称
+_handlers = {}
+
+
+def register(name):
+    """
+    装饰器：把函数注册为指定名称的任务处理函数
+
+    参数:
+        name (str): 任务名称
+
+    返回:
+        callable: 原样返回被装饰的函数
+    """
+    def decorator(func):
+        _handlers[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, payload=None, run_at=None, key=''):
+    """
+    把任务加入队列
+
+    如果指定了幂等键且已有相同键的等待任务，则更新该任务的计划时间和参数，
+    不会重复入队。
+
+    参数:
+        name (str): 任务名称
+        payload (dict): 传给处理函数的关键字参数
+        run_at (datetime): 计划执行时间，默认立即执行
+        key (str): 幂等键
+
+    返回:
+        Job: 入队或合并后的等待任务，不会是相同键已经完成或失败的历史任务；
+            并发入队时可能是另一个请求刚插入、已被工作进程领取的执行中任务
+    """
+    payload = payload or {}
+    run_at = run_at or timezone.now()
+    if key:
+        pending_pk = Job.objects.filter(key=key, status=Job.PENDING).values_list('pk', flat=True).first()
+        # 按主键和状态更新，期间被工作进程领取的任务不会被修改，改为插入新任务
+        if pending_pk is not None and Job.objects.filter(pk=pending_pk, status=Job.PENDING).update(
+            name=name, payload=payload, run_at=run_at,
+        ):
+            return Job.objects.get(pk=pending_pk)
+    try:
+        with transaction.atomic():
+            return Job.objects.create(name=name, payload=payload, run_at=run_at, key=key)
+    except IntegrityError:
+        # 并发入队时另一个请求已经插入了相同键的等待任务
+        return Job.objects.filter(key=key, status__in=[Job.PENDING, Job.RUNNING]).latest('pk')
+
+
+def cancel(keys):
+    """
+    删除指定幂等键的等待任务，已经被领取的任务不受影响
+
+    参数:
+        keys (iterable): 幂等键
+
+    返回:
+        int: 删除的任务数
+    """
+    deleted, _ = Job.objects.filter(key__in=list(keys), status=Job.PENDING).delete()
+    return deleted
+
+
+def _retry_delay(attempts):
+    """
+    计算第 attempts 次失败后的重试等待时间（指数退避）
+    """
+    base = getattr(settings, 'JOB_RETRY_BASE_SECONDS', 30)
+    return timedelta(seconds=base * 2 ** (attempts - 1))
+
+
+def run_job(job):
+    """
+    执行一个已被领取的任务并记录结果
+
+    参数:
+        job (Job): 状态为执行中的任务对象
+
+    返回:
+        bool: 执行成功返回True
+    """
+    handler = _handlers.get(job.name)
+    try:
+        if handler is None:
+            raise LookupError(f'未注册的任务: {job.name}')
+        handler(**job.payload)
+    except Exception as exc:
+        now = timezone.now()
+        if job.attempts >= job.max_attempts:
+            job.status = Job.FAILED
+            job.finished_at = now
+            logger.error(f'任务 {job.name}#{job.pk} 多次失败，已放弃: {exc!r}')
+        else:
+            job.status = Job.PENDING
+            job.run_at = now + _retry_delay(job.attempts)
+            logger.warning(f'任务 {job.name}#{job.pk} 执行失败，将在 {job.run_at} 重试: {exc!r}')
+        job.last_error = repr(exc)
+        job.locked_at = None
+        try:
+            with transaction.atomic():
+                job.save(update_fields=['status', 'run_at', 'finished_at', 'last_error', 'locked_at'])
+        except IntegrityError:
+            # 失败期间已有相同幂等键的新任务入队，新任务会完成同样的工作
+            Job.objects.filter(pk=job.pk).update(
+                status=Job.DONE, finished_at=now, last_error=repr(exc), locked_at=None,
+            )
+        return False
+    Job.objects.filter(pk=job.pk).update(status=Job.DONE, finished_at=timezone.now(), last_error='')
+    return True
+
+
+def claim_due_jobs(limit=20):
+    """
+    领取最多 limit 个到期的等待任务
+
+    使用带状态条件的UPDATE领取任务，只有更新成功的工作进程才会执行该任务。
+
+    参数:
+        limit (int): 最多领取的任务数
+
+    返回:
+        list: 已领取的任务对象列表
+    """
+    now = timezone.now()
+    due_ids = list(
+        Job.objects.filter(status=Job.PENDING, run_at__lte=now)
+        .order_by('run_at')
+        .values_list('pk', flat=True)[:limit]
+    )
+    claimed = []
+    for pk in due_ids:
+        updated = Job.objects.filter(pk=pk, status=Job.PENDING).update(
+            status=Job.RUNNING, locked_at=now, attempts=F('attempts') + 1,
+        )
+        if updated:
+            claimed.append(pk)
+    return list(Job.objects.filter(pk__in=claimed).order_by('run_at'))
+
+
+def run_due_jobs(limit=20):
+    """
+    领取并执行一批到期任务
+
+    参数:
+        limit (int): 每批最多执行的任务数
+
+    返回:
+        int: 本批执行的任务数
+    """
+    jobs = claim_due_jobs(limit)
+    for job in jobs:
+        run_job(job)
+    return len(jobs)
+
+
+def requeue_stale_jobs(timeout):
+    """
+    把领取后超过 timeout 秒仍未完成的任务重新放回队列
+    用于回收工作进程崩溃时遗留的任务
+
+    参数:
+        timeout (int): 超时秒数
+
+    返回:
+        int: 被重新入队的任务数
+    """
+    cutoff = timezone.now() - timedelta(seconds=timeout)
+    requeued = 0
+    for job in Job.objects.filter(status=Job.RUNNING, locked_at__lt=cutoff):
+        try:
+            with transaction.atomic():
+                requeued += Job.objects.filter(pk=job.pk, status=Job.RUNNING).update(
+                    status=Job.PENDING, locked_at=None,
+                )
+        except IntegrityError:
+            # 已有相同幂等键的等待任务，遗留任务直接作废
+            Job.objects.filter(pk=job.pk).update(status=Job.FAILED, finished_at=timezone.now())
+    return requeued
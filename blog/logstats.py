@@ -0,0 +1,304 @@
+"""
+访问日志的增量汇总
+
+myblog.middleware.RequestLogMiddleware 为每个请求写一条访问日志，日志文件按天轮转并只保留7天。
+ingest_logs 命令按行流式读取 logs/ 目录下的日志（包括 .gz/.bz2/.xz 压缩文件），
+把访问记录按 (日期, 方法, 路由) 汇总到 RequestStat 表，延迟保存为固定分桶的直方图，
+日志删除后统计仍然保留。
+
+每个文件的读取位置保存在 LogFileState 表中，下次从该位置继续；
+每处理一批行就把汇总结果和读取位置在同一个事务中写回，中途失败也不会重复计数。
+内存占用只与一批中的路由数有关，与日志大小无关。
+"""
+
+import bz2
+import gzip
+import hashlib
+import lzma
+import re
+from bisect import bisect_left
+from datetime import date
+from pathlib import Path
+
+from django.db import transaction
+
+from myblog.middleware import ACCESS_LOG_PREFIX
+from .models import LogFileState, RequestStat
+
+# 延迟直方图各个桶的上限（毫秒），超过最后一个上限的请求计入额外的一个桶
+LATENCY_BUCKETS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+# 支持的压缩格式，文件按后缀识别
+OPENERS = {'.gz': gzip.open, '.bz2': bz2.open, '.xz': lzma.open}
+
+# 访问日志行，例如
+# 2025-10-17 17:34:13 |   INFO   | middleware:52 - access GET 200 12.3ms blog:post_detail /post/1/
+ACCESS_RE = re.compile(
+    rb'^(\d{4})-(\d{2})-(\d{2}) [\d:]{8} \|[^|]*\|[^-]*- '
+    + re.escape(ACCESS_LOG_PREFIX.encode()) + rb' ([A-Z]+) (\d{3}) ([\d.]+)ms (\S+)'
+)
+
+
+def logical_name(path):
+    """
+    返回去掉压缩后缀的文件名，压缩前后的同一个日志文件共用读取位置
+
+    参数:
+        path (Path): 日志文件路径
+
+    返回:
+        str: 文件名
+    """
+    if path.suffix in OPENERS:
+        return path.stem
+    return path.name
+
+
+def open_log(path):
+    """
+    以二进制方式打开日志文件，压缩文件按块解压
+
+    参数:
+        path (Path): 日志文件路径
+
+    返回:
+        file: 文件对象
+    """
+    return OPENERS.get(path.suffix, open)(path, 'rb')
+
+
+def parse_line(line):
+    """
+    解析一行访问日志
+
+    参数:
+        line (bytes): 日志行
+
+    返回:
+        tuple: (日期, 方法, 状态码, 耗时毫秒, 路由名称)，不是访问日志的行返回None
+    """
+    match = ACCESS_RE.match(line)
+    if match is None:
+        return None
+    year, month, day, method, status, ms, route = match.groups()
+    return (
+        date(int(year), int(month), int(day)), method.decode(), int(status), float(ms),
+        route.decode(errors='replace')[:200],
+    )
+
+
+def percentile(buckets, percent):
+    """
+    根据直方图估算百分位数，返回所在桶的上限
+
+    参数:
+        buckets (list): 直方图
+        percent (float): 百分比，例如 95
+
+    返回:
+        float: 耗时毫秒，落在最后一个桶时返回 inf；没有请求时返回0
+    """
+    total = sum(buckets)
+    if not total:
+        return 0
+    target = total * percent / 100
+    seen = 0
+    for index, count in enumerate(buckets):
+        seen += count
+        if seen >= target:
+            break
+    return LATENCY_BUCKETS[index] if index < len(LATENCY_BUCKETS) else float('inf')
+
+
+class Rollup:
+    """
+    一批访问记录的内存汇总，flush 时合并到 RequestStat 表
+    """
+
+    def __init__(self):
+        self.rows = {}
+
+    def add(self, day, method, status, ms, route):
+        """
+        累加一条访问记录
+        """
+        row = self.rows.get((day, method, route))
+        if row is None:
+            row = self.rows[(day, method, route)] = {
+                'count': 0, 'client_errors': 0, 'server_errors': 0,
+                'total_ms': 0.0, 'max_ms': 0.0, 'buckets': [0] * (len(LATENCY_BUCKETS) + 1),
+            }
+        row['count'] += 1
+        if 400 <= status < 500:
+            row['client_errors'] += 1
+        elif status >= 500:
+            row['server_errors'] += 1
+        row['total_ms'] += ms
+        row['max_ms'] = max(row['max_ms'], ms)
+        row['buckets'][bisect_left(LATENCY_BUCKETS, ms)] += 1
+
+    def flush(self):
+        """
+        把汇总结果合并到 RequestStat 表并清空，需要在事务中调用
+
+        返回:
+            int: 写回的行数
+        """
+        if not self.rows:
+            return 0
+        days = {day for day, _, _ in self.rows}
+        routes = {route for _, _, route in self.rows}
+        existing = {
+            (stat.day, stat.method, stat.route): stat
+            for stat in RequestStat.objects.select_for_update().filter(day__in=days, route__in=routes)
+        }
+        stats = []
+        for (day, method, route), row in self.rows.items():
+            stat = existing.get((day, method, route)) or RequestStat(day=day, method=method, route=route)
+            stat.count += row['count']
+            stat.client_errors += row['client_errors']
+            stat.server_errors += row['server_errors']
+            stat.total_ms += row['total_ms']
+            stat.max_ms = max(stat.max_ms, row['max_ms'])
+            old = stat.buckets or [0] * len(row['buckets'])
+            stat.buckets = [a + b for a, b in zip(old, row['buckets'])]
+            stats.append(stat)
+        RequestStat.objects.bulk_create(
+            stats, update_conflicts=True, unique_fields=['day', 'method', 'route'],
+            update_fields=['count', 'client_errors', 'server_errors', 'total_ms', 'max_ms', 'buckets'],
+        )
+        self.rows = {}
+        return len(stats)
+
+
+def _head_digest(path):
+    """
+    计算文件第一行的摘要，文件为空或第一行还没写完时返回空字符串
+    """
+    with open_log(path) as f:
+        line = f.readline()
+    if not line.endswith(b'\n'):
+        return ''
+    return hashlib.sha1(line).hexdigest()
+
+
+def ingest_file(path, batch=50000):
+    """
+    从上次的位置继续读取一个日志文件并汇总其中的访问记录
+
+    只处理以换行结尾的完整行，正在写入的最后一行留到下次读取。
+    每 batch 行把汇总结果和读取位置在同一个事务中写回。
+
+    参数:
+        path (Path): 日志文件路径
+        batch (int): 每批处理的行数
+
+    返回:
+        tuple: (读取的行数, 其中的访问记录数)
+    """
+    size = path.stat().st_size
+    state, _ = LogFileState.objects.get_or_create(name=logical_name(path))
+    if state.source == path.name and state.size == size:
+        return 0, 0
+    head = _head_digest(path)
+    if not head:
+        return 0, 0
+    if state.head != head:
+        # 新文件，或同名文件已被替换
+        state.head = head
+        state.offset = 0
+    rollup = Rollup()
+    lines = requests = pending = 0
+    offset = state.offset
+
+    def save_progress(at_end):
+        rollup.flush()
+        state.offset = offset
+        state.source = path.name if at_end else ''
+        state.size = size if at_end else 0
+        state.save()
+
+    with open_log(path) as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            offset += len(line)
+            lines += 1
+            pending += 1
+            record = parse_line(line)
+            if record is not None:
+                rollup.add(*record)
+                requests += 1
+            if pending >= batch:
+                with transaction.atomic():
+                    save_progress(at_end=False)
+                pending = 0
+    with transaction.atomic():
+        # 文件在读取过程中变大时，下次按大小变化继续读取
+        save_progress(at_end=offset >= size or path.suffix in OPENERS)
+    return lines, requests
+
+
+def ingest_directory(directory, batch=50000):
+    """
+    汇总目录下所有日志文件，并删除已不存在的文件的读取进度
+
+    参数:
+        directory (Path): 日志目录
+        batch (int): 每批处理的行数
+
+    返回:
+        dict: 文件名到 (读取的行数, 访问记录数) 的映射，只包含读到新内容的文件
+    """
+    directory = Path(directory)
+    paths = sorted(
+        path for path in directory.glob('*.log*')
+        if path.is_file() and (path.suffix == '.log' or path.suffix in OPENERS)
+    )
+    # 压缩文件和未压缩文件同时存在时只读取一个
+    by_name = {}
+    for path in paths:
+        by_name.setdefault(logical_name(path), path)
+    results = {}
+    for name, path in by_name.items():
+        lines, requests = ingest_file(path, batch)
+        if lines:
+            results[path.name] = (lines, requests)
+    LogFileState.objects.exclude(name__in=by_name).delete()
+    return results
+
+
+def route_report(since, until=None):
+    """
+    按路由汇总一段日期内的访问统计
+
+    参数:
+        since (date): 起始日期（包含）
+        until (date): 结束日期（包含），默认不限
+
+    返回:
+        list: 每个路由一个字典，包含请求数、错误率、平均耗时和 p50/p95/p99，按请求数从多到少排序
+    """
+    stats = RequestStat.objects.filter(day__gte=since)
+    if until is not None:
+        stats = stats.filter(day__lte=until)
+    report = {}
+    for stat in stats.iterator():
+        row = report.setdefault((stat.method, stat.route), {
+            'method': stat.method, 'route': stat.route, 'count': 0, 'server_errors': 0,
+            'client_errors': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'buckets': [0] * (len(LATENCY_BUCKETS) + 1),
+        })
+        row['count'] += stat.count
+        row['server_errors'] += stat.server_errors
+        row['client_errors'] += stat.client_errors
+        row['total_ms'] += stat.total_ms
+        row['max_ms'] = max(row['max_ms'], stat.max_ms)
+        row['buckets'] = [a + b for a, b in zip(row['buckets'], stat.buckets)]
+    rows = sorted(report.values(), key=lambda row: -row['count'])
+    for row in rows:
+        row['error_rate'] = row['server_errors'] / row['count'] if row['count'] else 0
+        row['avg_ms'] = row['total_ms'] / row['count'] if row['count'] else 0
+        for p in (50, 95, 99):
+            row[f'p{p}'] = percentile(row['buckets'], p)
+    return rows
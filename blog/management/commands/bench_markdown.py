@@ -0,0 +1,98 @@
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from blog.rendering import get_renderer, render_many
+
+CODE_SAMPLE = '''def fibonacci(n):
+    """返回前 n 个斐波那契数"""
+    a, b = 0, 1
+    result = []
+    for _ in range(n):
+        result.append(a)
+        a, b = b, a + b
+    return result
+'''
+
+
+def make_document(size, seed=0):
+    """
+    生成包含标题、段落、列表、引用和代码块的 Markdown 文档
+
+    参数:
+        size (int): 文档的大致字符数
+        seed (int): 随机数种子
+
+    返回:
+        str: Markdown 文本
+    """
+    rng = random.Random(seed)
+    words = ['博客', '**性能**', 'render', '`cache`', '缓存', '[链接](https://example.com)', '_强调_', '段落']
+    parts = []
+    length = 0
+    while length < size:
+        kind = rng.randrange(5)
+        if kind == 0:
+            part = '## ' + ' '.join(rng.choice(words) for _ in range(5))
+        elif kind == 1:
+            part = '\n'.join('- ' + ' '.join(rng.choice(words) for _ in range(8)) for _ in range(4))
+        elif kind == 2:
+            part = '```python\n' + CODE_SAMPLE + '```'
+        elif kind == 3:
+            part = '> ' + ' '.join(rng.choice(words) for _ in range(20))
+        else:
+            part = '\n'.join(' '.join(rng.choice(words) for _ in range(30)) for _ in range(3))
+        parts.append(part)
+        length += len(part) + 2
+    return '\n\n'.join(parts)
+
+
+class Command(BaseCommand):
+    """
+    Markdown 渲染吞吐量基准测试
+
+    生成若干篇大文档，先在当前进程依次渲染，再用进程池并行渲染，
+    报告每秒渲染的文档数和源文本字节数。只在内存中计算，不读写数据库。
+    """
+    help = '基准测试：Markdown 渲染吞吐量（单进程和进程池）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--docs', type=int, default=40, help='渲染的文档数')
+        parser.add_argument('--size', type=int, default=200000, help='每篇文档的字符数')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='进程池的进程数')
+
+    def handle(self, *args, **options):
+        docs = [(i, make_document(options['size'], seed=i)) for i in range(options['docs'])]
+        total_bytes = sum(len(text.encode('utf-8')) for _, text in docs)
+        renderer = get_renderer()
+        self.stdout.write(
+            f'渲染器: {renderer.name} v{renderer.version}，'
+            f'{len(docs)} 篇文档，共 {total_bytes / 1048576:.1f} MiB'
+        )
+
+        started = time.perf_counter()
+        output = render_many(docs)
+        self._report('单进程', len(docs), total_bytes, time.perf_counter() - started)
+
+        workers = options['workers']
+        chunks = [docs[i::workers] for i in range(workers)]
+        with ProcessPoolExecutor(workers) as executor:
+            # 先启动进程，不把进程创建时间计入吞吐量
+            list(executor.map(render_many, [[]] * workers))
+            started = time.perf_counter()
+            parallel = [row for result in executor.map(render_many, chunks) for row in result]
+            self._report(f'{workers} 个进程', len(docs), total_bytes, time.perf_counter() - started)
+        if sorted(parallel) != sorted(output):
+            self.stderr.write('进程池的渲染结果与单进程不一致')
+
+    def _report(self, label, count, total_bytes, elapsed):
+        """
+        输出一次渲染的吞吐量
+        """
+        self.stdout.write(
+            f'{label}: 耗时 {elapsed:.2f}s，{count / elapsed:.1f} 篇/s，'
+            f'{total_bytes / 1048576 / elapsed:.2f} MiB/s'
+        )
@@ -0,0 +1,78 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog.revisions import _snapshot_interval, encode_delta, encode_snapshot, rebuild
+
+
+class Command(BaseCommand):
+    """
+    历史版本存储基准测试
+
+    模拟一篇长文章被反复小幅修改，按与 record_revision 相同的规则生成快照和增量，
+    报告每个版本的平均存储大小（与保存完整副本对比）以及重建随机版本的延迟。
+    只在内存中计算，不读写数据库。
+    """
+    help = '基准测试：历史版本的存储大小和重建延迟'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--revisions', type=int, default=500, help='模拟的版本数')
+        parser.add_argument('--size', type=int, default=50000, help='文章的初始字符数')
+        parser.add_argument('--edit', type=int, default=200, help='每次修改的字符数')
+        parser.add_argument('--samples', type=int, default=200, help='重建延迟的采样次数')
+        parser.add_argument('--seed', type=int, default=0, help='随机数种子')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        words = ['博客', '性能', 'revision', 'delta', '快照', 'storage', '段落', 'latency']
+        content = ' '.join(rng.choice(words) for _ in range(options['size'] // 4))[:options['size']]
+
+        interval = _snapshot_interval()
+        rows = []
+        full_bytes = 0
+        previous = None
+        chain = 0
+        started = time.perf_counter()
+        for _ in range(options['revisions']):
+            if previous is not None:
+                # 在随机位置替换一段文字，模拟一次编辑
+                start = rng.randrange(len(content))
+                insert = ' '.join(rng.choice(words) for _ in range(options['edit'] // 4))
+                content = content[:start] + insert + content[start + options['edit'] // 2:]
+            if previous is None or chain + 1 >= interval:
+                rows.append((True, encode_snapshot(content)))
+                chain = 0
+            else:
+                rows.append((False, encode_delta(previous, content)))
+                chain += 1
+            full_bytes += len(content.encode('utf-8'))
+            previous = content
+        encode_elapsed = time.perf_counter() - started
+
+        stored = sum(len(data) for _, data in rows)
+        count = len(rows)
+        self.stdout.write(f'版本数: {count}，快照间隔: {interval}，编码耗时 {encode_elapsed:.2f}s')
+        self.stdout.write(f'完整副本: 平均 {full_bytes / count / 1024:.1f} KiB/版本')
+        self.stdout.write(
+            f'增量存储: 平均 {stored / count / 1024:.2f} KiB/版本，'
+            f'为完整副本的 {100 * stored / full_bytes:.2f}%'
+        )
+
+        # 重建随机版本：从最近的快照开始应用增量
+        snapshots = [index for index, (is_snapshot, _) in enumerate(rows) if is_snapshot]
+        latencies = []
+        for _ in range(options['samples']):
+            target = rng.randrange(count)
+            base = max(index for index in snapshots if index <= target)
+            started = time.perf_counter()
+            rebuild(rows[base:target + 1])
+            latencies.append(time.perf_counter() - started)
+        latencies.sort()
+        self.stdout.write(
+            '重建延迟: p50={:.2f}ms p95={:.2f}ms max={:.2f}ms'.format(
+                1000 * latencies[len(latencies) // 2],
+                1000 * latencies[int(len(latencies) * 0.95)],
+                1000 * latencies[-1],
+            )
+        )
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from blog.models import PostRevision
+from blog.revisions import compact_post
+
+
+class Command(BaseCommand):
+    """
+    历史版本压缩命令
+
+    对版本数超过 --keep 的文章，把早于 --older-than-days 天的版本按天合并，
+    每天只保留最后一个版本，并重新计算保留版本的增量和快照位置。
+    """
+    help = '压缩文章历史版本，合并旧版本以减少存储'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep', type=int, default=50, help='每篇文章无条件保留的最近版本数')
+        parser.add_argument('--older-than-days', type=int, default=30, help='只合并早于该天数的版本')
+
+    def handle(self, *args, **options):
+        post_ids = (
+            PostRevision.objects.values('post_id')
+            .annotate(total=Count('id')).filter(total__gt=options['keep'])
+            .values_list('post_id', flat=True)
+        )
+        removed = 0
+        for post_id in post_ids:
+            removed += compact_post(post_id, options['keep'], options['older_than_days'])
+        self.stdout.write(f'删除了 {removed} 个历史版本')
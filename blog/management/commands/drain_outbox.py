@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog import outbox
+
+
+class Command(BaseCommand):
+    """
+    发件箱工作进程
+
+    循环批量消费发件箱事件，同一篇文章的多次修改在一批中只处理一次。
+    没有到期的事件时休眠 --interval 秒；加 --once 时处理到没有到期的事件为止。
+    """
+    help = '消费发件箱事件，在请求之外更新文章的派生数据'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='处理完当前积压的事件后退出')
+        parser.add_argument('--interval', type=float, default=1.0, help='没有事件时的休眠秒数')
+        parser.add_argument('--batch', type=int, default=500, help='每批最多读取的事件数')
+        parser.add_argument('--prune-days', type=int, default=7, help='已处理事件的保留天数')
+
+    def handle(self, *args, **options):
+        outbox.prune(options['prune_days'])
+        try:
+            while True:
+                read, processed = outbox.drain(options['batch'])
+                if read:
+                    # 按读取的事件数判断是否还有积压：整批消费失败时处理数为0，但后面可能还有到期的事件
+                    self.stdout.write(f'处理了 {processed} 个事件')
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('工作进程已停止')
@@ -0,0 +1,49 @@
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from blog import logstats
+
+
+class Command(BaseCommand):
+    """
+    访问日志汇总命令
+
+    从上次的位置继续读取 --dir 目录下的日志文件（包括 .gz/.bz2/.xz 压缩文件），
+    把访问记录汇总到 RequestStat 表，然后输出最近 --days 天请求数最多的路由的
+    请求数、5xx错误率、平均耗时和 p50/p95/p99 延迟。适合由定时任务每隔几分钟执行一次，
+    同一时间只应运行一个实例。
+    """
+    help = '增量汇总访问日志，输出各路由的请求数、错误率和延迟分布'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', default=str(Path(settings.BASE_DIR) / 'logs'), help='日志目录')
+        parser.add_argument('--batch', type=int, default=50000, help='每批处理的行数')
+        parser.add_argument('--days', type=int, default=1, help='报告最近几天的统计，0表示不输出报告')
+        parser.add_argument('--top', type=int, default=20, help='报告中最多列出的路由数')
+
+    def handle(self, *args, **options):
+        directory = Path(options['dir'])
+        if not directory.is_dir():
+            raise CommandError(f'日志目录不存在: {directory}')
+        results = logstats.ingest_directory(directory, options['batch'])
+        for name, (lines, requests) in results.items():
+            self.stdout.write(f'{name}: 读取 {lines} 行，其中访问记录 {requests} 条')
+        if not results:
+            self.stdout.write('没有新的日志内容')
+        if options['days'] <= 0:
+            return
+
+        since = timezone.localdate() - timedelta(days=options['days'] - 1)
+        rows = logstats.route_report(since)[:options['top']]
+        self.stdout.write(f'\n{since} 以来的访问统计:')
+        self.stdout.write(f'{"路由":<40} {"请求数":>8} {"5xx":>7} {"平均":>8} {"p50":>7} {"p95":>7} {"p99":>7}')
+        for row in rows:
+            route = f'{row["method"]} {row["route"]}'
+            self.stdout.write(
+                f'{route:<40} {row["count"]:>8} {row["error_rate"]:>7.2%} {row["avg_ms"]:>6.1f}ms '
+                f'{row["p50"]:>5}ms {row["p95"]:>5}ms {row["p99"]:>5}ms'
+            )
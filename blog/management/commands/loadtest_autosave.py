@@ -0,0 +1,120 @@
+import json
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+
+from blog.models import Post, PostDraft
+
+
+def _percentile(values, percent):
+    """
+    计算已排序列表的百分位数
+    """
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(percent / 100 * (len(values) - 1))))
+    return values[index]
+
+
+class Command(BaseCommand):
+    """
+    自动保存接口的并发压测命令
+
+    创建指定数量的临时作者和草稿文章，所有作者同时开始，每人连续提交若干次自动保存，
+    统计延迟分布、冲突和错误数量，以及实际写回文章表的次数。压测结束后删除临时数据。
+    """
+    help = '模拟多名作者同时编辑文章，对自动保存接口进行压测'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--editors', type=int, default=500, help='同时编辑的作者数量')
+        parser.add_argument('--saves', type=int, default=5, help='每名作者提交的自动保存次数')
+        parser.add_argument('--pause', type=float, default=0.0, help='同一作者两次保存之间的间隔秒数')
+
+    def handle(self, *args, **options):
+        editors = options['editors']
+        prefix = f'loadtest-{int(time.time())}'
+        User.objects.bulk_create([User(username=f'{prefix}-{i}') for i in range(editors)])
+        users = list(User.objects.filter(username__startswith=prefix).order_by('pk'))
+        Post.objects.bulk_create([
+            Post(title=f'压测文章 {i}', content='初始内容。' * 200, author=user)
+            for i, user in enumerate(users)
+        ])
+        posts = list(Post.objects.filter(author__in=users).order_by('author_id'))
+        self.stdout.write(f'已创建 {editors} 名作者和 {len(posts)} 篇草稿文章')
+
+        latencies = []
+        statuses = {}
+        flushes = [0]
+        errors = []
+        lock = threading.Lock()
+        barrier = threading.Barrier(editors)
+        clients = []
+
+        def editor(client, post):
+            url = reverse('blog:post_autosave', args=[post.pk])
+            content = post.content
+            revision = 0
+            barrier.wait()
+            for n in range(options['saves']):
+                text = f'第{n}段自动保存内容。'
+                body = json.dumps({'base_revision': revision, 'ops': [[len(content), len(content), text]]})
+                started = time.perf_counter()
+                response = client.post(url, body, content_type='application/json')
+                elapsed = time.perf_counter() - started
+                with lock:
+                    latencies.append(elapsed)
+                    statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+                if response.status_code == 500:
+                    # 服务器错误（例如数据库锁超时）时保留原因，便于分析
+                    with lock:
+                        errors.append(repr(response.exc_info[1]) if response.exc_info else '')
+                if response.status_code == 200:
+                    data = response.json()
+                    content += text
+                    revision = data['revision']
+                    if data['flushed']:
+                        with lock:
+                            flushes[0] += 1
+                if options['pause']:
+                    time.sleep(options['pause'])
+            # 关闭当前线程的数据库连接
+            connection.close()
+
+        try:
+            # 登录需要写会话表，在压测开始前依次完成
+            for user in users:
+                client = Client(raise_request_exception=False, HTTP_HOST='localhost')
+                client.force_login(user)
+                clients.append(client)
+            threads = [threading.Thread(target=editor, args=pair) for pair in zip(clients, posts)]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+
+            latencies.sort()
+            total = len(latencies)
+            self.stdout.write(f'请求总数: {total}，耗时 {elapsed:.2f}s，吞吐 {total / elapsed:.1f} req/s')
+            self.stdout.write('状态码: ' + ', '.join(f'{code}={count}' for code, count in sorted(statuses.items())))
+            self.stdout.write(
+                '延迟: p50={:.1f}ms p95={:.1f}ms p99={:.1f}ms max={:.1f}ms'.format(
+                    *(1000 * _percentile(latencies, p) for p in (50, 95, 99, 100))
+                )
+            )
+            self.stdout.write(f'写回文章表次数: {flushes[0]}（自动保存成功 {statuses.get(200, 0)} 次）')
+            self.stdout.write(f'草稿行数: {PostDraft.objects.filter(post__in=posts).count()}')
+            if errors:
+                self.stdout.write(f'错误示例: {errors[0]}')
+        finally:
+            for client in clients:
+                client.logout()
+            # 删除压测产生的临时数据
+            Post.objects.filter(author__in=users).delete()
+            User.objects.filter(username__startswith=prefix).delete()
@@ -0,0 +1,68 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    """
+    测量工作进程启动后的首字节时间
+
+    分别在关闭和开启预热（MYBLOG_WARMUP=0/1）的情况下多次启动全新的进程，
+    每个进程导入 myblog.wsgi 后处理同一个URL两次，报告各项耗时的中位数：
+    ready 为进程开始到应用就绪，first 为第一次请求的首字节时间，
+    ttfb 为进程开始到第一次请求首字节的总时间。
+    加 --record 参数时把结果追加到文件，便于跟踪每次部署的变化。
+    """
+    help = '测量进程启动后第一次请求的首字节时间（对比开启和关闭预热）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/', help='请求的URL路径')
+        parser.add_argument('--runs', type=int, default=5, help='每种配置启动的进程数')
+        parser.add_argument('--record', default='', help='把结果以JSON行追加到该文件')
+
+    def handle(self, *args, **options):
+        results = {}
+        for label, warmup in (('no-warmup', '0'), ('warmup', '1')):
+            samples = [self._probe(options['path'], warmup) for _ in range(options['runs'])]
+            summary = {
+                key: round(statistics.median(sample[key] for sample in samples), 1)
+                for key in ('ready_ms', 'first_ms', 'second_ms', 'ttfb_ms', 'process_ms')
+            }
+            results[label] = summary
+            self.stdout.write(
+                f'{label:>10}: ready={summary["ready_ms"]}ms first={summary["first_ms"]}ms '
+                f'second={summary["second_ms"]}ms ttfb={summary["ttfb_ms"]}ms '
+                f'(含解释器启动 {summary["process_ms"]}ms)'
+            )
+        if options['record']:
+            record = {'measured_at': timezone.now().isoformat(), 'path': options['path'], **results}
+            with open(options['record'], 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + '\n')
+
+    def _probe(self, path, warmup):
+        """
+        启动一个探针进程并返回它报告的耗时
+        """
+        env = {**os.environ, 'MYBLOG_WARMUP': warmup, 'DJANGO_SETTINGS_MODULE': os.environ['DJANGO_SETTINGS_MODULE']}
+        env.pop('MYBLOG_PRELOAD', None)
+        started = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, '-m', 'myblog.ttfb', path],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        elapsed = 1000 * (time.perf_counter() - started)
+        lines = [line for line in completed.stdout.splitlines() if line.startswith('{')]
+        if completed.returncode or not lines:
+            raise CommandError(f'探针进程失败: {completed.stderr.strip()[-500:]}')
+        sample = json.loads(lines[-1])
+        if sample['status'] >= 500:
+            raise CommandError(f'{path} 返回了 {sample["status"]}，请先执行 migrate')
+        sample['process_ms'] = elapsed
+        return sample
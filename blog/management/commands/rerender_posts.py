@@ -0,0 +1,72 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+
+from blog.models import Post
+from blog.rendering import get_renderer, render_key, render_many
+
+
+def _init_worker():
+    """
+    进程池工作进程的初始化，使用 spawn 方式启动时需要重新加载Django
+    """
+    django.setup()
+
+
+class Command(BaseCommand):
+    """
+    批量重新渲染文章内容HTML
+
+    修改渲染器或升级渲染器版本后，按主键分批读取文章，只挑出渲染键与当前内容不一致的文章，
+    在进程池中并行渲染，每批结果用一次 bulk_update 写回。
+    渲染期间被修改的文章写入的是旧内容的渲染键，详情页会发现不一致并补渲染。
+    """
+    help = '在进程池中并行重新渲染内容HTML过期的文章'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='渲染进程数，1表示在当前进程渲染')
+        parser.add_argument('--batch', type=int, default=20, help='每个渲染任务包含的文章数')
+        parser.add_argument('--force', action='store_true', help='忽略渲染键，重新渲染全部文章')
+
+    def handle(self, *args, **options):
+        renderer = get_renderer()
+        batch = options['batch']
+        workers = options['workers']
+        executor = ProcessPoolExecutor(workers, initializer=_init_worker) if workers > 1 else None
+        rendered = 0
+        source_bytes = 0
+        last_pk = 0
+        started = time.perf_counter()
+        try:
+            while True:
+                rows = list(
+                    Post.objects.filter(pk__gt=last_pk).order_by('pk')
+                    .values_list('pk', 'content', 'content_html_key')[:batch * workers]
+                )
+                if not rows:
+                    break
+                last_pk = rows[-1][0]
+                stale = [
+                    (pk, content) for pk, content, key in rows
+                    if options['force'] or key != render_key(content, renderer)
+                ]
+                chunks = [stale[i:i + batch] for i in range(0, len(stale), batch)]
+                results = executor.map(render_many, chunks) if executor else map(render_many, chunks)
+                for chunk, result in zip(chunks, results):
+                    Post.objects.bulk_update(
+                        [Post(pk=pk, content_html=html, content_html_key=key) for pk, html, key in result],
+                        ['content_html', 'content_html_key'],
+                    )
+                    rendered += len(result)
+                    source_bytes += sum(len(content.encode('utf-8')) for _, content in chunk)
+        finally:
+            if executor:
+                executor.shutdown()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'重新渲染了 {rendered} 篇文章（{source_bytes / 1048576:.2f} MiB），'
+            f'{workers} 个进程，耗时 {elapsed:.2f}s'
+        )
@@ -0,0 +1,61 @@
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from blog import jobs
+
+
+class Command(BaseCommand):
+    """
+    后台任务工作进程
+
+    循环领取并执行到期任务，队列为空时休眠 --interval 秒。
+    --workers 大于1时在进程内启动多个工作线程，适合缩略图这类大部分时间释放GIL的任务；
+    也可以同时启动多个进程，任务领取通过条件UPDATE保证不会重复执行。
+    """
+    help = '运行后台任务工作进程（定时发布、派生数据刷新、缩略图生成等）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='只执行一批到期任务后退出')
+        parser.add_argument('--interval', type=float, default=1.0, help='队列为空时的休眠秒数')
+        parser.add_argument('--batch', type=int, default=20, help='每批最多领取的任务数')
+        parser.add_argument('--workers', type=int, default=1, help='进程内的工作线程数')
+        parser.add_argument(
+            '--stale-timeout', type=int, default=300,
+            help='执行超过该秒数的任务视为工作进程崩溃遗留，重新入队',
+        )
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        threads = [
+            threading.Thread(target=self._work, args=(options, stop), daemon=True)
+            for _ in range(options['workers'] - 1)
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            self._work(options, stop)
+        except KeyboardInterrupt:
+            self.stdout.write('工作进程已停止')
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+    def _work(self, options, stop):
+        """
+        单个工作线程的循环，每个线程使用自己的数据库连接
+        """
+        try:
+            while not stop.is_set():
+                jobs.requeue_stale_jobs(options['stale_timeout'])
+                count = jobs.run_due_jobs(options['batch'])
+                if count:
+                    self.stdout.write(f'执行了 {count} 个任务')
+                if options['once']:
+                    break
+                if not count:
+                    stop.wait(options['interval'])
+        finally:
+            connection.close()
@@ -0,0 +1,59 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from myblog.routers import get_replica_aliases
+
+
+class Command(BaseCommand):
+    """
+    本地开发用的复制命令，模拟主库到只读副本的复制
+
+    使用SQLite的在线备份接口把主库完整复制到每个副本文件，
+    复制过程中主库仍然可以正常读写。加 --interval 参数可以持续循环复制。
+    """
+    help = '把主库SQLite文件复制到所有只读副本（本地复制替身）'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='循环复制的间隔秒数，默认只复制一次',
+        )
+
+    def handle(self, *args, **options):
+        primary = settings.DATABASES[DEFAULT_DB_ALIAS]
+        if primary['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('sync_replica 只支持SQLite数据库，生产环境请使用数据库自带的复制。')
+
+        replicas = get_replica_aliases()
+        if not replicas:
+            self.stdout.write('没有配置只读副本，无需复制。')
+            return
+
+        interval = options['interval']
+        while True:
+            for alias in replicas:
+                self._copy(str(primary['NAME']), str(settings.DATABASES[alias]['NAME']))
+                self.stdout.write(f'已复制主库到副本 {alias}')
+            if not interval:
+                break
+            time.sleep(interval)
+
+    def _copy(self, source_path, target_path):
+        """
+        使用SQLite在线备份接口复制数据库文件
+
+        参数:
+            source_path (str): 主库文件路径
+            target_path (str): 副本文件路径
+        """
+        source = sqlite3.connect(source_path)
+        target = sqlite3.connect(target_path)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
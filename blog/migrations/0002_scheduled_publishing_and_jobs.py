@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:51
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.utils.text import Truncator
+
+
+def fill_excerpts(apps, schema_editor):
+    # 为已有文章生成摘要，之后由后台任务在保存时维护
+    Post = apps.get_model('blog', 'Post')
+    for post in Post.objects.only('pk', 'content').iterator():
+        Post.objects.filter(pk=post.pk).update(excerpt=Truncator(post.content).words(30))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.TextField(blank=True, default='', verbose_name='摘要'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='publish_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='定时发布时间'),
+        ),
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='任务名称')),
+                ('payload', models.JSONField(blank=True, default=dict, verbose_name='任务参数')),
+                ('key', models.CharField(blank=True, default='', max_length=200, verbose_name='幂等键')),
+                ('status', models.CharField(choices=[('pending', '等待执行'), ('running', '执行中'), ('done', '已完成'), ('failed', '已失败')], default='pending', max_length=10, verbose_name='状态')),
+                ('run_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='计划执行时间')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='尝试次数')),
+                ('max_attempts', models.PositiveSmallIntegerField(default=5, verbose_name='最大尝试次数')),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='错误信息')),
+                ('locked_at', models.DateTimeField(blank=True, null=True, verbose_name='领取时间')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='完成时间')),
+            ],
+            options={
+                'verbose_name': '后台任务',
+                'verbose_name_plural': '后台任务',
+                'ordering': ['run_at'],
+                'indexes': [models.Index(fields=['status', 'run_at'], name='blog_job_due_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status', 'pending'), models.Q(('key', ''), _negated=True)), fields=('key',), name='blog_job_pending_key_uniq')],
+            },
+        ),
+        migrations.RunPython(fill_excerpts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0002_scheduled_publishing_and_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('topic', models.CharField(max_length=50, verbose_name='主题')),
+                ('post_id', models.BigIntegerField(verbose_name='文章ID')),
+                ('payload', models.JSONField(blank=True, default=dict, verbose_name='事件数据')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('processed_at', models.DateTimeField(blank=True, null=True, verbose_name='处理时间')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='失败次数')),
+            ],
+            options={
+                'verbose_name': '发件箱事件',
+                'verbose_name_plural': '发件箱事件',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['processed_at', 'id'], name='blog_outbox_pending_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0003_outbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostDraft',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='draft', serialize=False, to='blog.post', verbose_name='文章')),
+                ('revision', models.PositiveIntegerField(default=0, verbose_name='版本号')),
+                ('content', models.TextField(verbose_name='草稿内容')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='保存时间')),
+                ('flushed_at', models.DateTimeField(blank=True, null=True, verbose_name='写回时间')),
+            ],
+            options={
+                'verbose_name': '自动保存草稿',
+                'verbose_name_plural': '自动保存草稿',
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:21
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0004_post_draft'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostRevision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField(verbose_name='版本号')),
+                ('is_snapshot', models.BooleanField(default=False, verbose_name='是否快照')),
+                ('data', models.BinaryField(verbose_name='版本数据')),
+                ('content_length', models.PositiveIntegerField(default=0, verbose_name='内容长度')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='保存时间')),
+                ('author', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='修改者')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revisions', to='blog.post', verbose_name='文章')),
+            ],
+            options={
+                'verbose_name': '历史版本',
+                'verbose_name_plural': '历史版本',
+                'ordering': ['-number'],
+                'constraints': [models.UniqueConstraint(fields=('post', 'number'), name='blog_revision_post_number_uniq')],
+            },
+        ),
+    ]
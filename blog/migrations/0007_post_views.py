@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:26
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0006_keyset_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='views',
+            field=models.PositiveIntegerField(default=0, verbose_name='阅读次数'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['published', '-views'], name='blog_post_views_idx'),
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:31
+
+from collections import Counter
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def fill_archive_stats(apps, schema_editor):
+    # 为已有文章生成作者和月份统计，之后在文章保存或删除时维护
+    Post = apps.get_model('blog', 'Post')
+    AuthorPostStat = apps.get_model('blog', 'AuthorPostStat')
+    MonthlyPostStat = apps.get_model('blog', 'MonthlyPostStat')
+    authors = Counter()
+    latest = {}
+    months = Counter()
+    for author_id, created_at in Post.objects.filter(published=True).values_list('author_id', 'created_at').iterator():
+        authors[author_id] += 1
+        latest[author_id] = max(latest.get(author_id, created_at), created_at)
+        local = timezone.localtime(created_at)
+        months[(local.year, local.month)] += 1
+    AuthorPostStat.objects.bulk_create([
+        AuthorPostStat(author_id=author_id, post_count=count, last_post_at=latest[author_id])
+        for author_id, count in authors.items()
+    ])
+    MonthlyPostStat.objects.bulk_create([
+        MonthlyPostStat(year=year, month=month, post_count=count)
+        for (year, month), count in months.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('blog', '0008_taxonomy'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorPostStat',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='post_stat', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='作者')),
+                ('post_count', models.PositiveIntegerField(default=0, verbose_name='文章数')),
+                ('last_post_at', models.DateTimeField(blank=True, null=True, verbose_name='最近发布时间')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': '作者文章统计',
+                'verbose_name_plural': '作者文章统计',
+            },
+        ),
+        migrations.CreateModel(
+            name='MonthlyPostStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField(verbose_name='年')),
+                ('month', models.PositiveSmallIntegerField(verbose_name='月')),
+                ('post_count', models.PositiveIntegerField(default=0, verbose_name='文章数')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': '月度文章统计',
+                'verbose_name_plural': '月度文章统计',
+                'ordering': ['-year', '-month'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', 'published', '-created_at', '-id'], name='blog_post_author_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='monthlypoststat',
+            constraint=models.UniqueConstraint(fields=('year', 'month'), name='blog_monthlypoststat_month_uniq'),
+        ),
+        migrations.RunPython(fill_archive_stats, migrations.RunPython.noop),
+    ]
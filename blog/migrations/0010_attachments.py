@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0009_archive_stats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Attachment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True, verbose_name='SHA-256')),
+                ('size', models.PositiveBigIntegerField(verbose_name='大小')),
+                ('content_type', models.CharField(max_length=100, verbose_name='内容类型')),
+                ('original_name', models.CharField(blank=True, default='', max_length=255, verbose_name='原始文件名')),
+                ('width', models.PositiveIntegerField(blank=True, null=True, verbose_name='宽度')),
+                ('height', models.PositiveIntegerField(blank=True, null=True, verbose_name='高度')),
+                ('thumbnails', models.JSONField(blank=True, default=list, verbose_name='缩略图')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='上传时间')),
+                ('uploaded_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='上传者')),
+            ],
+            options={
+                'verbose_name': '附件',
+                'verbose_name_plural': '附件',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0010_attachments'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='content_html',
+            field=models.TextField(blank=True, default='', verbose_name='内容HTML'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='content_html_key',
+            field=models.CharField(blank=True, default='', max_length=64, verbose_name='渲染键'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0011_content_html'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LogFileState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True, verbose_name='文件名')),
+                ('head', models.CharField(blank=True, default='', max_length=40, verbose_name='首行摘要')),
+                ('offset', models.PositiveBigIntegerField(default=0, verbose_name='读取位置')),
+                ('source', models.CharField(blank=True, default='', max_length=255, verbose_name='实际文件名')),
+                ('size', models.PositiveBigIntegerField(default=0, verbose_name='文件大小')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': '日志读取进度',
+                'verbose_name_plural': '日志读取进度',
+            },
+        ),
+        migrations.CreateModel(
+            name='RequestStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='日期')),
+                ('method', models.CharField(max_length=10, verbose_name='方法')),
+                ('route', models.CharField(max_length=200, verbose_name='路由')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='请求数')),
+                ('client_errors', models.PositiveIntegerField(default=0, verbose_name='4xx数')),
+                ('server_errors', models.PositiveIntegerField(default=0, verbose_name='5xx数')),
+                ('total_ms', models.FloatField(default=0, verbose_name='总耗时')),
+                ('max_ms', models.FloatField(default=0, verbose_name='最大耗时')),
+                ('buckets', models.JSONField(default=list, verbose_name='延迟分布')),
+            ],
+            options={
+                'verbose_name': '访问统计',
+                'verbose_name_plural': '访问统计',
+                'ordering': ['-day', 'route', 'method'],
+                'constraints': [models.UniqueConstraint(fields=('day', 'method', 'route'), name='blog_requeststat_route_uniq')],
+            },
+        ),
+    ]
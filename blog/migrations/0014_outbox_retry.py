@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:07
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0013_admin_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboxevent',
+            name='available_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='可投递时间'),
+        ),
+        migrations.AddField(
+            model_name='outboxevent',
+            name='last_error',
+            field=models.TextField(blank=True, default='', verbose_name='错误信息'),
+        ),
+    ]
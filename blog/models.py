@@ -1,6 +1,11 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.urls import reverse
+from django.utils import timezone
+from django.utils.text import Truncator
+
+# 文章摘要保留的单词数，与列表页原先的 truncatewords:30 保持一致
+EXCERPT_WORDS = 30
 
 class Post(models.Model):
     """
@@ -24,6 +29,27 @@ class Post(models.Model):
     # 文章发布状态，布尔值，默认为False（草稿状态）
     published = models.BooleanField(default=False, verbose_name='是否发布')
     
+    # 定时发布时间，到达该时间后由后台任务把文章切换为已发布
+    publish_at = models.DateTimeField(null=True, blank=True, db_index=True, verbose_name='定时发布时间')
+    
+    # 文章摘要，由后台任务根据内容重新计算，列表页直接使用
+    excerpt = models.TextField(blank=True, default='', verbose_name='摘要')
+    
+    # 内容编译后的HTML，保存时由 blog.rendering 生成，详情页直接输出
+    content_html = models.TextField(blank=True, default='', verbose_name='内容HTML')
+    
+    # 生成 content_html 时的渲染键（内容摘要 + 渲染器版本），与当前内容不一致时需要重新渲染
+    content_html_key = models.CharField(max_length=64, blank=True, default='', verbose_name='渲染键')
+    
+    # 阅读次数，由 blog.hits 在内存中聚合后批量写入
+    views = models.PositiveIntegerField(default=0, verbose_name='阅读次数')
+    
+    # 文章分类，可以为空；分类删除时文章保留
+    category = models.ForeignKey('Category', on_delete=models.SET_NULL, null=True, blank=True, related_name='posts', verbose_name='分类')
+    
+    # 文章标签，通过 PostTag 关联表保存
+    tags = models.ManyToManyField('Tag', through='PostTag', related_name='posts', blank=True, verbose_name='标签')
+    
     class Meta:
         # 在Django管理后台显示的单数形式名称
         verbose_name = '文章'
@@ -31,6 +57,20 @@ class Post(models.Model):
         verbose_name_plural = '文章'
         # 文章列表的默认排序方式，按创建时间倒序排列
         ordering = ['-created_at']
+        indexes = [
+            # 已发布文章按 (created_at, id) 键集分页
+            models.Index(fields=['published', '-created_at', '-id'], name='blog_post_published_idx'),
+            # 热门文章排行按阅读次数选取候选文章
+            models.Index(fields=['published', '-views'], name='blog_post_views_idx'),
+            # 分类页面按 (created_at, id) 键集分页
+            models.Index(fields=['category', 'published', '-created_at', '-id'], name='blog_post_category_idx'),
+            # 作者页面按 (created_at, id) 键集分页，同时用于统计作者的已发布文章数
+            models.Index(fields=['author', 'published', '-created_at', '-id'], name='blog_post_author_idx'),
+            # 管理后台列表页按 (created_at, id) 倒序排列
+            models.Index(fields=['-created_at', '-id'], name='blog_post_created_idx'),
+            # 管理后台按标题前缀搜索
+            models.Index(fields=['title'], name='blog_post_title_idx'),
+        ]
     
     def __str__(self):
         """
@@ -44,6 +84,55 @@ class Post(models.Model):
         返回文章详情页面的URL
         """
         return reverse('blog:post_detail', args=[str(self.id)])
+    
+    def save(self, *args, **kwargs):
+        """
+        保存文章，内容或渲染器版本变化时先重新编译内容HTML
+        """
+        update_fields = kwargs.get('update_fields')
+        if (update_fields is None or 'content' in update_fields) and self.render_content():
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'content_html', 'content_html_key'}
+        super().save(*args, **kwargs)
+    
+    def render_content(self):
+        """
+        渲染键与当前内容不一致时重新编译内容HTML
+        
+        返回:
+            bool: 重新渲染了返回True
+        """
+        from .rendering import render_key, render_markdown
+        if self.content_html_key == render_key(self.content):
+            return False
+        self.content_html, self.content_html_key = render_markdown(self.content)
+        return True
+    
+    def ensure_rendered(self):
+        """
+        确保内容HTML是最新的；通过批量更新修改内容（例如自动保存写回）后，
+        在第一次显示时补上渲染并只写回渲染字段
+        """
+        if self.render_content() and self.pk:
+            Post.objects.filter(pk=self.pk, content=self.content).update(
+                content_html=self.content_html, content_html_key=self.content_html_key,
+            )
+    
+    def make_excerpt(self):
+        """
+        根据文章内容生成摘要
+        
+        返回:
+            str: 截取前 EXCERPT_WORDS 个单词的摘要
+        """
+        return Truncator(self.content).words(EXCERPT_WORDS)
+    
+    @property
+    def is_scheduled(self):
+        """
+        判断文章是否处于等待定时发布的状态
+        """
+        return not self.published and self.publish_at is not None and self.publish_at > timezone.now()
 
 class Comment(models.Model):
     """
@@ -68,6 +157,12 @@ class Comment(models.Model):
         verbose_name_plural = '评论'
         # 评论列表的默认排序方式，按创建时间正序排列
         ordering = ['created_at']
+        indexes = [
+            # 单篇文章的评论按 (created_at, id) 键集分页
+            models.Index(fields=['post', 'created_at', 'id'], name='blog_comment_post_idx'),
+            # 管理后台列表页按 (created_at, id) 倒序排列
+            models.Index(fields=['-created_at', '-id'], name='blog_comment_created_idx'),
+        ]
     
     def __str__(self):
         """
@@ -75,3 +170,484 @@ class Comment(models.Model):
         格式：作者 对 文章标题 的评论
         """
         return f'{self.author.username} 对 {self.post.title} 的评论'
+
+
+class Job(models.Model):
+    """
+    后台任务模型，持久化保存在数据库中的任务队列
+    由 run_jobs 管理命令启动的工作进程领取并执行
+    """
+    # 任务状态
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, '等待执行'),
+        (RUNNING, '执行中'),
+        (DONE, '已完成'),
+        (FAILED, '已失败'),
+    ]
+    
+    # 任务名称，对应 blog.jobs 中注册的处理函数
+    name = models.CharField(max_length=100, verbose_name='任务名称')
+    
+    # 任务参数，以关键字参数形式传给处理函数
+    payload = models.JSONField(default=dict, blank=True, verbose_name='任务参数')
+    
+    # 幂等键，同一个键同时只能有一个等待执行的任务
+    key = models.CharField(max_length=200, blank=True, default='', verbose_name='幂等键')
+    
+    # 任务状态
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING, verbose_name='状态')
+    
+    # 计划执行时间，早于当前时间的等待任务会被领取
+    run_at = models.DateTimeField(default=timezone.now, verbose_name='计划执行时间')
+    
+    # 已尝试次数和最大尝试次数，失败后按指数退避重试
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name='尝试次数')
+    max_attempts = models.PositiveSmallIntegerField(default=5, verbose_name='最大尝试次数')
+    
+    # 最近一次失败的错误信息
+    last_error = models.TextField(blank=True, default='', verbose_name='错误信息')
+    
+    # 被工作进程领取的时间，用于回收崩溃进程遗留的任务
+    locked_at = models.DateTimeField(null=True, blank=True, verbose_name='领取时间')
+    
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='完成时间')
+    
+    class Meta:
+        verbose_name = '后台任务'
+        verbose_name_plural = '后台任务'
+        ordering = ['run_at']
+        indexes = [
+            # 工作进程按状态和计划时间查找到期任务
+            models.Index(fields=['status', 'run_at'], name='blog_job_due_idx'),
+        ]
+        constraints = [
+            # 同一个幂等键只允许存在一个等待执行的任务，重复入队会合并
+            models.UniqueConstraint(
+                fields=['key'],
+                condition=models.Q(status='pending') & ~models.Q(key=''),
+                name='blog_job_pending_key_uniq',
+            ),
+        ]
+    
+    def __str__(self):
+        """
+        定义模型实例的字符串表示，返回任务名称和状态
+        """
+        return f'{self.name} ({self.get_status_display()})'
+
+
+class OutboxEvent(models.Model):
+    """
+    事务性发件箱事件模型
+    与文章、评论的修改在同一个事务中写入，由 drain_outbox 工作进程批量消费，
+    保证派生数据的更新至少被处理一次，同时不占用保存文章的请求时间
+    """
+    # 事件主题，例如 post.changed、comment.changed
+    topic = models.CharField(max_length=50, verbose_name='主题')
+    
+    # 关联的文章ID，不使用外键，文章删除后事件仍然保留
+    post_id = models.BigIntegerField(verbose_name='文章ID')
+    
+    # 事件附带的数据
+    payload = models.JSONField(default=dict, blank=True, verbose_name='事件数据')
+    
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
+    
+    # 处理完成时间，为空表示尚未被消费
+    processed_at = models.DateTimeField(null=True, blank=True, verbose_name='处理时间')
+    
+    # 消费失败的次数
+    attempts = models.PositiveIntegerField(default=0, verbose_name='失败次数')
+    
+    # 最早可以投递的时间，消费失败后按指数退避推迟，不会阻塞后面的事件
+    available_at = models.DateTimeField(default=timezone.now, verbose_name='可投递时间')
+    
+    # 最近一次消费失败的错误信息；多次失败后放弃的事件（死信）标记为已处理并保留该信息
+    last_error = models.TextField(blank=True, default='', verbose_name='错误信息')
+    
+    class Meta:
+        verbose_name = '发件箱事件'
+        verbose_name_plural = '发件箱事件'
+        ordering = ['id']
+        indexes = [
+            # 工作进程按处理状态和写入顺序读取待处理事件
+            models.Index(fields=['processed_at', 'id'], name='blog_outbox_pending_idx'),
+        ]
+    
+    def __str__(self):
+        """
+        定义模型实例的字符串表示，返回主题和文章ID
+        """
+        return f'{self.topic} #{self.post_id}'
+
+
+class PostDraft(models.Model):
+    """
+    文章自动保存草稿模型
+    每篇文章只保留一行，自动保存的增量直接合并到该行，不会为每次保存新增记录
+    """
+    # 对应的文章，同时作为主键
+    post = models.OneToOneField(Post, on_delete=models.CASCADE, primary_key=True, related_name='draft', verbose_name='文章')
+    
+    # 草稿版本号，每次自动保存加一，客户端提交增量时必须基于最新版本
+    revision = models.PositiveIntegerField(default=0, verbose_name='版本号')
+    
+    # 合并增量后的草稿内容
+    content = models.TextField(verbose_name='草稿内容')
+    
+    # 草稿最近一次自动保存的时间
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='保存时间')
+    
+    # 草稿内容最近一次写回文章的时间，用于限制写回频率
+    flushed_at = models.DateTimeField(null=True, blank=True, verbose_name='写回时间')
+    
+    class Meta:
+        verbose_name = '自动保存草稿'
+        verbose_name_plural = '自动保存草稿'
+    
+    def __str__(self):
+        """
+        定义模型实例的字符串表示，返回文章标题和版本号
+        """
+        return f'{self.post_id} 草稿 v{self.revision}'
+
+
+class PostRevision(models.Model):
+    """
+    文章历史版本模型
+    每隔若干个版本保存一次完整快照，其余版本只保存相对上一版本的压缩增量，
+    重建任意版本最多只需要应用一个快照间隔内的增量
+    """
+    # 所属文章，文章删除时历史版本一并删除
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='revisions', verbose_name='文章')
+    
+    # 版本号，同一篇文章内递增，压缩合并后允许不连续
+    number = models.PositiveIntegerField(verbose_name='版本号')
+    
+    # 是否为完整快照，否则为相对上一个版本的增量
+    is_snapshot = models.BooleanField(default=False, verbose_name='是否快照')
+    
+    # zlib压缩后的快照文本或增量操作
+    data = models.BinaryField(verbose_name='版本数据')
+    
+    # 该版本内容的字符数，用于展示和统计
+    content_length = models.PositiveIntegerField(default=0, verbose_name='内容长度')
+    
+    # 保存该版本的用户
+    author = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, verbose_name='修改者')
+    
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='保存时间')
+    
+    class Meta:
+        verbose_name = '历史版本'
+        verbose_name_plural = '历史版本'
+        ordering = ['-number']
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'number'], name='blog_revision_post_number_uniq'),
+        ]
+    
+    def __str__(self):
+        """
+        定义模型实例的字符串表示，返回文章ID和版本号
+        """
+        return f'{self.post_id} v{self.number}'
+
+
+class Category(models.Model):
+    """
+    文章分类模型，每篇文章最多属于一个分类
+    """
+    # 分类名称
+    name = models.CharField(max_length=50, unique=True, verbose_name='名称')
+    
+    # 分类的URL标识
+    slug = models.SlugField(max_length=60, unique=True, allow_unicode=True, verbose_name='URL标识')
+    
+    # 更新时间，归档页面的ETag包含分类的最新更新时间，重命名后页面上的分类名称随之更新
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
+    
+    class Meta:
+        verbose_name = '分类'
+        verbose_name_plural = '分类'
+        ordering = ['name']
+    
+    def __str__(self):
+        """
+        定义模型实例的字符串表示，返回分类名称
+        """
+        return self.name
+    
+    def get_absolute_url(self):
+        """
+        获取分类文章列表页面的URL
+        """
+        return reverse('blog:category_posts', args=[self.slug])
+
+
+class Tag(models.Model):
+    """
+    文章标签模型
+    post_count 保存带有该标签的已发布文章数，在标签关联或文章发布状态变化时重新统计，
+    页面渲染时不需要 COUNT(*)
+    """
+    # 标签名称
+    name = models.CharField(max_length=50, unique=True, verbose_name='名称')
+    
+    # 标签的URL标识
+    slug = models.SlugField(max_length=60, unique=True, allow_unicode=True, verbose_name='URL标识')
+    
+    # 已发布文章数
+    post_count = models.PositiveIntegerField(default=0, verbose_name='文章数')
+    
+    # 更新时间，只在保存（如重命名）时更新，重新统计文章数不会修改；归档页面的ETag包含标签的最新更新时间
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
+    
+    class Meta:
+        verbose_name = '标签'
+        verbose_name_plural = '标签'
+        ordering = ['name']
+        indexes = [
+            # 标签云按文章数选取标签
+            models.Index(fields=['-post_count'], name='blog_tag_count_idx'),
+        ]
+    
+    def __str__(self):
+        """
+        定义模型实例的字符串表示，返回标签名称
+        """
+        return self.name
+    
+    def get_absolute_url(self):
+        """
+        获取标签文章列表页面的URL
+        """
+        return reverse('blog:tag_posts', args=[self.slug])
+
+
+class PostTag(models.Model):
+    """
+    文章与标签的关联表
+    冗余保存文章的发布状态和创建时间，标签页面只扫描 (tag, published, created_at, id) 索引
+    即可完成过滤、排序和键集分页，不需要先连接文章表再排序
+    """
+    # 关联的文章和标签
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='post_tags', verbose_name='文章')
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='post_tags', verbose_name='标签')
+    
+    # 冗余的文章发布状态，文章发布状态变化时同步
+    published = models.BooleanField(default=False, verbose_name='是否发布')
+    
+    # 冗余的文章创建时间，用于排序和分页
+    created_at = models.DateTimeField(verbose_name='文章创建时间')
+    
+    class Meta:
+        verbose_name = '文章标签'
+        verbose_name_plural = '文章标签'
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'tag'], name='blog_posttag_post_tag_uniq'),
+        ]
+        indexes = [
+            # 标签页面的过滤、排序和键集分页
+            models.Index(fields=['tag', 'published', '-created_at', '-id'], name='blog_posttag_listing_idx'),
+        ]
+    
+    def __str__(self):
+        """
+        定义模型实例的字符串表示，返回文章ID和标签ID
+        """
+        return f'{self.post_id} - {self.tag_id}'
+
+
+class AuthorPostStat(models.Model):
+    """
+    作者文章统计表，保存每位作者的已发布文章数
+    文章保存或删除时由 blog.archive 重新统计，作者页面和条件请求直接读取，不需要 COUNT(*)
+    """
+    # 统计的作者，每位作者一行
+    author = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='post_stat', verbose_name='作者')
+    
+    # 已发布文章数
+    post_count = models.PositiveIntegerField(default=0, verbose_name='文章数')
+    
+    # 最近一篇已发布文章的创建时间
+    last_post_at = models.DateTimeField(null=True, blank=True, verbose_name='最近发布时间')
+    
+    # 统计更新时间，作为作者页面条件请求的版本
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
+    
+    class Meta:
+        verbose_name = '作者文章统计'
+        verbose_name_plural = '作者文章统计'
+    
+    def __str__(self):
+        """
+        定义模型实例的字符串表示，返回作者ID和文章数
+        """
+        return f'{self.author_id}: {self.post_count}'
+
+
+class MonthlyPostStat(models.Model):
+    """
+    按月文章统计表，保存每个月（按 TIME_ZONE 时区划分）的已发布文章数
+    归档侧边栏直接读取这张小表，不需要每次请求都对文章表 GROUP BY
+    """
+    # 年份和月份
+    year = models.PositiveSmallIntegerField(verbose_name='年')
+    month = models.PositiveSmallIntegerField(verbose_name='月')
+    
+    # 已发布文章数
+    post_count = models.PositiveIntegerField(default=0, verbose_name='文章数')
+    
+    # 统计更新时间，作为归档页面条件请求的版本
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
+    
+    class Meta:
+        verbose_name = '月度文章统计'
+        verbose_name_plural = '月度文章统计'
+        ordering = ['-year', '-month']
+        constraints = [
+            models.UniqueConstraint(fields=['year', 'month'], name='blog_monthlypoststat_month_uniq'),
+        ]
+    
+    def __str__(self):
+        """
+        定义模型实例的字符串表示，返回年月和文章数
+        """
+        return f'{self.year}-{self.month:02d}: {self.post_count}'
+    
+    def get_absolute_url(self):
+        """
+        获取该月归档页面的URL
+        """
+        return reverse('blog:archive_month', args=[self.year, self.month])
+
+
+class Attachment(models.Model):
+    """
+    上传附件模型，文件按内容的SHA-256寻址保存
+    相同内容的文件只保存一份，重复上传直接返回已有的附件
+    """
+    # 文件内容的SHA-256摘要（十六进制），同时决定文件的保存路径
+    sha256 = models.CharField(max_length=64, unique=True, verbose_name='SHA-256')
+    
+    # 文件字节数
+    size = models.PositiveBigIntegerField(verbose_name='大小')
+    
+    # 根据文件头识别的内容类型
+    content_type = models.CharField(max_length=100, verbose_name='内容类型')
+    
+    # 首次上传时的文件名
+    original_name = models.CharField(max_length=255, blank=True, default='', verbose_name='原始文件名')
+    
+    # 图片尺寸，由缩略图任务填写
+    width = models.PositiveIntegerField(null=True, blank=True, verbose_name='宽度')
+    height = models.PositiveIntegerField(null=True, blank=True, verbose_name='高度')
+    
+    # 已生成的缩略图宽度列表
+    thumbnails = models.JSONField(default=list, blank=True, verbose_name='缩略图')
+    
+    # 首次上传的用户
+    uploaded_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, verbose_name='上传者')
+    
+    # 上传时间
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='上传时间')
+    
+    class Meta:
+        verbose_name = '附件'
+        verbose_name_plural = '附件'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        """
+        定义模型实例的字符串表示，返回原始文件名或摘要
+        """
+        return self.original_name or self.sha256
+    
+    @property
+    def is_image(self):
+        """
+        判断附件是否为图片
+        """
+        return self.content_type.startswith('image/')
+    
+    def get_absolute_url(self):
+        """
+        获取附件的下载URL
+        """
+        return reverse('blog:attachment_file', args=[self.sha256])
+
+
+class RequestStat(models.Model):
+    """
+    访问统计汇总表，由 ingest_logs 命令从访问日志汇总而来
+    每天每个路由（方法 + URL名称）一行，延迟保存为固定分桶的直方图，
+    日志文件按保留期删除后统计仍然保留
+    """
+    # 日期（日志中的本地日期）
+    day = models.DateField(verbose_name='日期')
+    
+    # 请求方法和路由名称，未匹配URL配置的请求路由名称为 -
+    method = models.CharField(max_length=10, verbose_name='方法')
+    route = models.CharField(max_length=200, verbose_name='路由')
+    
+    # 请求数，以及其中4xx和5xx响应的数量
+    count = models.PositiveIntegerField(default=0, verbose_name='请求数')
+    client_errors = models.PositiveIntegerField(default=0, verbose_name='4xx数')
+    server_errors = models.PositiveIntegerField(default=0, verbose_name='5xx数')
+    
+    # 总耗时和最大耗时（毫秒）
+    total_ms = models.FloatField(default=0, verbose_name='总耗时')
+    max_ms = models.FloatField(default=0, verbose_name='最大耗时')
+    
+    # 延迟直方图，第i个元素是耗时不超过 blog.logstats.LATENCY_BUCKETS[i] 的请求数，最后一个元素是超出的请求数
+    buckets = models.JSONField(default=list, verbose_name='延迟分布')
+    
+    class Meta:
+        verbose_name = '访问统计'
+        verbose_name_plural = '访问统计'
+        ordering = ['-day', 'route', 'method']
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'method', 'route'], name='blog_requeststat_route_uniq'),
+        ]
+    
+    def __str__(self):
+        """
+        定义模型实例的字符串表示，返回日期、路由和请求数
+        """
+        return f'{self.day} {self.method} {self.route}: {self.count}'
+
+
+class LogFileState(models.Model):
+    """
+    日志文件的读取进度，ingest_logs 命令从上次的位置继续读取
+    以去掉压缩后缀的文件名为键，日志被压缩后仍然从同一位置继续
+    """
+    # 去掉 .gz/.bz2/.xz 后缀的文件名
+    name = models.CharField(max_length=255, unique=True, verbose_name='文件名')
+    
+    # 第一行内容的摘要，同名文件被替换时从头读取
+    head = models.CharField(max_length=40, blank=True, default='', verbose_name='首行摘要')
+    
+    # 已读取的（解压后的）字节数，只计算完整的行
+    offset = models.PositiveBigIntegerField(default=0, verbose_name='读取位置')
+    
+    # 上次读到文件末尾时的实际文件名和文件大小，都没有变化时跳过该文件
+    source = models.CharField(max_length=255, blank=True, default='', verbose_name='实际文件名')
+    size = models.PositiveBigIntegerField(default=0, verbose_name='文件大小')
+    
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
+    
+    class Meta:
+        verbose_name = '日志读取进度'
+        verbose_name_plural = '日志读取进度'
+    
+    def __str__(self):
+        """
+        定义模型实例的字符串表示，返回文件名和读取位置
+        """
+        return f'{self.name}@{self.offset}'
@@ -0,0 +1,180 @@
+"""
+事务性发件箱
+
+文章或评论修改时，在同一个数据库事务中写入 OutboxEvent，事务回滚时事件也一并回滚；
+drain_outbox 工作进程按写入顺序批量读取事件，把同一主题下同一篇文章的多次事件合并为一次，
+再交给注册的消费函数处理。消费成功后才标记事件为已处理，失败的事件会重新投递，
+因此消费函数必须是幂等的（根据文章的当前状态重新计算，而不是累加）。
+
+一个主题的一批事件消费失败时逐篇文章重试，只有失败的文章的事件按指数退避推迟投递，
+同一批的其他文章和队列中后面的事件照常处理；失败 MAX_ATTEMPTS 次后放弃（死信），
+事件标记为已处理并保留错误信息，不再占用队列。
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from utils.logger import logger
+from .models import OutboxEvent
+
+# 已注册的消费函数，键为事件主题，值为消费函数列表
+_consumers = defaultdict(list)
+
+# 事件最多消费的次数，超过后作为死信放弃
+MAX_ATTEMPTS = 5
+
+
+def consumer(topic):
+    """
+    装饰器：把函数注册为指定主题的消费函数
+    消费函数接收去重后的文章ID列表作为唯一参数
+
+    参数:
+        topic (str): 事件主题
+
+    返回:
+        callable: 原样返回被装饰的函数
+    """
+    def decorator(func):
+        _consumers[topic].append(func)
+        return func
+    return decorator
+
+
+def record(topic, post_id, **payload):
+    """
+    写入一条发件箱事件
+    调用方应处于保存业务数据的同一个事务中
+
+    参数:
+        topic (str): 事件主题
+        post_id (int): 关联的文章ID
+        **payload: 事件附带的数据
+
+    返回:
+        OutboxEvent: 新写入的事件对象
+    """
+    return OutboxEvent.objects.create(topic=topic, post_id=post_id, payload=payload)
+
+
+def record_many(topic, post_ids):
+    """
+    用一条 INSERT 为多篇文章写入发件箱事件，用于批量操作
+    调用方应处于修改业务数据的同一个事务中
+
+    参数:
+        topic (str): 事件主题
+        post_ids (iterable): 关联的文章ID
+
+    返回:
+        int: 写入的事件数
+    """
+    events = [OutboxEvent(topic=topic, post_id=post_id) for post_id in post_ids]
+    OutboxEvent.objects.bulk_create(events)
+    return len(events)
+
+
+def _retry_delay(attempts):
+    """
+    计算第 attempts 次失败后的重试等待时间（指数退避）
+    """
+    base = getattr(settings, 'OUTBOX_RETRY_BASE_SECONDS', 10)
+    return timedelta(seconds=base * 2 ** (attempts - 1))
+
+
+def _consume(topic, post_ids):
+    """
+    把文章ID列表交给主题的全部消费函数
+    """
+    for func in _consumers.get(topic, []):
+        func(post_ids)
+
+
+def _fail(topic, events, exc):
+    """
+    记录一组事件消费失败：未达到最大次数的事件推迟重试，其余事件作为死信标记为已处理
+
+    参数:
+        topic (str): 事件主题
+        events (list): (事件ID, 已失败次数) 列表
+        exc (Exception): 消费时抛出的异常
+    """
+    now = timezone.now()
+    by_attempts = defaultdict(list)
+    for event_id, attempts in events:
+        by_attempts[attempts + 1].append(event_id)
+    for attempts, ids in by_attempts.items():
+        failed = OutboxEvent.objects.filter(pk__in=ids)
+        if attempts >= MAX_ATTEMPTS:
+            failed.update(attempts=attempts, processed_at=now, last_error=repr(exc))
+            logger.error(f'发件箱主题 {topic} 的 {len(ids)} 个事件多次消费失败，已放弃: {exc!r}')
+        else:
+            retry_at = now + _retry_delay(attempts)
+            failed.update(attempts=attempts, available_at=retry_at, last_error=repr(exc))
+            logger.warning(f'发件箱主题 {topic} 消费失败，{len(ids)} 个事件将在 {retry_at} 重新投递: {exc!r}')
+
+
+def drain(batch_size=500):
+    """
+    读取并消费一批已到投递时间的事件
+
+    参数:
+        batch_size (int): 每批最多读取的事件数
+
+    返回:
+        tuple: (读取的事件数, 成功处理的事件数)；读取数为0表示没有到期的事件，
+            消费失败或推迟的事件只计入读取数
+    """
+    now = timezone.now()
+    rows = list(
+        OutboxEvent.objects.filter(processed_at__isnull=True, available_at__lte=now)
+        .order_by('id')
+        .values_list('id', 'topic', 'post_id', 'attempts')[:batch_size]
+    )
+    # 按主题和文章分组，同一主题下的文章ID去重并保持首次出现的顺序
+    events = defaultdict(lambda: defaultdict(list))
+    for event_id, topic, post_id, attempts in rows:
+        events[topic][post_id].append((event_id, attempts))
+
+    read = len(rows)
+    processed = 0
+    for topic, by_post in events.items():
+        try:
+            _consume(topic, list(by_post))
+            done = [event for post_events in by_post.values() for event in post_events]
+        except Exception as exc:
+            if len(by_post) == 1:
+                _fail(topic, next(iter(by_post.values())), exc)
+                continue
+            # 逐篇文章重试，找出导致失败的文章，其余文章的事件照常完成
+            logger.warning(f'发件箱主题 {topic} 批量消费失败，逐篇文章重试: {exc!r}')
+            done = []
+            for post_id, post_events in by_post.items():
+                try:
+                    _consume(topic, [post_id])
+                except Exception as error:
+                    _fail(topic, post_events, error)
+                    continue
+                done.extend(post_events)
+        processed += OutboxEvent.objects.filter(pk__in=[event_id for event_id, _ in done]).update(
+            processed_at=timezone.now(), last_error='',
+        )
+    return read, processed
+
+
+def prune(days):
+    """
+    删除处理完成超过指定天数的事件，死信保留以便排查
+
+    参数:
+        days (int): 保留天数
+
+    返回:
+        int: 删除的事件数
+    """
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = OutboxEvent.objects.filter(processed_at__lt=cutoff, last_error='').delete()
+    return deleted
@@ -0,0 +1,147 @@
+"""
+分页工具
+
+- 基于游标的键集分页：按 (created_at, id) 排序，游标记录上一页最后一行的排序键，下一页用
+  WHERE (created_at, id) < 游标 直接定位，深翻页不需要 OFFSET 扫描前面的行，
+  且始终可以走 (created_at, id) 索引。
+- EstimatedCountPaginator：管理后台列表页使用的分页器，大表不执行精确的 COUNT(*)。
+"""
+
+import base64
+from datetime import datetime
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Max, Q
+from django.utils.functional import cached_property
+
+
+def encode_cursor(created_at, pk):
+    """
+    把排序键编码为URL安全的不透明游标
+
+    参数:
+        created_at (datetime): 最后一行的创建时间
+        pk (int): 最后一行的主键ID
+
+    返回:
+        str: 游标字符串
+    """
+    raw = f'{created_at.isoformat()}|{pk}'.encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    解码游标
+
+    参数:
+        cursor (str): encode_cursor 生成的游标
+
+    返回:
+        tuple: (created_at, pk)
+
+    异常:
+        ValueError: 游标格式不正确时抛出
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('utf-8')
+        created_at, pk = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise ValueError('无效的分页游标') from exc
+
+
+def paginate_keyset(queryset, cursor=None, size=20, descending=True):
+    """
+    对查询集做键集分页
+
+    参数:
+        queryset (QuerySet): 待分页的查询集，可以是 values() 查询
+        cursor (str): 上一页返回的游标，为空表示第一页
+        size (int): 每页行数
+        descending (bool): 是否按时间倒序
+
+    返回:
+        tuple: (本页行列表, 下一页游标或None)
+
+    异常:
+        ValueError: 游标格式不正确时抛出
+    """
+    if descending:
+        queryset = queryset.order_by('-created_at', '-id')
+    else:
+        queryset = queryset.order_by('created_at', 'id')
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        if descending:
+            queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+        else:
+            queryset = queryset.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk))
+    # 多取一行判断是否还有下一页
+    rows = list(queryset[:size + 1])
+    if len(rows) <= size:
+        return rows, None
+    rows = rows[:size]
+    last = rows[-1]
+    if isinstance(last, dict):
+        return rows, encode_cursor(last['created_at'], last['id'])
+    return rows, encode_cursor(last.created_at, last.pk)
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    使用估算总数的分页器
+
+    没有过滤条件时从数据库的统计信息读取表的估算行数（PostgreSQL 的 pg_class.reltuples、
+    MySQL 的 information_schema.TABLES.TABLE_ROWS，其他数据库用最大主键），不扫描整张表；
+    有过滤条件时最多数到 count_limit 行，超过后总数按 count_limit 计算，只能翻到前面的页。
+    估算值小于 exact_threshold 时仍然执行精确计数，小表的页数是准确的。
+    """
+    # 估算行数低于该值时执行精确计数
+    exact_threshold = 10000
+
+    # 有过滤条件时最多数的行数
+    count_limit = 10000
+
+    @cached_property
+    def count(self):
+        """
+        返回总行数（大表为估算值）
+        """
+        queryset = self.object_list
+        if queryset.query.where:
+            return queryset.order_by()[:self.count_limit].count()
+        estimate = self._estimate(queryset)
+        if estimate is None or estimate < self.exact_threshold:
+            return queryset.count()
+        return estimate
+
+    def _estimate(self, queryset):
+        """
+        读取表的估算行数，无法估算时返回None
+        """
+        model = queryset.model
+        connection = connections[queryset.db]
+        table = model._meta.db_table
+        if connection.vendor == 'postgresql':
+            sql = 'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass'
+        elif connection.vendor == 'mysql':
+            sql = (
+                'SELECT TABLE_ROWS FROM information_schema.TABLES '
+                'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s'
+            )
+        else:
+            sql = None
+        if sql is not None:
+            with connection.cursor() as cursor:
+                cursor.execute(sql, [table])
+                row = cursor.fetchone()
+            # PostgreSQL 从未 ANALYZE 过的表返回 -1
+            if row is None or row[0] is None or row[0] < 0:
+                return None
+            return row[0]
+        if model._meta.pk.get_internal_type() in ('AutoField', 'BigAutoField'):
+            # 自增主键的最大值用主键索引直接读取，删除较多时偏大
+            return queryset.order_by().aggregate(top=Max('pk'))['top'] or 0
+        return None
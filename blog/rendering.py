@@ -0,0 +1,357 @@
+"""
+文章内容的 Markdown 渲染
+
+渲染器可以通过 MARKDOWN_RENDERER 设置替换，每个渲染器有名称和版本号。
+文章保存时把内容编译为HTML并记录渲染键（内容摘要 + 渲染器名称和版本），
+请求时直接输出编译好的HTML；只有内容或渲染器版本变化时才重新渲染。
+
+内置渲染器支持常用的 Markdown 语法，代码块使用 Pygments 高亮。
+它只输出自己生成的标签，所有文本都经过转义，链接只允许安全的协议，
+因此输出不需要再做HTML清洗。
+"""
+
+import hashlib
+import html
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+from pygments import highlight
+from pygments.formatters import HtmlFormatter
+from pygments.lexers import get_lexer_by_name
+from pygments.util import ClassNotFound
+
+from myblog import metrics
+
+# 渲染结果在缓存中的键前缀，相同内容的文章（例如恢复历史版本）共用渲染结果
+RENDER_CACHE_PREFIX = 'blog:md:'
+
+# 代码高亮的CSS类名
+HIGHLIGHT_CSS_CLASS = 'highlight'
+
+# 链接允许的协议，其余协议（javascript: 等）的链接只保留文本
+SAFE_URL_RE = re.compile(r'^(https?://|mailto:|/|#|\.{0,2}/|[^:/?#]+(?:[/?#]|$))', re.IGNORECASE)
+
+FENCE_RE = re.compile(r'^(`{3,}|~{3,})\s*([\w+#.-]*)\s*$')
+HEADING_RE = re.compile(r'^(#{1,6})\s+(.*?)\s*#*\s*$')
+HR_RE = re.compile(r'^\s{0,3}([-*_])(\s*\1){2,}\s*$')
+BULLET_RE = re.compile(r'^\s{0,3}[-*+]\s+(.*)$')
+ORDERED_RE = re.compile(r'^\s{0,3}\d{1,9}[.)]\s+(.*)$')
+QUOTE_RE = re.compile(r'^\s{0,3}>\s?(.*)$')
+
+# 行内语法，依次为：代码、图片、链接、自动链接
+INLINE_TOKEN_RE = re.compile(
+    r'(?P<code>(`+)(?P<code_text>.+?)(?<!`)\2(?!`))'
+    r'|!\[(?P<img_alt>[^\]]*)\]\((?P<img_url>[^)\s]+)(?:\s+"(?P<img_title>[^"]*)")?\)'
+    r'|\[(?P<link_text>[^\]]+)\]\((?P<link_url>[^)\s]+)(?:\s+"(?P<link_title>[^"]*)")?\)'
+    r'|<(?P<auto_url>https?://[^\s<>]+)>'
+)
+EMPHASIS_RULES = [
+    (re.compile(r'\*\*(?=\S)(.+?)(?<=\S)\*\*'), r'<strong>\1</strong>'),
+    (re.compile(r'__(?=\S)(.+?)(?<=\S)__'), r'<strong>\1</strong>'),
+    (re.compile(r'~~(?=\S)(.+?)(?<=\S)~~'), r'<del>\1</del>'),
+    (re.compile(r'\*(?=\S)(.+?)(?<=\S)\*'), r'<em>\1</em>'),
+    (re.compile(r'(?<![\w])_(?=\S)(.+?)(?<=\S)_(?![\w])'), r'<em>\1</em>'),
+]
+# 行内占位符使用控制字符 NUL，render 先把输入中的 NUL 替换为 U+FFFD，占位符不会与文本冲突
+PLACEHOLDER = '\x00{}\x00'
+PLACEHOLDER_RE = re.compile('\x00(\\d+)\x00')
+
+
+class BuiltinMarkdownRenderer:
+    """
+    内置的 Markdown 渲染器，没有第三方依赖（代码高亮使用 Pygments）
+
+    支持：标题、段落（段内换行保留为 <br>）、强调、删除线、行内代码、
+    围栏代码块和缩进代码块、引用、有序和无序列表、分隔线、链接、图片。
+    """
+    name = 'builtin'
+    # 修改输出格式时递增版本号，已保存的HTML会被识别为过期并重新渲染
+    version = 1
+
+    def render(self, text):
+        """
+        把 Markdown 文本渲染为HTML
+
+        参数:
+            text (str): Markdown 文本
+
+        返回:
+            str: 安全的HTML
+        """
+        # 与浏览器解析HTML时的处理相同，NUL 替换为 U+FFFD
+        text = text.replace('\x00', '\ufffd')
+        lines = text.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+        return '\n'.join(self._blocks(lines))
+
+    def _blocks(self, lines):
+        """
+        逐块解析，返回每个块的HTML片段列表
+        """
+        out = []
+        i = 0
+        while i < len(lines):
+            line = lines[i]
+            if not line.strip():
+                i += 1
+                continue
+            fence = FENCE_RE.match(line.strip())
+            if fence:
+                marker, language = fence.groups()
+                i += 1
+                code = []
+                while i < len(lines) and not lines[i].strip().startswith(marker):
+                    code.append(lines[i])
+                    i += 1
+                i += 1
+                out.append(self._code_block('\n'.join(code), language))
+                continue
+            if line.startswith('    ') or line.startswith('\t'):
+                code = []
+                while i < len(lines) and (lines[i].startswith(('    ', '\t')) or not lines[i].strip()):
+                    code.append(lines[i][4:] if lines[i].startswith('    ') else lines[i][1:])
+                    i += 1
+                out.append(self._code_block('\n'.join(code).rstrip('\n'), ''))
+                continue
+            heading = HEADING_RE.match(line)
+            if heading:
+                level = len(heading.group(1))
+                out.append(f'<h{level}>{self._inline(heading.group(2))}</h{level}>')
+                i += 1
+                continue
+            if HR_RE.match(line):
+                out.append('<hr>')
+                i += 1
+                continue
+            if QUOTE_RE.match(line):
+                quoted = []
+                while i < len(lines) and lines[i].strip() and QUOTE_RE.match(lines[i]):
+                    quoted.append(QUOTE_RE.match(lines[i]).group(1))
+                    i += 1
+                out.append('<blockquote>\n' + '\n'.join(self._blocks(quoted)) + '\n</blockquote>')
+                continue
+            for pattern, tag in ((BULLET_RE, 'ul'), (ORDERED_RE, 'ol')):
+                if pattern.match(line):
+                    items = []
+                    while i < len(lines) and lines[i].strip():
+                        item = pattern.match(lines[i])
+                        if item:
+                            items.append([item.group(1)])
+                        elif lines[i].startswith((' ', '\t')):
+                            # 缩进的续行属于上一个列表项
+                            items[-1].append(lines[i].strip())
+                        else:
+                            break
+                        i += 1
+                    body = ''.join(f'<li>{self._inline(" ".join(item))}</li>' for item in items)
+                    out.append(f'<{tag}>{body}</{tag}>')
+                    break
+            else:
+                paragraph = []
+                while i < len(lines) and lines[i].strip() and not self._starts_block(lines[i]):
+                    paragraph.append(lines[i].strip())
+                    i += 1
+                if not paragraph:
+                    # 无法识别为其他块的行按段落处理，保证每次循环都有进展
+                    paragraph.append(line.strip())
+                    i += 1
+                out.append('<p>' + '<br>\n'.join(self._inline(part) for part in paragraph) + '</p>')
+        return out
+
+    def _starts_block(self, line):
+        """
+        判断一行是否开始一个新的非段落块
+        """
+        return bool(
+            FENCE_RE.match(line.strip()) or HEADING_RE.match(line) or HR_RE.match(line)
+            or QUOTE_RE.match(line) or BULLET_RE.match(line) or ORDERED_RE.match(line)
+        )
+
+    def _code_block(self, code, language):
+        """
+        渲染代码块，指定了已知语言时使用 Pygments 高亮
+        """
+        lexer = _lexer(language.lower()) if language else None
+        if lexer is not None:
+            return highlight(code, lexer, _formatter())
+        return f'<pre><code>{html.escape(code)}</code></pre>'
+
+    def _inline(self, text):
+        """
+        渲染行内语法
+
+        代码、链接和图片先替换为占位符，其余文本转义后再处理强调，最后还原占位符，
+        保证代码内容不会被当作强调语法，也不会有未转义的文本进入输出。
+        """
+        stash = []
+
+        def keep(fragment):
+            stash.append(fragment)
+            return PLACEHOLDER.format(len(stash) - 1)
+
+        def token(match):
+            if match.group('code'):
+                return keep(f'<code>{html.escape(match.group("code_text").strip())}</code>')
+            if match.group('img_url') is not None:
+                url = _safe_url(match.group('img_url'))
+                if url is None:
+                    return keep(html.escape(match.group('img_alt')))
+                title = match.group('img_title')
+                title_attr = f' title="{html.escape(title)}"' if title else ''
+                return keep(
+                    f'<img src="{html.escape(url)}" alt="{html.escape(match.group("img_alt"))}"'
+                    f'{title_attr} loading="lazy">'
+                )
+            if match.group('link_url') is not None:
+                label = self._inline(match.group('link_text'))
+                url = _safe_url(match.group('link_url'))
+                if url is None:
+                    return keep(label)
+                title = match.group('link_title')
+                title_attr = f' title="{html.escape(title)}"' if title else ''
+                return keep(f'<a href="{html.escape(url)}"{title_attr}{_rel(url)}>{label}</a>')
+            url = match.group('auto_url')
+            return keep(f'<a href="{html.escape(url)}"{_rel(url)}>{html.escape(url)}</a>')
+
+        text = INLINE_TOKEN_RE.sub(token, text)
+        text = html.escape(text, quote=False)
+        for pattern, replacement in EMPHASIS_RULES:
+            text = pattern.sub(replacement, text)
+        return PLACEHOLDER_RE.sub(lambda match: stash[int(match.group(1))], text)
+
+
+class PythonMarkdownRenderer:
+    """
+    使用 Python-Markdown 渲染并用 nh3 清洗输出的渲染器
+
+    需要安装 markdown、nh3（以及代码高亮用的 Pygments）。
+    """
+    name = 'python-markdown'
+    version = 1
+
+    def __init__(self):
+        try:
+            import markdown
+            import nh3
+        except ImportError as exc:
+            raise ImproperlyConfigured('PythonMarkdownRenderer 需要安装 markdown 和 nh3') from exc
+        self._markdown = markdown
+        self._nh3 = nh3
+
+    def render(self, text):
+        """
+        把 Markdown 文本渲染为清洗后的HTML
+        """
+        raw = self._markdown.markdown(
+            text, extensions=['fenced_code', 'codehilite', 'tables', 'nl2br'],
+            extension_configs={'codehilite': {'css_class': HIGHLIGHT_CSS_CLASS}},
+        )
+        return self._nh3.clean(raw, attributes={'*': {'class'}, 'a': {'href', 'title'}, 'img': {'src', 'alt', 'title'}})
+
+
+def _safe_url(url):
+    """
+    检查链接地址的协议，不安全的地址返回None
+    """
+    return url if SAFE_URL_RE.match(url) else None
+
+
+def _rel(url):
+    """
+    外部链接添加 rel 属性
+    """
+    return ' rel="nofollow noopener"' if url.lower().startswith(('http://', 'https://')) else ''
+
+
+@lru_cache(maxsize=128)
+def _lexer(language):
+    """
+    按语言名称查找 Pygments 词法分析器，查找结果在进程内缓存
+
+    返回:
+        Lexer: 词法分析器，未知语言返回None
+    """
+    try:
+        return get_lexer_by_name(language)
+    except ClassNotFound:
+        return None
+
+
+@lru_cache(maxsize=None)
+def _formatter():
+    """
+    返回共用的 Pygments HTML 格式化器
+    """
+    return HtmlFormatter(cssclass=HIGHLIGHT_CSS_CLASS)
+
+
+@lru_cache(maxsize=None)
+def highlight_css():
+    """
+    返回代码高亮的CSS，只在进程内生成一次
+    """
+    return _formatter().get_style_defs(f'.{HIGHLIGHT_CSS_CLASS}')
+
+
+@lru_cache(maxsize=None)
+def get_renderer():
+    """
+    返回 MARKDOWN_RENDERER 设置指定的渲染器实例，进程内只创建一次
+    """
+    path = getattr(settings, 'MARKDOWN_RENDERER', 'blog.rendering.BuiltinMarkdownRenderer')
+    return import_string(path)()
+
+
+def render_key(text, renderer=None):
+    """
+    计算渲染键：内容摘要加渲染器名称和版本
+    内容和渲染器都没有变化时渲染键不变，不需要重新渲染
+
+    参数:
+        text (str): Markdown 文本
+        renderer: 渲染器，默认使用当前配置的渲染器
+
+    返回:
+        str: 64个字符以内的渲染键
+    """
+    renderer = renderer or get_renderer()
+    digest = hashlib.blake2b(text.encode('utf-8'), digest_size=20).hexdigest()
+    return f'{renderer.name}:{renderer.version}:{digest}'[:64]
+
+
+def render_markdown(text):
+    """
+    渲染 Markdown 文本并返回 (HTML, 渲染键)，相同渲染键的结果从缓存读取
+
+    参数:
+        text (str): Markdown 文本
+
+    返回:
+        tuple: (HTML, 渲染键)
+    """
+    renderer = get_renderer()
+    key = render_key(text, renderer)
+    cached = cache.get(RENDER_CACHE_PREFIX + key)
+    metrics.record_cache('markdown', cached is not None)
+    if cached is not None:
+        return cached, key
+    rendered = renderer.render(text)
+    cache.set(RENDER_CACHE_PREFIX + key, rendered, 24 * 3600)
+    return rendered, key
+
+
+def render_many(items):
+    """
+    进程池工作函数：渲染一批 (文章ID, 内容)，不访问数据库和缓存
+
+    参数:
+        items (list): (文章ID, Markdown 文本) 列表
+
+    返回:
+        list: (文章ID, HTML, 渲染键) 列表
+    """
+    renderer = get_renderer()
+    return [(pk, renderer.render(text), render_key(text, renderer)) for pk, text in items]
@@ -0,0 +1,208 @@
+"""
+文章历史版本的存储与重建
+
+版本数据使用zlib压缩：快照保存完整文本，其余版本保存相对上一个版本的增量操作
+（格式见 blog.diffs）。连续增量达到 REVISION_SNAPSHOT_INTERVAL - 1 个之后写入新的快照，
+因此重建任意版本只需读取一个快照和不超过一个间隔的增量。
+"""
+
+import json
+import zlib
+from datetime import timedelta
+from difflib import unified_diff
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .diffs import apply_ops, compute_ops
+from .models import PostRevision
+
+
+def _snapshot_interval():
+    """
+    读取快照间隔配置，至少为1
+    """
+    return max(1, getattr(settings, 'REVISION_SNAPSHOT_INTERVAL', 20))
+
+
+def encode_snapshot(content):
+    """
+    把完整文本编码为压缩快照
+    """
+    return zlib.compress(content.encode('utf-8'))
+
+
+def encode_delta(old, new):
+    """
+    把 old 到 new 的增量编码为压缩数据
+    """
+    ops = compute_ops(old, new)
+    return zlib.compress(json.dumps(ops, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+
+def _apply(content, is_snapshot, data):
+    """
+    解码一行版本数据：快照直接返回文本，增量应用到上一版本的内容上
+    """
+    raw = zlib.decompress(bytes(data)).decode('utf-8')
+    return raw if is_snapshot else apply_ops(content, json.loads(raw))
+
+
+def rebuild(rows):
+    """
+    从快照开始依次应用增量，重建最后一行对应版本的内容
+
+    参数:
+        rows (iterable): 按版本号升序排列的 (is_snapshot, data) 序列，第一行必须是快照
+
+    返回:
+        str: 重建后的文本
+    """
+    content = None
+    for is_snapshot, data in rows:
+        content = _apply(content, is_snapshot, data)
+    return content
+
+
+def get_revision_content(post_id, number):
+    """
+    重建文章指定版本的内容
+
+    参数:
+        post_id (int): 文章主键ID
+        number (int): 版本号
+
+    返回:
+        str: 该版本的内容，版本不存在时返回None
+    """
+    snapshot = (
+        PostRevision.objects.filter(post_id=post_id, number__lte=number, is_snapshot=True)
+        .order_by('-number').values_list('number', flat=True).first()
+    )
+    if snapshot is None:
+        return None
+    rows = list(
+        PostRevision.objects.filter(post_id=post_id, number__gte=snapshot, number__lte=number)
+        .order_by('number').values_list('number', 'is_snapshot', 'data')
+    )
+    if rows[-1][0] != number:
+        return None
+    return rebuild((is_snapshot, data) for _, is_snapshot, data in rows)
+
+
+def record_revision(post, author=None):
+    """
+    为文章的当前内容记录一个新版本，内容没有变化时不记录
+    调用方应处于保存文章的同一个事务中
+
+    参数:
+        post (Post): 已保存的文章对象
+        author (User): 保存该版本的用户
+
+    返回:
+        PostRevision: 新记录的版本，内容未变化时返回None
+    """
+    latest = (
+        PostRevision.objects.filter(post=post).order_by('-number')
+        .values_list('number', flat=True).first()
+    )
+    if latest is None:
+        return PostRevision.objects.create(
+            post=post, number=1, is_snapshot=True, data=encode_snapshot(post.content),
+            content_length=len(post.content), author=author,
+        )
+    previous = get_revision_content(post.pk, latest)
+    if previous == post.content:
+        return None
+    # 距离上一个快照的增量个数达到间隔时写入新快照，保证重建成本有上界
+    last_snapshot = (
+        PostRevision.objects.filter(post=post, is_snapshot=True).order_by('-number')
+        .values_list('number', flat=True).first()
+    )
+    chain = PostRevision.objects.filter(post=post, number__gt=last_snapshot).count()
+    is_snapshot = chain + 1 >= _snapshot_interval()
+    data = encode_snapshot(post.content) if is_snapshot else encode_delta(previous, post.content)
+    return PostRevision.objects.create(
+        post=post, number=latest + 1, is_snapshot=is_snapshot, data=data,
+        content_length=len(post.content), author=author,
+    )
+
+
+def diff_revisions(post_id, a, b):
+    """
+    生成两个版本之间的统一格式差异
+
+    参数:
+        post_id (int): 文章主键ID
+        a (int): 旧版本号
+        b (int): 新版本号
+
+    返回:
+        list: 差异文本行列表，任一版本不存在时返回None
+    """
+    old = get_revision_content(post_id, a)
+    new = get_revision_content(post_id, b)
+    if old is None or new is None:
+        return None
+    return list(unified_diff(
+        old.splitlines(), new.splitlines(),
+        fromfile=f'v{a}', tofile=f'v{b}', lineterm='',
+    ))
+
+
+def compact_post(post_id, keep=50, older_than_days=30):
+    """
+    压缩一篇文章的历史版本
+
+    最近的 keep 个版本以及 older_than_days 天内的版本全部保留；
+    更早的版本每天只保留当天最后一个版本，被合并掉的版本删除，
+    保留下来的版本重新计算增量并按快照间隔重新放置快照。
+
+    参数:
+        post_id (int): 文章主键ID
+        keep (int): 无条件保留的最近版本数
+        older_than_days (int): 早于该天数的版本才会被合并
+
+    返回:
+        int: 删除的版本数
+    """
+    with transaction.atomic():
+        revisions = list(PostRevision.objects.filter(post_id=post_id).order_by('number'))
+        if len(revisions) <= keep:
+            return 0
+        cutoff = timezone.now() - timedelta(days=older_than_days)
+        protected = {revision.pk for revision in revisions[-keep:]} if keep else set()
+
+        # 第一遍：顺序重建每个版本的内容，并确定保留哪些版本
+        contents = {}
+        content = None
+        kept = []
+        for index, revision in enumerate(revisions):
+            content = _apply(content, revision.is_snapshot, revision.data)
+            contents[revision.pk] = content
+            following = revisions[index + 1] if index + 1 < len(revisions) else None
+            same_day = (
+                following is not None
+                and following.created_at.date() == revision.created_at.date()
+            )
+            if revision.pk in protected or revision.created_at >= cutoff or not same_day:
+                kept.append(revision)
+
+        # 第二遍：为保留的版本重新编码，删除被合并的版本
+        interval = _snapshot_interval()
+        previous = None
+        chain = 0
+        for revision in kept:
+            current = contents[revision.pk]
+            if previous is None or chain + 1 >= interval:
+                revision.is_snapshot, revision.data, chain = True, encode_snapshot(current), 0
+            else:
+                revision.is_snapshot, revision.data = False, encode_delta(previous, current)
+                chain += 1
+            previous = current
+        PostRevision.objects.bulk_update(kept, ['is_snapshot', 'data'])
+        kept_ids = {revision.pk for revision in kept}
+        removed = [revision.pk for revision in revisions if revision.pk not in kept_ids]
+        PostRevision.objects.filter(pk__in=removed).delete()
+        return len(removed)
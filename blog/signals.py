@@ -0,0 +1,54 @@
+"""
+文章和评论的模型信号处理
+
+保存或删除时写入发件箱事件，事件与业务数据处于同一个事务中。
+"""
+
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import archive, outbox, taxonomy
+from .models import Comment, Post, PostTag
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def post_changed(sender, instance, **kwargs):
+    """
+    文章保存或删除后记录 post.changed 事件
+    """
+    outbox.record('post.changed', instance.pk)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def refresh_archive_stats(sender, instance, **kwargs):
+    """
+    文章保存或删除后在同一事务中重新统计所属作者和月份的文章数
+    """
+    archive.refresh_for_posts([(instance.author_id, instance.created_at)])
+
+
+@receiver(pre_delete, sender=Post)
+def remember_post_tags(sender, instance, **kwargs):
+    """
+    文章删除前记下它的标签，关联行会随文章级联删除
+    """
+    instance._deleted_tag_ids = list(PostTag.objects.filter(post=instance).values_list('tag_id', flat=True))
+
+
+@receiver(post_delete, sender=Post)
+def recount_deleted_post_tags(sender, instance, **kwargs):
+    """
+    文章删除后在同一事务中重新统计它原来所属标签的文章数
+    """
+    taxonomy.recount_tags(getattr(instance, '_deleted_tag_ids', []))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_changed(sender, instance, **kwargs):
+    """
+    评论保存或删除后记录 comment.changed 事件，事件按所属文章聚合
+    """
+    outbox.record('comment.changed', instance.post_id)
@@ -0,0 +1,141 @@
+"""
+博客应用的后台任务和发件箱消费函数
+
+这些工作原本需要在 post_create/post_edit 的请求中同步完成：
+定时发布由 run_jobs 工作进程执行，派生数据刷新由 drain_outbox 工作进程消费发件箱事件完成，
+保存文章的请求只负责写入数据和事件。
+"""
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import archive, hits, jobs, outbox, taxonomy, uploads
+from .models import Post
+
+
+def _publish_job_key(post_id):
+    """
+    返回文章定时发布任务的幂等键
+    """
+    return f'publish_post:{post_id}'
+
+
+def schedule_post_jobs(post):
+    """
+    文章保存后入队定时发布任务
+
+    只有发布时间在未来的草稿才入队；已发布、取消了定时或发布时间已经过去的文章
+    （例如定时发布后又被作者下线）删除等待中的任务，不会被重新自动发布。
+
+    参数:
+        post (Post): 刚保存的文章对象
+    """
+    if post.is_scheduled:
+        # 定时发布任务在设定的发布时间执行，修改发布时间会更新已入队的任务
+        jobs.enqueue(
+            'publish_post', {'post_id': post.pk},
+            run_at=post.publish_at, key=_publish_job_key(post.pk),
+        )
+    else:
+        cancel_publish_jobs([post.pk])
+
+
+def cancel_publish_jobs(post_ids):
+    """
+    删除文章等待中的定时发布任务，用于手动发布、下线或删除文章后
+
+    参数:
+        post_ids (iterable): 文章主键ID
+
+    返回:
+        int: 删除的任务数
+    """
+    return jobs.cancel(_publish_job_key(post_id) for post_id in post_ids)
+
+
+@outbox.consumer('post.changed')
+def refresh_excerpts(post_ids):
+    """
+    重新计算一批文章的摘要
+
+    已删除的文章不会被查到，直接跳过。摘要有变化的文章重新统计所属作者和月份，
+    统计行的更新时间随之变化，归档页面的ETag不会继续匹配旧摘要。
+
+    参数:
+        post_ids (list): 去重后的文章主键ID列表
+    """
+    changed = []
+    for post in Post.objects.filter(pk__in=post_ids).only('pk', 'content', 'excerpt'):
+        excerpt = post.make_excerpt()
+        if excerpt != post.excerpt:
+            post.excerpt = excerpt
+            changed.append(post)
+    # 批量只写摘要字段，不修改文章的更新时间，也不会再次触发保存信号
+    Post.objects.bulk_update(changed, ['excerpt'])
+    if changed:
+        archive.refresh_posts([post.pk for post in changed])
+
+
+@jobs.register('publish_post')
+def publish_post(post_id):
+    """
+    到达定时发布时间后发布文章
+
+    任务可能因为发布时间被修改而提前执行，此时不做任何处理，
+    由更新后重新入队的任务负责发布。
+
+    参数:
+        post_id (int): 文章主键ID
+    """
+    with transaction.atomic():
+        published = Post.objects.filter(
+            pk=post_id, published=False, publish_at__lte=timezone.now(),
+        ).update(published=True)
+        if published:
+            # 批量更新不会触发保存信号，需要手动记录发件箱事件
+            outbox.record('post.changed', post_id)
+
+
+@outbox.consumer('post.changed')
+def invalidate_popular(post_ids):
+    """
+    文章修改、下线或删除后重新计算热门排行，读取排行的请求不需要自己计算
+
+    参数:
+        post_ids (list): 去重后的文章主键ID列表
+    """
+    hits.refresh_popular()
+
+
+@outbox.consumer('post.changed')
+def refresh_tag_counts(post_ids):
+    """
+    文章发布或下线后同步标签关联上的发布状态，并重新统计受影响标签的文章数
+
+    参数:
+        post_ids (list): 去重后的文章主键ID列表
+    """
+    taxonomy.refresh_post_tags(post_ids)
+
+
+@outbox.consumer('post.changed')
+def refresh_archive_stats(post_ids):
+    """
+    重新统计文章所属作者和月份的文章数
+    保存信号已经同步更新过统计，这里补上定时发布等批量更新不会触发信号的情况
+
+    参数:
+        post_ids (list): 去重后的文章主键ID列表
+    """
+    archive.refresh_posts(post_ids)
+
+
+@jobs.register('make_thumbnails')
+def make_thumbnails(attachment_id):
+    """
+    为新上传的图片生成响应式缩略图
+
+    参数:
+        attachment_id (int): 附件主键ID
+    """
+    uploads.make_thumbnails(attachment_id)
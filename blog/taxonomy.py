@@ -0,0 +1,206 @@
+"""
+标签和分类的维护
+
+标签关联使用批量语句一次写入；Tag.post_count 只统计受影响的标签，
+在写入时更新，页面渲染直接读取计数和缓存的标签云。
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils.text import slugify
+
+from myblog import metrics
+from .models import Post, PostTag, Tag
+
+# 标签云的缓存键和显示的标签数
+TAG_CLOUD_CACHE_KEY = 'blog:tag-cloud'
+TAG_CLOUD_SIZE = 50
+
+
+def parse_tags(text):
+    """
+    解析逗号分隔的标签文本，支持中英文逗号，去除空白和重复
+
+    参数:
+        text (str): 标签文本
+
+    返回:
+        list: 标签名称列表
+    """
+    names = [name.strip() for name in text.replace('，', ',').split(',')]
+    return list(dict.fromkeys(name[:50] for name in names if name))
+
+
+def _tag_slug(name):
+    """
+    生成标签的基础URL标识，无法转换的名称（例如全是符号）使用 tag
+    """
+    return slugify(name, allow_unicode=True)[:50] or 'tag'
+
+
+def _unique_slugs(names):
+    """
+    为新标签分配不重复的URL标识，与已有标识或同一批的标识冲突时依次加上 -2、-3 等后缀
+    例如 C 和 C++ 的基础标识都是 c，分别得到 c 和 c-2
+
+    参数:
+        names (list): 新标签的名称列表
+
+    返回:
+        dict: 名称到URL标识的映射
+    """
+    bases = {name: _tag_slug(name) for name in names}
+    similar = Q()
+    for base in set(bases.values()):
+        similar |= Q(slug=base) | Q(slug__startswith=f'{base}-')
+    taken = set(Tag.objects.filter(similar).values_list('slug', flat=True))
+    slugs = {}
+    for name, base in bases.items():
+        slug, suffix = base, 1
+        while slug in taken:
+            suffix += 1
+            slug = f'{base}-{suffix}'
+        taken.add(slug)
+        slugs[name] = slug
+    return slugs
+
+
+def get_or_create_tags(names):
+    """
+    批量获取标签，不存在的标签用一条语句创建
+
+    标签按名称查找；新标签的URL标识与已有标签冲突时加后缀，不会因为标识相同而丢失标签。
+    并发创建时另一个请求可能先占用了同一个标识，此时重新分配后再试。
+
+    参数:
+        names (list): 标签名称列表
+
+    返回:
+        list: 标签对象列表，与名称列表的顺序相同
+    """
+    names = list(dict.fromkeys(names))
+    if not names:
+        return []
+    tags = {tag.name: tag for tag in Tag.objects.filter(name__in=names)}
+    for _ in range(3):
+        missing = [name for name in names if name not in tags]
+        if not missing:
+            break
+        slugs = _unique_slugs(missing)
+        Tag.objects.bulk_create(
+            [Tag(name=name, slug=slugs[name]) for name in missing],
+            ignore_conflicts=True,
+        )
+        tags.update((tag.name, tag) for tag in Tag.objects.filter(name__in=missing))
+    return [tags[name] for name in names if name in tags]
+
+
+def recount_tags(tag_ids):
+    """
+    用一条UPDATE重新统计指定标签的已发布文章数，并使当前进程的标签云缓存失效
+    （其他进程的缓存在 TAG_CLOUD_TIMEOUT 秒内过期）
+
+    参数:
+        tag_ids (iterable): 标签主键ID
+    """
+    tag_ids = list(tag_ids)
+    if not tag_ids:
+        return
+    counts = (
+        PostTag.objects.filter(tag=OuterRef('pk'), published=True)
+        .values('tag').annotate(total=Count('id')).values('total')
+    )
+    Tag.objects.filter(pk__in=tag_ids).update(
+        post_count=Coalesce(Subquery(counts, output_field=IntegerField()), Value(0)),
+    )
+    cache.delete(TAG_CLOUD_CACHE_KEY)
+
+
+def set_post_tags(post, names):
+    """
+    把文章的标签设置为指定的名称列表，并同步关联上冗余的发布状态
+    新增的关联用一条 INSERT 写入，移除的关联用一条 DELETE 删除
+
+    参数:
+        post (Post): 已保存的文章对象
+        names (list): 标签名称列表
+    """
+    tags = get_or_create_tags(names)
+    wanted = {tag.pk for tag in tags}
+    current = set(PostTag.objects.filter(post=post).values_list('tag_id', flat=True))
+    removed = current - wanted
+    if removed:
+        PostTag.objects.filter(post=post, tag_id__in=removed).delete()
+    # 保留的关联同步文章当前的发布状态
+    PostTag.objects.filter(post=post).exclude(published=post.published).update(published=post.published)
+    PostTag.objects.bulk_create(
+        [
+            PostTag(post=post, tag_id=tag_id, published=post.published, created_at=post.created_at)
+            for tag_id in wanted - current
+        ],
+        ignore_conflicts=True,
+    )
+    recount_tags(current | wanted)
+
+
+def bulk_assign_tag(tag, post_ids):
+    """
+    把一个标签批量加到多篇文章上，所有关联用一条 INSERT 写入
+
+    参数:
+        tag (Tag): 标签对象
+        post_ids (iterable): 文章主键ID
+
+    返回:
+        int: 新增的关联数
+    """
+    before = PostTag.objects.filter(tag=tag).count()
+    rows = Post.objects.filter(pk__in=list(post_ids)).values_list('pk', 'published', 'created_at')
+    PostTag.objects.bulk_create(
+        [PostTag(post_id=pk, tag=tag, published=published, created_at=created_at) for pk, published, created_at in rows],
+        ignore_conflicts=True,
+    )
+    recount_tags([tag.pk])
+    return PostTag.objects.filter(tag=tag).count() - before
+
+
+def refresh_post_tags(post_ids):
+    """
+    同步文章发布状态到标签关联，并重新统计受影响的标签
+    文章发布、下线或删除后调用；重复调用结果不变
+
+    参数:
+        post_ids (list): 文章主键ID列表
+    """
+    published = Post.objects.filter(pk=OuterRef('post_id')).values('published')[:1]
+    stale = PostTag.objects.filter(post_id__in=post_ids).exclude(published=Subquery(published))
+    tag_ids = set(stale.values_list('tag_id', flat=True))
+    stale.update(published=Subquery(published))
+    recount_tags(tag_ids)
+
+
+def get_tag_cloud():
+    """
+    读取标签云，缓存有效时不查询数据库，缓存 TAG_CLOUD_TIMEOUT 秒
+    字号等级按文章数在1到5之间线性分布
+
+    返回:
+        list: 每项包含 name、slug、post_count、weight
+    """
+    cloud = cache.get(TAG_CLOUD_CACHE_KEY)
+    metrics.record_cache('tag_cloud', cloud is not None)
+    if cloud is not None:
+        return cloud
+    rows = list(
+        Tag.objects.filter(post_count__gt=0).order_by('-post_count')
+        .values('name', 'slug', 'post_count')[:TAG_CLOUD_SIZE]
+    )
+    if rows:
+        low, high = rows[-1]['post_count'], rows[0]['post_count']
+        for row in rows:
+            row['weight'] = 1 + (4 * (row['post_count'] - low) // (high - low) if high > low else 0)
+        rows.sort(key=lambda row: row['name'])
+    cache.set(TAG_CLOUD_CACHE_KEY, rows, settings.TAG_CLOUD_TIMEOUT)
+    return rows
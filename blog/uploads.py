@@ -0,0 +1,386 @@
+"""
+附件上传、存储和下载
+
+上传的文件由 ContentAddressedUploadHandler 按块写入 MEDIA_ROOT 下的临时文件，同时计算SHA-256，
+整个文件不会读入内存；上传完成后按摘要改名到 uploads/ 目录，相同内容只保存一份。
+图片的缩略图由后台任务生成，不占用上传请求的时间。
+下载时完整文件交给 wsgi.file_wrapper（服务器支持时使用 sendfile）或前端服务器发送，
+Range 请求按块读取，每个请求占用的内存与文件大小无关。
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+from django.db import IntegrityError, transaction
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import content_disposition_header
+
+from utils.logger import logger
+from . import jobs
+from .models import Attachment
+
+# 允许上传的文件类型，按文件头识别，不信任客户端提供的类型
+SIGNATURES = [
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'%PDF-', 'application/pdf'),
+]
+
+# 识别文件类型需要读取的文件头字节数
+HEAD_SIZE = 16
+
+# 单段 Range 请求头，例如 bytes=0-499、bytes=500-、bytes=-500
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def sniff_content_type(head):
+    """
+    根据文件头识别内容类型
+
+    参数:
+        head (bytes): 文件开头的字节
+
+    返回:
+        str: 内容类型，不支持的类型返回None
+    """
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    for signature, content_type in SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    return None
+
+
+def _media_root():
+    """
+    返回上传文件的根目录
+    """
+    return Path(settings.MEDIA_ROOT)
+
+
+def blob_path(sha256):
+    """
+    返回附件文件的保存路径，按摘要前缀分两级目录，避免单个目录下文件过多
+
+    参数:
+        sha256 (str): 文件内容的SHA-256摘要
+
+    返回:
+        Path: 文件路径
+    """
+    return _media_root() / 'uploads' / sha256[:2] / sha256[2:4] / sha256
+
+
+def thumbnail_path(sha256, width):
+    """
+    返回指定宽度缩略图的保存路径
+
+    参数:
+        sha256 (str): 原图的SHA-256摘要
+        width (int): 缩略图宽度
+
+    返回:
+        Path: 文件路径
+    """
+    return _media_root() / 'thumbnails' / sha256[:2] / sha256[2:4] / f'{sha256}-{width}'
+
+
+class HashedUploadedFile(UploadedFile):
+    """
+    已经写入临时文件并计算了摘要的上传文件
+    """
+
+    def __init__(self, path, sha256, head, name, content_type, size, charset, content_type_extra=None):
+        super().__init__(open(path, 'rb'), name, content_type, size, charset, content_type_extra)
+        self.sha256 = sha256
+        self.head = head
+        self.path = path
+
+    def temporary_file_path(self):
+        """
+        返回临时文件路径
+        """
+        return self.path
+
+    def close(self):
+        """
+        关闭并删除临时文件；已经被 store 移走时只关闭文件
+        """
+        self.file.close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class ContentAddressedUploadHandler(FileUploadHandler):
+    """
+    按块把上传文件写入磁盘并同时计算SHA-256的上传处理器
+
+    临时文件放在 MEDIA_ROOT 下，保存时可以直接原子改名；
+    超过 ATTACHMENT_MAX_SIZE 时立即停止接收并删除已写入的部分。
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.chunk_size = settings.ATTACHMENT_CHUNK_SIZE
+        self.max_size = settings.ATTACHMENT_MAX_SIZE
+        self.too_large = False
+
+    def new_file(self, *args, **kwargs):
+        """
+        开始接收一个文件，创建临时文件
+        """
+        super().new_file(*args, **kwargs)
+        tmp_dir = _media_root() / 'uploads' / 'tmp'
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        self.file = tempfile.NamedTemporaryFile(dir=tmp_dir, delete=False)
+        self.digest = hashlib.sha256()
+        self.head = b''
+
+    def receive_data_chunk(self, raw_data, start):
+        """
+        写入一块数据，返回None表示数据已经处理，不再交给后续处理器
+        """
+        if start + len(raw_data) > self.max_size:
+            self.too_large = True
+            self._discard()
+            raise StopUpload(connection_reset=True)
+        if len(self.head) < HEAD_SIZE:
+            self.head += raw_data[:HEAD_SIZE - len(self.head)]
+        self.digest.update(raw_data)
+        self.file.write(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        """
+        文件接收完成，返回带摘要的上传文件对象
+        """
+        self.file.close()
+        return HashedUploadedFile(
+            self.file.name, self.digest.hexdigest(), self.head, self.file_name,
+            self.content_type, file_size, self.charset, self.content_type_extra,
+        )
+
+    def upload_interrupted(self):
+        """
+        客户端中断上传时删除临时文件
+        """
+        self._discard()
+
+    def _discard(self):
+        """
+        关闭并删除正在写入的临时文件，已经接收完成的文件由上传文件对象负责删除
+        """
+        file = getattr(self, 'file', None)
+        if file is not None and not file.closed:
+            file.close()
+            try:
+                os.unlink(file.name)
+            except FileNotFoundError:
+                pass
+
+
+def store(upload, user=None):
+    """
+    保存上传文件，相同内容的文件已经存在时直接返回已有的附件
+
+    参数:
+        upload (HashedUploadedFile): 上传处理器生成的文件对象
+        user (User): 上传的用户
+
+    返回:
+        tuple: (附件对象, 是否新建)
+
+    异常:
+        ValueError: 文件类型不受支持时抛出
+    """
+    content_type = sniff_content_type(upload.head)
+    if content_type is None:
+        raise ValueError('不支持的文件类型')
+    existing = Attachment.objects.filter(sha256=upload.sha256).first()
+    if existing:
+        return existing, False
+    path = blob_path(upload.sha256)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    upload.file.close()
+    # 同一文件系统内改名是原子操作，并发上传相同内容时结果也相同
+    os.replace(upload.temporary_file_path(), path)
+    os.chmod(path, 0o644)
+    try:
+        with transaction.atomic():
+            attachment = Attachment.objects.create(
+                sha256=upload.sha256, size=upload.size, content_type=content_type,
+                original_name=(upload.name or '')[:255],
+                uploaded_by=user if user is not None and user.is_authenticated else None,
+            )
+            if attachment.is_image:
+                jobs.enqueue(
+                    'make_thumbnails', {'attachment_id': attachment.pk},
+                    key=f'make_thumbnails:{attachment.pk}',
+                )
+    except IntegrityError:
+        # 另一个请求同时上传了相同内容
+        return Attachment.objects.get(sha256=upload.sha256), False
+    return attachment, True
+
+
+def make_thumbnails(attachment_id):
+    """
+    为图片附件生成 ATTACHMENT_THUMBNAIL_WIDTHS 中比原图窄的各个宽度的缩略图
+    Pillow 是可选依赖，未安装时跳过
+
+    参数:
+        attachment_id (int): 附件主键ID
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        logger.warning(f'未安装Pillow，跳过附件 {attachment_id} 的缩略图')
+        return
+    attachment = Attachment.objects.filter(pk=attachment_id).first()
+    if attachment is None or not attachment.is_image:
+        return
+    source = blob_path(attachment.sha256)
+    with Image.open(source) as image:
+        width, height = image.size
+    made = []
+    for target in sorted(settings.ATTACHMENT_THUMBNAIL_WIDTHS):
+        if target >= width:
+            continue
+        with Image.open(source) as image:
+            # JPEG 直接按缩小的比例解码，避免把整张大图解码到内存
+            image.draft('RGB', (target, height * target // width))
+            image.thumbnail((target, height))
+            if image.mode in ('RGBA', 'LA', 'P'):
+                fmt = 'PNG'
+            else:
+                fmt = 'JPEG'
+                image = image.convert('RGB')
+            path = thumbnail_path(attachment.sha256, target)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile(dir=path.parent, delete=False) as tmp:
+                image.save(tmp, fmt, optimize=True)
+            os.chmod(tmp.name, 0o644)
+            os.replace(tmp.name, path)
+        made.append(target)
+    Attachment.objects.filter(pk=attachment_id).update(width=width, height=height, thumbnails=made)
+
+
+def parse_range(header, size):
+    """
+    解析单段 Range 请求头
+
+    参数:
+        header (str): Range 请求头，可以为空
+        size (int): 文件字节数
+
+    返回:
+        tuple: (起始字节, 结束字节)，均包含在内；没有或无法识别的 Range 返回None，按完整文件响应
+
+    异常:
+        ValueError: 请求的范围超出文件大小时抛出
+    """
+    match = RANGE_RE.match(header or '')
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        # bytes=-N 表示最后N个字节
+        start = max(size - int(last), 0)
+        end = size - 1
+    if start > end or start >= size:
+        raise ValueError('请求的范围无法满足')
+    return start, end
+
+
+def iter_file_range(path, start, length, chunk_size):
+    """
+    按块读取文件的一段
+
+    参数:
+        path (Path): 文件路径
+        start (int): 起始字节
+        length (int): 读取的字节数
+        chunk_size (int): 每块的字节数
+
+    返回:
+        generator: 依次产生文件块
+    """
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def serve_file(request, path, content_type, size, etag, filename='', as_attachment=False):
+    """
+    发送附件文件，支持条件请求和单段 Range 请求
+
+    配置了 ATTACHMENT_SENDFILE_HEADER 时只返回响应头，由前端服务器发送文件（Range 也由前端处理）；
+    否则完整文件使用 FileResponse，由 wsgi.file_wrapper 发送，Range 请求按块流式读取。
+
+    参数:
+        request (HttpRequest): HTTP请求对象
+        path (Path): 文件路径
+        content_type (str): 内容类型
+        size (int): 文件字节数
+        etag (str): 带引号的ETag
+        filename (str): 下载时的文件名
+        as_attachment (bool): 是否作为下载附件而不是内嵌显示
+
+    返回:
+        HttpResponse: 响应对象
+    """
+    if request.headers.get('If-None-Match') == etag:
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+    byte_range = None
+    if request.headers.get('If-Range', etag) == etag:
+        try:
+            byte_range = parse_range(request.headers.get('Range'), size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    header = settings.ATTACHMENT_SENDFILE_HEADER
+    if header:
+        response = HttpResponse(content_type=content_type)
+        response[header] = settings.ATTACHMENT_SENDFILE_PREFIX + path.relative_to(_media_root()).as_posix()
+    elif byte_range:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            iter_file_range(path, start, end - start + 1, settings.ATTACHMENT_CHUNK_SIZE),
+            status=206, content_type=content_type,
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = end - start + 1
+    else:
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+        response.block_size = settings.ATTACHMENT_CHUNK_SIZE
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    # 附件内容由摘要决定，同一URL的内容永远不变
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    response['X-Content-Type-Options'] = 'nosniff'
+    disposition = content_disposition_header(as_attachment, filename)
+    if disposition:
+        response['Content-Disposition'] = disposition
+    return response
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 # 定义应用命名空间，用于区分不同应用的URL名称
 app_name = 'blog'
@@ -18,6 +18,38 @@ urlpatterns = [
     # 编辑文章路由，用于编辑已有的文章
     path('post/<int:pk>/edit/', views.post_edit, name='post_edit'),
     
+    # 自动保存路由，接收文章内容的增量修改
+    path('post/<int:pk>/autosave/', views.post_autosave, name='post_autosave'),
+    
+    # 历史版本列表路由
+    path('post/<int:pk>/revisions/', views.post_revisions, name='post_revisions'),
+    
+    # 历史版本差异路由，通过查询参数 a、b 指定要比较的版本
+    path('post/<int:pk>/revisions/diff/', views.post_revision_diff, name='post_revision_diff'),
+    
+    # 标签文章列表路由
+    path('tag/<str:slug>/', views.tag_posts, name='tag_posts'),
+    
+    # 分类文章列表路由
+    path('category/<str:slug>/', views.category_posts, name='category_posts'),
+    
+    # 作者文章列表路由
+    path('author/<str:username>/', views.author_posts, name='author_posts'),
+    
+    # 按年、按月归档路由
+    path('archive/<int:year>/', views.archive_posts, name='archive_year'),
+    path('archive/<int:year>/<int:month>/', views.archive_posts, name='archive_month'),
+    
     # 删除文章路由，用于删除已有的文章
     path('post/<int:pk>/delete/', views.post_delete, name='post_delete'),
+    
+    # 附件上传和下载路由，附件按内容的SHA-256寻址
+    path('attachments/upload/', views.attachment_upload, name='attachment_upload'),
+    path('attachments/<slug:sha256>/', views.attachment_file, name='attachment_file'),
+    path('attachments/<slug:sha256>/w<int:width>/', views.attachment_file, name='attachment_thumbnail'),
+    
+    # 只读JSON接口（v1）
+    path('api/v1/posts/', api.post_list, name='api_post_list'),
+    path('api/v1/posts/<int:pk>/', api.post_detail, name='api_post_detail'),
+    path('api/v1/posts/<int:pk>/comments/', api.comment_list, name='api_comment_list'),
 ]
\ No newline at end of file
@@ -1,10 +1,63 @@
-from django.shortcuts import render, get_object_or_404, redirect
-from django.contrib.auth.decorators import login_required
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
 from django.contrib import messages
-from django.http import HttpResponseForbidden
-from .models import Post
+from django.contrib.auth.decorators import login_required
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import Max, prefetch_related_objects
+from django.http import Http404, HttpResponseForbidden, JsonResponse
+from django.shortcuts import render, get_object_or_404, redirect
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from django.views.decorators.http import condition, require_POST, require_safe
+
+from myblog.routers import replica_read
+from . import archive, hits, rendering, taxonomy, uploads
+from .diffs import apply_ops
 from .forms import PostForm
+from .models import Attachment, AuthorPostStat, Category, MonthlyPostStat, Post, PostDraft, PostTag, Tag
+from .pagination import paginate_keyset
+from .revisions import diff_revisions, record_revision
+from .tasks import schedule_post_jobs
+
+# 列表页面每页显示的文章数
+POSTS_PER_PAGE = 10
 
+def _render_post_list(request, queryset, heading, **extra):
+    """
+    按游标分页渲染文章列表页面，首页、标签页和分类页共用
+    
+    参数:
+        request (HttpRequest): HTTP请求对象，查询参数 cursor 为分页游标
+        queryset (QuerySet): 文章或文章标签关联的查询集，需要包含 created_at 和 id
+        heading (str): 页面标题
+    
+    返回:
+        HttpResponse: 渲染后的文章列表页面，游标无效时返回404错误
+    """
+    try:
+        rows, next_cursor = paginate_keyset(queryset, request.GET.get('cursor'), size=POSTS_PER_PAGE)
+    except ValueError:
+        raise Http404("分页参数无效。")
+    # 标签页面分页的是关联表的行，取出关联的文章
+    posts = [row.post if isinstance(row, PostTag) else row for row in rows]
+    # 一次查询取出本页所有文章的标签
+    prefetch_related_objects(posts, 'tags')
+    context = {
+        'posts': posts,
+        'heading': heading,
+        'next_cursor': next_cursor,
+        'popular_posts': hits.get_popular(),
+        'tag_cloud': taxonomy.get_tag_cloud(),
+        'archive_months': archive.get_archive_months(),
+    }
+    context.update(extra)
+    return render(request, 'blog/post_list.html', context)
+
+@replica_read
 def post_list(request):
     """
     显示所有已发布的文章列表视图函数
@@ -16,9 +69,43 @@ def post_list(request):
         HttpResponse: 渲染后的文章列表页面
     """
     # 只显示已发布的文章，过滤掉草稿状态的文章
-    posts = Post.objects.filter(published=True)
-    return render(request, 'blog/post_list.html', {'posts': posts})
+    posts = Post.objects.filter(published=True).select_related('author', 'category')
+    return _render_post_list(request, posts, '文章列表')
 
+@replica_read
+def tag_posts(request, slug):
+    """
+    显示带有指定标签的已发布文章列表视图函数
+    
+    参数:
+        request (HttpRequest): HTTP请求对象
+        slug (str): 标签的URL标识
+    
+    返回:
+        HttpResponse: 渲染后的文章列表页面
+    """
+    tag = get_object_or_404(Tag, slug=slug)
+    # 直接在关联表上过滤和排序，只走 (tag, published, created_at, id) 索引
+    rows = PostTag.objects.filter(tag=tag, published=True).select_related('post__author', 'post__category')
+    return _render_post_list(request, rows, f'标签: {tag.name}', tag=tag)
+
+@replica_read
+def category_posts(request, slug):
+    """
+    显示指定分类下已发布文章列表的视图函数
+    
+    参数:
+        request (HttpRequest): HTTP请求对象
+        slug (str): 分类的URL标识
+    
+    返回:
+        HttpResponse: 渲染后的文章列表页面
+    """
+    category = get_object_or_404(Category, slug=slug)
+    posts = Post.objects.filter(category=category, published=True).select_related('author', 'category')
+    return _render_post_list(request, posts, f'分类: {category.name}', category=category)
+
+@replica_read
 def post_detail(request, pk):
     """
     显示单篇文章详细内容的视图函数
@@ -36,7 +123,89 @@ def post_detail(request, pk):
     if not post.published and post.author != request.user:
         # 如果用户没有权限查看文章，返回403错误
         return HttpResponseForbidden("您没有权限查看这篇文章。")
-    return render(request, 'blog/post_detail.html', {'post': post})
+    if post.published:
+        # 阅读次数先在内存中累积，定期批量写入数据库
+        hits.record_hit(post.pk)
+    # 内容HTML在保存时已经编译，只有通过批量更新修改过内容时才会在这里补渲染
+    post.ensure_rendered()
+    return render(request, 'blog/post_detail.html', {'post': post, 'highlight_css': rendering.highlight_css()})
+
+def _archive_etag(request, *parts):
+    """
+    根据统计表、标签和分类的更新时间生成归档页面的ETag
+    文章保存和摘要重新计算都会更新统计行；标签和分类重命名会改变页面上显示的名称。
+    页面内容还取决于分页游标和当前登录用户（导航栏），一并计入
+    
+    参数:
+        request (HttpRequest): HTTP请求对象
+        parts: 决定页面内容的统计版本
+    
+    返回:
+        str: ETag值
+    """
+    months_version = MonthlyPostStat.objects.aggregate(version=Max('updated_at'))['version']
+    tags_version = Tag.objects.aggregate(version=Max('updated_at'))['version']
+    categories_version = Category.objects.aggregate(version=Max('updated_at'))['version']
+    key = '|'.join(str(part) for part in (
+        *parts, months_version, tags_version, categories_version, request.GET.get('cursor', ''), request.user.pk,
+    ))
+    return hashlib.blake2b(key.encode('utf-8'), digest_size=16).hexdigest()
+
+def _author_etag(request, username):
+    """
+    作者页面的ETag，作者的统计行在其文章保存或删除时更新
+    """
+    version = AuthorPostStat.objects.filter(author__username=username).values_list('updated_at', flat=True).first()
+    return _archive_etag(request, 'author', username, version)
+
+def _date_etag(request, year, month=None):
+    """
+    日期归档页面的ETag，任何月份的统计更新都会改变侧边栏，直接使用全部月份的版本
+    """
+    return _archive_etag(request, 'date', year, month)
+
+@replica_read
+@condition(etag_func=_author_etag)
+def author_posts(request, username):
+    """
+    显示指定作者已发布文章列表的视图函数
+    支持条件请求，内容未变化时返回304
+    
+    参数:
+        request (HttpRequest): HTTP请求对象
+        username (str): 作者的用户名
+    
+    返回:
+        HttpResponse: 渲染后的文章列表页面
+    """
+    author = get_object_or_404(User, username=username)
+    posts = Post.objects.filter(author=author, published=True).select_related('author', 'category')
+    return _render_post_list(request, posts, f'作者: {author.username}', author=author)
+
+@replica_read
+@condition(etag_func=_date_etag)
+def archive_posts(request, year, month=None):
+    """
+    显示某年或某月已发布文章列表的视图函数
+    支持条件请求，内容未变化时返回304
+    
+    参数:
+        request (HttpRequest): HTTP请求对象
+        year (int): 年份
+        month (int): 月份，为空时显示全年
+    
+    返回:
+        HttpResponse: 渲染后的文章列表页面，年月不合法时返回404错误
+    """
+    try:
+        start, end = archive.month_range(year, month) if month else archive.year_range(year)
+    except ValueError:
+        raise Http404("日期不合法。")
+    posts = Post.objects.filter(
+        published=True, created_at__gte=start, created_at__lt=end,
+    ).select_related('author', 'category')
+    heading = f'{year}年{month}月' if month else f'{year}年'
+    return _render_post_list(request, posts, f'归档: {heading}')
 
 @login_required
 def post_create(request):
@@ -57,8 +226,12 @@ def post_create(request):
             post = form.save(commit=False)
             # 设置文章作者为当前登录用户
             post.author = request.user
-            # 保存文章到数据库
-            post.save()
+            # 保存文章并在同一事务中写入发件箱事件、入队定时发布任务
+            with transaction.atomic():
+                post.save()
+                taxonomy.set_post_tags(post, form.cleaned_data['tags'])
+                record_revision(post, request.user)
+                schedule_post_jobs(post)
             # 添加成功消息提示
             messages.success(request, '文章创建成功！')
             # 重定向到新创建的文章详情页面
@@ -89,6 +262,8 @@ def post_edit(request, pk):
     if post.author != request.user:
         # 如果用户没有权限编辑文章，返回403错误
         return HttpResponseForbidden("您没有权限编辑这篇文章。")
+    # 自动保存的草稿，编辑页面的自动保存需要基于草稿的最新版本号提交增量
+    draft = PostDraft.objects.filter(post=post).first()
     
     if request.method == 'POST':
         # 处理POST请求，即提交表单数据
@@ -96,8 +271,14 @@ def post_edit(request, pk):
         if form.is_valid():
             # 表单数据验证通过，保存文章但不立即提交到数据库
             post = form.save(commit=False)
-            # 保存文章到数据库
-            post.save()
+            # 保存文章并在同一事务中写入发件箱事件、入队定时发布任务
+            with transaction.atomic():
+                post.save()
+                taxonomy.set_post_tags(post, form.cleaned_data['tags'])
+                record_revision(post, request.user)
+                schedule_post_jobs(post)
+                # 正式保存后自动保存的草稿已经失效
+                PostDraft.objects.filter(post=post).delete()
             # 添加成功消息提示
             messages.success(request, '文章更新成功！')
             # 重定向到更新后的文章详情页面
@@ -107,8 +288,140 @@ def post_edit(request, pk):
             messages.error(request, '表单验证失败，请检查输入内容。')
     else:
         # 处理GET请求，即显示包含文章当前内容的表单
-        form = PostForm(instance=post)
-    return render(request, 'blog/post_form.html', {'form': form, 'title': '编辑文章'})
+        # 如果有尚未写回文章的自动保存草稿，优先显示草稿内容
+        initial = {'content': draft.content} if draft else None
+        form = PostForm(instance=post, initial=initial)
+    return render(request, 'blog/post_form.html', {
+        'form': form,
+        'title': '编辑文章',
+        'post': post,
+        'draft_revision': draft.revision if draft else 0,
+        'draft_base': draft.content if draft else post.content,
+    })
+
+def _get_or_create_draft(post):
+    """
+    获取文章的自动保存草稿，不存在时以文章当前内容创建
+    
+    参数:
+        post (Post): 文章对象
+    
+    返回:
+        PostDraft: 草稿对象
+    """
+    draft = PostDraft.objects.filter(post=post).first()
+    if draft is not None:
+        return draft
+    try:
+        with transaction.atomic():
+            return PostDraft.objects.create(post=post, content=post.content)
+    except IntegrityError:
+        # 并发的第一次自动保存已经创建了草稿
+        return PostDraft.objects.get(post=post)
+
+@login_required
+@require_POST
+def post_autosave(request, pk):
+    """
+    文章自动保存接口，需要用户登录才能访问
+    
+    请求体为JSON：{"base_revision": 基准版本号, "base_length": 基准文本长度, "ops": [[start, end, text], ...]}，
+    增量基于草稿的 base_revision 版本计算，位置和长度都按Unicode码点计数。
+    base_length 与草稿长度不一致时说明客户端计算位置的方式不同，返回400而不是写入错位的内容。增量合并到 PostDraft 中；
+    对未发布的文章，最多每 AUTOSAVE_FLUSH_SECONDS 秒把草稿写回一次文章，
+    写回使用 update 不修改更新时间，也不会触发发件箱事件和缓存失效。
+    已发布的文章只保存草稿，点击保存后才会更新公开内容。
+    
+    参数:
+        request (HttpRequest): HTTP请求对象
+        pk (int): 文章的主键ID
+    
+    返回:
+        JsonResponse: 新的版本号和是否写回了文章；版本冲突时返回409和最新草稿
+    """
+    # 只读取权限检查所需的字段
+    post = get_object_or_404(Post.objects.only('pk', 'author_id', 'published', 'content'), pk=pk)
+    if post.author_id != request.user.pk:
+        return JsonResponse({'error': '您没有权限编辑这篇文章。'}, status=403)
+    try:
+        data = json.loads(request.body)
+        base_revision = int(data['base_revision'])
+        base_length = int(data['base_length'])
+        ops = data['ops']
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': '请求格式不正确。'}, status=400)
+    
+    draft = _get_or_create_draft(post)
+    if base_revision != draft.revision:
+        # 客户端的基准版本已过期，返回最新草稿让客户端重新同步
+        return JsonResponse({'error': 'conflict', 'revision': draft.revision, 'content': draft.content}, status=409)
+    if base_length != len(draft.content):
+        return JsonResponse({'error': '基准文本长度不一致'}, status=400)
+    try:
+        content = apply_ops(draft.content, ops)
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    
+    now = timezone.now()
+    interval = timedelta(seconds=settings.AUTOSAVE_FLUSH_SECONDS)
+    flush = not post.published and (draft.flushed_at is None or now - draft.flushed_at >= interval)
+    # 所有写操作在一个短事务中完成，只获取一次写锁，失败时整体回滚
+    with transaction.atomic():
+        # 以版本号为条件更新，防止并发的自动保存互相覆盖
+        changes = {'content': content, 'revision': base_revision + 1, 'updated_at': now}
+        if flush:
+            changes['flushed_at'] = now
+        updated = PostDraft.objects.filter(post=post, revision=base_revision).update(**changes)
+        if updated and flush:
+            # 合并写回：同一篇文章在写回间隔内最多写一次文章表
+            Post.objects.filter(pk=post.pk).update(content=content)
+    if not updated:
+        draft.refresh_from_db()
+        return JsonResponse({'error': 'conflict', 'revision': draft.revision, 'content': draft.content}, status=409)
+    return JsonResponse({'revision': base_revision + 1, 'flushed': flush})
+
+@login_required
+def post_revisions(request, pk):
+    """
+    显示文章历史版本列表的视图函数，只有文章作者可以访问
+    
+    参数:
+        request (HttpRequest): HTTP请求对象
+        pk (int): 文章的主键ID
+    
+    返回:
+        HttpResponse: 渲染后的历史版本列表页面或403错误页面
+    """
+    post = get_object_or_404(Post, pk=pk)
+    if post.author != request.user:
+        return HttpResponseForbidden("您没有权限查看这篇文章的历史版本。")
+    # 列表不需要读取版本数据本身
+    revisions = post.revisions.defer('data').select_related('author')
+    return render(request, 'blog/post_revisions.html', {'post': post, 'revisions': revisions})
+
+@login_required
+def post_revision_diff(request, pk):
+    """
+    显示文章两个历史版本之间差异的视图函数，只有文章作者可以访问
+    
+    参数:
+        request (HttpRequest): HTTP请求对象，查询参数 a、b 为要比较的版本号
+        pk (int): 文章的主键ID
+    
+    返回:
+        HttpResponse: 渲染后的版本差异页面，版本不存在时返回404错误
+    """
+    post = get_object_or_404(Post, pk=pk)
+    if post.author != request.user:
+        return HttpResponseForbidden("您没有权限查看这篇文章的历史版本。")
+    try:
+        a, b = int(request.GET['a']), int(request.GET['b'])
+    except (KeyError, ValueError):
+        raise Http404("请指定要比较的版本号。")
+    lines = diff_revisions(post.pk, a, b)
+    if lines is None:
+        raise Http404("版本不存在。")
+    return render(request, 'blog/post_revision_diff.html', {'post': post, 'a': a, 'b': b, 'lines': lines})
 
 @login_required
 def post_delete(request, pk):
@@ -139,3 +452,78 @@ def post_delete(request, pk):
     
     # 处理GET请求，显示删除确认页面
     return render(request, 'blog/post_confirm_delete.html', {'post': post})
+
+
+@csrf_exempt
+@login_required
+@require_POST
+def attachment_upload(request):
+    """
+    上传图片或附件的接口，需要用户登录才能访问
+    
+    表单字段 file 为上传的文件。文件按块写入磁盘并计算摘要，不会整个读入内存；
+    相同内容的文件只保存一份。
+    
+    参数:
+        request (HttpRequest): HTTP请求对象
+    
+    返回:
+        JsonResponse: 附件的摘要、URL、大小和类型，新建时状态码为201
+    """
+    # 上传处理器必须在读取表单之前替换，而CSRF校验会读取表单，
+    # 所以外层豁免CSRF，替换处理器后再在内层校验
+    handler = uploads.ContentAddressedUploadHandler(request)
+    request.upload_handlers = [handler]
+    return _attachment_upload(request, handler)
+
+@csrf_protect
+def _attachment_upload(request, handler):
+    """
+    完成CSRF校验后保存上传的文件
+    """
+    upload = request.FILES.get('file')
+    if handler.too_large:
+        return JsonResponse({'error': '文件过大。'}, status=413)
+    if upload is None:
+        return JsonResponse({'error': '请选择要上传的文件。'}, status=400)
+    try:
+        attachment, created = uploads.store(upload, request.user)
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=415)
+    finally:
+        upload.close()
+    return JsonResponse({
+        'sha256': attachment.sha256,
+        'url': attachment.get_absolute_url(),
+        'size': attachment.size,
+        'content_type': attachment.content_type,
+        'created': created,
+    }, status=201 if created else 200)
+
+@require_safe
+def attachment_file(request, sha256, width=None):
+    """
+    下载附件或图片缩略图的视图函数
+    
+    参数:
+        request (HttpRequest): HTTP请求对象
+        sha256 (str): 附件的SHA-256摘要
+        width (int): 缩略图宽度，为空时返回原文件
+    
+    返回:
+        HttpResponse: 文件响应，附件或缩略图不存在时返回404错误
+    """
+    attachment = get_object_or_404(Attachment, sha256=sha256)
+    if width is None:
+        path, content_type, size = uploads.blob_path(sha256), attachment.content_type, attachment.size
+    elif width in attachment.thumbnails:
+        path = uploads.thumbnail_path(sha256, width)
+        with open(path, 'rb') as f:
+            content_type = uploads.sniff_content_type(f.read(uploads.HEAD_SIZE))
+        size = path.stat().st_size
+    else:
+        raise Http404("缩略图不存在。")
+    return uploads.serve_file(
+        request, path, content_type, size, f'"{sha256}-{width or 0}"',
+        filename=attachment.original_name, as_attachment=not attachment.is_image,
+    )
@@ -0,0 +1,58 @@
+"""
+gunicorn 配置
+
+    gunicorn -c gunicorn.conf.py myblog.wsgi
+
+主进程预加载应用并完成可共享的预热（模块导入、URL解析表、模板编译），
+然后冻结垃圾回收跟踪的对象，fork 出的工作进程通过写时复制共享这部分内存；
+数据库连接和日志写入线程在每个工作进程 fork 之后再初始化。
+
+各工作进程的 Prometheus 指标写入 MYBLOG_METRICS_DIR 目录，由 /metrics 汇总（见 myblog/metrics.py）。
+"""
+
+import gc
+import multiprocessing
+import os
+import tempfile
+
+# 告诉 myblog/wsgi.py 工作进程的初始化由 post_fork 钩子负责
+os.environ['MYBLOG_PRELOAD'] = '1'
+
+# 多个工作进程共享的指标目录
+os.environ.setdefault('MYBLOG_METRICS_DIR', os.path.join(tempfile.gettempdir(), 'myblog-metrics'))
+
+bind = os.environ.get('GUNICORN_BIND', '127.0.0.1:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+preload_app = True
+
+
+def on_starting(server):
+    """
+    服务启动时清空上一次运行遗留的指标文件
+    """
+    from myblog import metrics
+    metrics.reset_directory()
+
+
+def when_ready(server):
+    """
+    应用已在主进程加载完成、即将 fork 工作进程
+    把现有对象移出垃圾回收的跟踪范围，避免工作进程中的垃圾回收写入共享页面导致复制
+    """
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    """
+    工作进程 fork 之后、开始接收请求之前，配置日志并打开数据库连接
+    """
+    from myblog import warmup
+    warmup.start_worker()
+
+
+def child_exit(server, worker):
+    """
+    工作进程退出后，把它的计数器合并到已退出进程的汇总文件
+    """
+    from myblog import metrics
+    metrics.mark_process_dead(worker.pid)
@@ -15,6 +15,8 @@ def main():
             "available on your PYTHONPATH environment variable? Did you "
             "forget to activate a virtual environment?"
         ) from exc
+    from utils.logger import setup_logger
+    setup_logger()
     execute_from_command_line(sys.argv)
 
 
@@ -5,6 +5,9 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+导入本模块时先完成预热（导入应用模块、构建URL解析表、编译模板），再开始接收请求。
+同步视图在线程池中执行，数据库连接属于执行视图的线程，这里不预先打开连接。
 """
 
 import os
@@ -14,3 +17,9 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'myblog.settings')
 
 application = get_asgi_application()
+
+from utils.logger import setup_logger  # noqa: E402  需要在 Django 初始化之后导入
+from . import warmup  # noqa: E402
+
+setup_logger()
+warmup.preload()
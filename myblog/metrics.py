@@ -0,0 +1,364 @@
+"""
+Prometheus 指标
+
+各个工作进程在内存中累加指标，由后台线程每 METRICS_FLUSH_SECONDS 秒把有变化的指标写入
+METRICS_DIR 目录下以进程号命名的JSON文件（写临时文件后原子改名）；/metrics 读取目录下全部文件，
+计数器和直方图按进程求和，仪表（正在处理的请求数）只统计仍然存活的进程。
+没有配置 METRICS_DIR 时只输出当前进程的指标，适用于 runserver 等单进程场景。
+
+工作进程退出后，gunicorn 的 child_exit 钩子调用 mark_process_dead 把它的计数器合并到 dead.json，
+计数器不会因为进程重启而变小；每次启动服务时 reset_directory 清空目录。
+"""
+
+import fcntl
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+# 请求耗时直方图的桶上限（秒）
+DURATION_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+
+# 指标名称到 (类型, 说明) 的映射
+METRICS = {
+    'myblog_http_requests_total': ('counter', '处理的HTTP请求数'),
+    'myblog_http_request_duration_seconds': ('histogram', 'HTTP请求耗时'),
+    'myblog_db_queries_total': ('counter', '执行的SQL语句数'),
+    'myblog_db_query_duration_seconds_total': ('counter', 'SQL语句的总耗时'),
+    'myblog_cache_requests_total': ('counter', '缓存读取次数，result 为 hit 或 miss'),
+    'myblog_worker_busy_seconds_total': ('counter', '工作进程处理请求的总时间，除以进程数和时间即为饱和度'),
+    'myblog_worker_requests_in_progress': ('gauge', '正在处理的请求数'),
+    'myblog_workers': ('gauge', '存活的工作进程数'),
+}
+
+# 请求方法标签的取值，其余方法记为 other，客户端不能用任意方法名让指标无限增长
+HTTP_METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+# 退出进程的计数器合并到这个文件
+DEAD_FILE = 'dead.json'
+
+_lock = threading.Lock()
+_counters = {}
+_gauges = {}
+_state = {'pid': None, 'dirty': False}
+
+
+def _key(name, labels):
+    """
+    生成指标样本的键：(名称, 排序后的标签元组)
+    """
+    return name, tuple(sorted(labels.items()))
+
+
+def _metrics_dir():
+    """
+    返回多进程指标目录，没有配置时返回None
+    """
+    directory = getattr(settings, 'METRICS_DIR', '')
+    return Path(directory) if directory else None
+
+
+def _ensure_flusher():
+    """
+    在当前进程中启动写指标文件的后台线程
+    fork 出的子进程不会继承父进程的线程，进程号变化时重新启动，并清空从父进程复制来的计数
+    """
+    pid = os.getpid()
+    if _state['pid'] == pid:
+        return
+    _state['pid'] = pid
+    _counters.clear()
+    _gauges.clear()
+    if _metrics_dir() is not None:
+        threading.Thread(target=_flush_loop, name='metrics-flush', daemon=True).start()
+
+
+def _flush_loop():
+    """
+    后台线程：定期把有变化的指标写入文件
+    """
+    pid = os.getpid()
+    while _state['pid'] == pid:
+        time.sleep(getattr(settings, 'METRICS_FLUSH_SECONDS', 1))
+        if _state['dirty']:
+            flush()
+
+
+def inc(name, value=1, **labels):
+    """
+    累加计数器
+
+    参数:
+        name (str): 指标名称
+        value (float): 增加的值
+        labels: 标签
+    """
+    with _lock:
+        _ensure_flusher()
+        key = _key(name, labels)
+        _counters[key] = _counters.get(key, 0) + value
+        _state['dirty'] = True
+
+
+def observe(name, value, **labels):
+    """
+    在直方图中记录一次观测值
+
+    参数:
+        name (str): 指标名称
+        value (float): 观测值（秒）
+        labels: 标签
+    """
+    index = bisect_left(DURATION_BUCKETS, value)
+    with _lock:
+        _ensure_flusher()
+        for le in DURATION_BUCKETS[index:] + ['+Inf']:
+            key = _key(f'{name}_bucket', {**labels, 'le': str(le)})
+            _counters[key] = _counters.get(key, 0) + 1
+        for suffix, amount in (('_sum', value), ('_count', 1)):
+            key = _key(name + suffix, labels)
+            _counters[key] = _counters.get(key, 0) + amount
+        _state['dirty'] = True
+
+
+def add_gauge(name, value, **labels):
+    """
+    增减仪表的值
+
+    参数:
+        name (str): 指标名称
+        value (float): 增加的值，可以为负数
+        labels: 标签
+    """
+    with _lock:
+        _ensure_flusher()
+        key = _key(name, labels)
+        _gauges[key] = _gauges.get(key, 0) + value
+        _state['dirty'] = True
+
+
+def _snapshot():
+    """
+    返回当前进程的指标，格式与指标文件相同
+    """
+    with _lock:
+        _ensure_flusher()
+        _state['dirty'] = False
+        return {
+            'counters': [[name, dict(labels), value] for (name, labels), value in _counters.items()],
+            'gauges': [[name, dict(labels), value] for (name, labels), value in _gauges.items()],
+        }
+
+
+def _write_json(path, data):
+    """
+    原子地写入JSON文件
+    """
+    tmp = path.with_name(f'.{path.name}.tmp')
+    tmp.write_text(json.dumps(data))
+    os.replace(tmp, path)
+
+
+def flush():
+    """
+    把当前进程的指标写入指标目录
+    """
+    directory = _metrics_dir()
+    if directory is None:
+        return
+    directory.mkdir(parents=True, exist_ok=True)
+    _write_json(directory / f'{os.getpid()}.json', _snapshot())
+
+
+def _read_json(path):
+    """
+    读取指标文件，文件已被删除时返回空指标
+    """
+    try:
+        return json.loads(path.read_text())
+    except FileNotFoundError:
+        return {'counters': [], 'gauges': []}
+
+
+def _is_alive(pid):
+    """
+    判断进程是否存活
+    """
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _locked(directory):
+    """
+    返回指标目录的排他锁文件，用于合并退出进程的计数器
+    """
+    lock = open(directory / '.lock', 'w')
+    fcntl.flock(lock, fcntl.LOCK_EX)
+    return lock
+
+
+def mark_process_dead(pid):
+    """
+    把已退出进程的计数器合并到 dead.json 并删除它的指标文件，由 gunicorn 主进程调用
+
+    参数:
+        pid (int): 已退出的进程号
+    """
+    directory = _metrics_dir()
+    if directory is None:
+        return
+    path = directory / f'{pid}.json'
+    if not path.exists():
+        return
+    with _locked(directory):
+        merged = {}
+        for data in (_read_json(directory / DEAD_FILE), _read_json(path)):
+            for name, labels, value in data['counters']:
+                key = _key(name, labels)
+                merged[key] = merged.get(key, 0) + value
+        _write_json(directory / DEAD_FILE, {
+            'counters': [[name, dict(labels), value] for (name, labels), value in merged.items()],
+            'gauges': [],
+        })
+        path.unlink()
+
+
+def reset_directory():
+    """
+    清空指标目录，在服务启动时调用，避免上一次运行遗留的进程号与新进程重复
+    """
+    directory = _metrics_dir()
+    if directory is None:
+        return
+    directory.mkdir(parents=True, exist_ok=True)
+    for path in directory.glob('*.json'):
+        path.unlink()
+
+
+def collect():
+    """
+    汇总所有进程的指标
+
+    返回:
+        dict: (名称, 标签元组) 到值的映射
+    """
+    directory = _metrics_dir()
+    if directory is None:
+        sources = [(os.getpid(), _snapshot())]
+    else:
+        flush()
+        sources = []
+        for path in directory.glob('*.json'):
+            pid = int(path.stem) if path.stem.isdigit() else None
+            sources.append((pid, _read_json(path)))
+    samples = {}
+    workers = 0
+    for pid, data in sources:
+        alive = pid is not None and _is_alive(pid)
+        workers += alive
+        series = data['counters'] + (data['gauges'] if alive else [])
+        for name, labels, value in series:
+            key = _key(name, labels)
+            samples[key] = samples.get(key, 0) + value
+    samples[_key('myblog_workers', {})] = workers
+    return samples
+
+
+def _format_value(value):
+    """
+    按 Prometheus 文本格式输出数值
+    """
+    if value == int(value):
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value):
+    """
+    转义标签值中的反斜杠、双引号和换行
+    """
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render():
+    """
+    按 Prometheus 文本格式（0.0.4）输出所有进程汇总后的指标
+
+    返回:
+        str: 指标文本
+    """
+    samples = collect()
+    lines = []
+    for metric, (kind, help_text) in METRICS.items():
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} {kind}')
+        names = (f'{metric}_bucket', f'{metric}_sum', f'{metric}_count') if kind == 'histogram' else (metric,)
+        for (name, labels), value in sorted(samples.items(), key=_sort_key):
+            if name not in names:
+                continue
+            label_text = ','.join(f'{k}="{_escape(v)}"' for k, v in labels)
+            lines.append(f'{name}{{{label_text}}} {_format_value(value)}' if labels else f'{name} {_format_value(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+def _sort_key(item):
+    """
+    样本的排序键：直方图的桶按上限从小到大排列
+    """
+    (name, labels), _ = item
+    plain = tuple((k, v) for k, v in labels if k != 'le')
+    le = dict(labels).get('le')
+    return name, plain, float(le) if le is not None else 0.0
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    数据库执行包装器：统计SQL语句数和耗时
+    由 connection_created 信号安装到每个新建的数据库连接上
+    """
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        alias = context['connection'].alias
+        inc('myblog_db_queries_total', alias=alias)
+        inc('myblog_db_query_duration_seconds_total', time.perf_counter() - started, alias=alias)
+
+
+def install_query_wrapper(sender, connection, **kwargs):
+    """
+    connection_created 信号处理函数：为新建的连接安装 record_query
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+connection_created.connect(install_query_wrapper, dispatch_uid='myblog.metrics.install_query_wrapper')
+
+
+def method_label(method):
+    """
+    返回请求方法的标签值，不在 HTTP_METHODS 中的方法返回 other
+    """
+    return method if method in HTTP_METHODS else 'other'
+
+
+def record_cache(name, hit):
+    """
+    记录一次缓存读取
+
+    参数:
+        name (str): 缓存的用途，例如 tag_cloud
+        hit (bool): 是否命中
+    """
+    inc('myblog_cache_requests_total', cache=name, result='hit' if hit else 'miss')
@@ -0,0 +1,98 @@
+import time
+
+from django.conf import settings
+from django.utils.encoding import escape_uri_path
+
+from utils.logger import logger
+from . import metrics
+from .routers import STICKY_COOKIE_NAME
+
+# 访问日志的消息前缀，blog.logstats 按这个前缀从日志文件中识别请求记录
+ACCESS_LOG_PREFIX = 'access'
+
+# 不写访问日志的路由，负载均衡器和监控系统每隔几秒就会请求一次
+QUIET_ROUTES = {'healthz', 'readyz', 'metrics'}
+
+
+class PrimaryPinningMiddleware:
+    """
+    写后读粘滞主库中间件
+
+    用户提交写请求（POST等）后，在响应中设置一个短期Cookie，
+    在 REPLICA_STICKY_SECONDS 秒内该用户的只读视图仍然读主库，
+    从而在副本复制完成之前也能看到自己刚刚的修改。
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        # 只有写请求才需要开启粘滞窗口
+        if request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            response.set_cookie(
+                STICKY_COOKIE_NAME,
+                '1',
+                max_age=getattr(settings, 'REPLICA_STICKY_SECONDS', 10),
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+
+class RequestLogMiddleware:
+    """
+    访问日志中间件
+
+    每个请求结束后写一条INFO日志：access 方法 状态码 耗时ms 路由名称 路径。
+    路径按URL编码输出，解码后的换行等字符不能在日志中伪造出另一条访问记录。
+    路由名称取URL配置中的名称（如 blog:post_detail），未匹配的请求记为 -，
+    ingest_logs 命令按路由名称汇总请求数、错误率和延迟分布，避免按原始路径统计时行数无限增长。
+    应紧跟在 MetricsMiddleware 之后，与请求指标测量相同的范围，耗时包含其余中间件。
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        response = self.get_response(request)
+        elapsed = 1000 * (time.perf_counter() - started)
+        match = request.resolver_match
+        route = (match.view_name if match else '') or '-'
+        if route in QUIET_ROUTES:
+            return response
+        logger.info(
+            f'{ACCESS_LOG_PREFIX} {request.method} {response.status_code} {elapsed:.1f}ms {route} {escape_uri_path(request.path)}'
+        )
+        return response
+
+
+class MetricsMiddleware:
+    """
+    请求指标中间件
+
+    统计每个路由的请求数和耗时直方图、正在处理的请求数和工作进程忙碌时间，由 /metrics 输出。
+    路由标签使用URL名称，未匹配的请求记为 -。应放在中间件列表的最前面（RequestLogMiddleware 紧随其后）。
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics.add_gauge('myblog_worker_requests_in_progress', 1)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            elapsed = time.perf_counter() - started
+            metrics.add_gauge('myblog_worker_requests_in_progress', -1)
+            metrics.inc('myblog_worker_busy_seconds_total', elapsed)
+        match = request.resolver_match
+        route = (match.view_name if match else '') or '-'
+        metrics.inc(
+            'myblog_http_requests_total',
+            method=metrics.method_label(request.method), route=route, status=response.status_code,
+        )
+        metrics.observe('myblog_http_request_duration_seconds', elapsed, route=route)
+        return response
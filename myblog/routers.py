@@ -0,0 +1,194 @@
+"""
+数据库读写分离路由
+
+写操作始终走主库（default）。只有被 ``replica_read`` 装饰的只读视图在请求期间
+会把读查询分发到只读副本；其余代码（写请求、管理命令、后台任务）默认读主库，
+避免读到复制延迟造成的旧数据。
+
+副本只在 DATABASE_REPLICAS 中配置后启用。副本文件不存在或还没有表结构（没有运行过 sync_replica）时
+读查询回退到主库，检查结果在进程内缓存 REPLICA_CHECK_SECONDS 秒。
+"""
+
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.recorder import MigrationRecorder
+
+# 当前上下文中读查询使用的数据库别名，None表示使用主库
+_read_alias = ContextVar('read_alias', default=None)
+
+# 粘滞主库的Cookie名称，写请求之后的一段时间内该用户的读请求都走主库
+STICKY_COOKIE_NAME = 'myblog_pin_primary'
+
+# 副本可用性检查结果的缓存秒数
+REPLICA_CHECK_SECONDS = 30
+
+# 副本别名到 (是否可用, 检查时间) 的映射
+_replica_status = {}
+_replica_lock = threading.Lock()
+
+
+def get_replica_aliases():
+    """
+    获取配置中可用的只读副本别名列表
+
+    与主库指向同一个数据库的副本（例如测试时的镜像）会被跳过，
+    直接使用主库连接，避免在同一数据库上打开第二个连接。
+
+    返回:
+        list: 只读副本的数据库别名列表
+    """
+    primary_name = connections[DEFAULT_DB_ALIAS].settings_dict['NAME']
+    return [
+        alias for alias in getattr(settings, 'DATABASE_REPLICAS', [])
+        if alias in settings.DATABASES and connections[alias].settings_dict['NAME'] != primary_name
+    ]
+
+
+def _check_replica(alias):
+    """
+    检查副本是否可以读取：SQLite副本文件必须已经存在（连接不存在的文件会创建空库），
+    并且已经复制了表结构
+    """
+    connection = connections[alias]
+    if connection.vendor == 'sqlite':
+        name = str(connection.settings_dict['NAME'])
+        if not connection.is_in_memory_db() and not os.path.exists(name):
+            return False
+    try:
+        return MigrationRecorder(connection).has_table()
+    except Exception:
+        return False
+
+
+def is_replica_ready(alias):
+    """
+    判断副本是否可用，结果缓存 REPLICA_CHECK_SECONDS 秒
+
+    参数:
+        alias (str): 副本的数据库别名
+
+    返回:
+        bool: 副本存在并且有表结构时返回True
+    """
+    with _replica_lock:
+        now = time.monotonic()
+        status = _replica_status.get(alias)
+        if status is None or now - status[1] >= REPLICA_CHECK_SECONDS:
+            status = _replica_status[alias] = (_check_replica(alias), now)
+        return status[0]
+
+
+def get_available_replicas():
+    """
+    获取已配置并且可以读取的副本别名列表
+
+    返回:
+        list: 可用副本的数据库别名列表，为空时读查询走主库
+    """
+    return [alias for alias in get_replica_aliases() if is_replica_ready(alias)]
+
+
+def is_pinned_to_primary(request):
+    """
+    判断当前请求是否需要固定读主库
+
+    非安全方法（POST等）的请求以及处于写后粘滞窗口内的请求都需要读主库。
+
+    参数:
+        request (HttpRequest): HTTP请求对象
+
+    返回:
+        bool: 需要读主库时返回True
+    """
+    if request.method not in ('GET', 'HEAD', 'OPTIONS'):
+        return True
+    return STICKY_COOKIE_NAME in request.COOKIES
+
+
+@contextmanager
+def use_replica():
+    """
+    上下文管理器：在代码块内把读查询分发到随机选择的只读副本
+    没有可用的副本时保持读主库
+    """
+    replicas = get_available_replicas()
+    token = _read_alias.set(random.choice(replicas) if replicas else None)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+@contextmanager
+def use_primary():
+    """
+    上下文管理器：在代码块内强制所有读查询走主库
+    """
+    token = _read_alias.set(None)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+def replica_read(view_func):
+    """
+    视图装饰器：把只读视图的读查询分发到只读副本
+
+    处于写后粘滞窗口内的请求仍然读主库，保证作者能看到自己刚保存的修改。
+
+    参数:
+        view_func (callable): 被装饰的视图函数
+
+    返回:
+        callable: 包装后的视图函数
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if is_pinned_to_primary(request):
+            return view_func(request, *args, **kwargs)
+        with use_replica():
+            return view_func(request, *args, **kwargs)
+    return wrapper
+
+
+class PrimaryReplicaRouter:
+    """
+    主从数据库路由器
+
+    - 读：使用当前上下文选定的副本，否则使用主库
+    - 写：始终使用主库
+    - 迁移：只在主库执行，副本通过复制得到表结构
+    """
+
+    def db_for_read(self, model, **hints):
+        """
+        返回读操作使用的数据库别名
+        """
+        return _read_alias.get() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        """
+        返回写操作使用的数据库别名，始终为主库
+        """
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """
+        主库和副本保存的是同一份数据，允许跨别名建立关联
+        """
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        """
+        只允许在主库执行迁移
+        """
+        return db == DEFAULT_DB_ALIAS
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # 构建项目内的文件路径，BASE_DIR指向项目根目录
@@ -46,7 +47,10 @@ INSTALLED_APPS = [
 ]
 
 # 中间件 - 处理请求和响应的钩子函数
+# 指标和访问日志中间件放在最前面且彼此相邻，两者记录的耗时都包含其余全部中间件
 MIDDLEWARE = [
+    'myblog.middleware.MetricsMiddleware',                    # 请求指标中间件（最外层）
+    'myblog.middleware.RequestLogMiddleware',                 # 访问日志中间件（紧随指标中间件）
     'django.middleware.security.SecurityMiddleware',           # 安全中间件
     'django.contrib.sessions.middleware.SessionMiddleware',   # 会话中间件
     'django.middleware.common.CommonMiddleware',              # 通用中间件
@@ -54,6 +58,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware', # 认证中间件
     'django.contrib.messages.middleware.MessageMiddleware',   # 消息中间件
     'django.middleware.clickjacking.XFrameOptionsMiddleware', # 点击劫持保护
+    'myblog.middleware.PrimaryPinningMiddleware',            # 写后读粘滞主库中间件
 ]
 
 # 根URL配置，指向项目的主URL配置文件
@@ -85,9 +90,55 @@ WSGI_APPLICATION = 'myblog.wsgi.application'
 # 参考 https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
 DATABASES = {
+    # 主库：所有写操作以及写后读请求都走主库
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',  # 使用SQLite数据库引擎
-        'NAME': BASE_DIR / 'db.sqlite3',         # 数据库文件路径
+        'NAME': os.environ.get('MYBLOG_DB_NAME', BASE_DIR / 'db.sqlite3'),  # 数据库文件路径
+        'CONN_MAX_AGE': int(os.environ.get('MYBLOG_CONN_MAX_AGE', 60)),  # 连接保持秒数，预热打开的连接可以被请求复用
+        'CONN_HEALTH_CHECKS': True,             # 复用连接前检查连接是否可用
+        'OPTIONS': {
+            'timeout': 20,                      # 并发写入时等待写锁的秒数
+            'transaction_mode': 'IMMEDIATE',    # 事务开始即获取写锁，避免锁升级失败
+        },
+        'TEST': {
+            # 测试使用内存数据库，不读写开发数据库文件；并行测试时每个进程复制一份
+            'NAME': ':memory:',
+        },
+    },
+    # 只读副本：本地开发时是另一个SQLite文件，由 sync_replica 命令从主库复制，在 DATABASE_REPLICAS 中启用后才会读取
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('MYBLOG_REPLICA_DB_NAME', BASE_DIR / 'db_replica.sqlite3'),
+        'CONN_MAX_AGE': int(os.environ.get('MYBLOG_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
+        'TEST': {
+            # 测试时副本直接镜像主库，避免复制延迟影响测试结果
+            'MIRROR': 'default',
+        },
+    },
+}
+
+# 测试运行器：快速密码哈希、默认并行运行并报告总耗时
+TEST_RUNNER = 'myblog.test_runner.TimedTestRunner'
+
+# 数据库路由，负责把只读视图的查询分发到副本
+DATABASE_ROUTERS = ['myblog.routers.PrimaryReplicaRouter']
+
+# 启用的只读副本别名列表，为空时所有查询都走主库
+# 默认不启用；运行 sync_replica 复制主库后设置 MYBLOG_DB_REPLICAS=replica 启用（多个别名用逗号分隔）
+DATABASE_REPLICAS = [alias for alias in os.environ.get('MYBLOG_DB_REPLICAS', '').split(',') if alias]
+
+# 写请求之后的粘滞主库窗口（秒），保证作者能立即看到自己的修改
+REPLICA_STICKY_SECONDS = 10
+
+
+# 缓存配置
+# 默认使用进程内缓存；多进程部署时通过环境变量切换为Redis等共享缓存，
+# 这样后台工作进程做的缓存失效对所有Web进程立即生效
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('MYBLOG_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('MYBLOG_CACHE_LOCATION', 'myblog'),
     }
 }
 
@@ -128,7 +179,57 @@ USE_TZ = True            # 启用时区支持
 
 STATIC_URL = 'static/'   # 静态文件URL前缀
 
+# 上传文件设置
+MEDIA_ROOT = Path(os.environ.get('MYBLOG_MEDIA_ROOT', BASE_DIR / 'media'))  # 上传文件保存目录
+MEDIA_URL = 'media/'     # 上传文件URL前缀
+
 # 默认主键字段类型
 # 参考 https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'  # 使用BigAutoField作为默认主键类型
+
+
+# 自动保存设置
+# 自动保存的草稿内容最多每隔多少秒写回一次文章（仅限未发布的文章）
+AUTOSAVE_FLUSH_SECONDS = 30
+
+# 历史版本设置
+# 每隔多少个版本保存一次完整快照，决定重建任意版本时最多应用的增量个数
+REVISION_SNAPSHOT_INTERVAL = 20
+
+# 阅读计数设置
+# 阅读次数在进程内存中累积，满足任一条件时批量写入数据库
+VIEW_COUNT_FLUSH_SECONDS = 10     # 距上次写入的最长秒数
+VIEW_COUNT_FLUSH_THRESHOLD = 500  # 累积的阅读次数上限
+
+# 热门文章设置
+POPULAR_POSTS_COUNT = 5           # 侧边栏显示的热门文章数
+POPULAR_POSTS_GRAVITY = 1.5       # 时间衰减指数，越大旧文章排名下降越快
+POPULAR_POSTS_TIMEOUT = 300       # 排行缓存的有效秒数
+
+# 标签云设置
+# 标签计数变化时只能清除当前进程的缓存（默认的 LocMemCache 是进程内缓存），
+# 其他工作进程最多在这么多秒后读到新的标签云
+TAG_CLOUD_TIMEOUT = 60
+
+# 附件上传设置
+ATTACHMENT_MAX_SIZE = 20 * 1024 * 1024          # 单个附件的最大字节数
+ATTACHMENT_CHUNK_SIZE = 64 * 1024               # 上传写盘和分段下载的块大小，决定每个请求占用的内存
+ATTACHMENT_THUMBNAIL_WIDTHS = [320, 640, 1280]  # 响应式缩略图的宽度（像素）
+# 由前端服务器发送文件时使用的响应头，例如 nginx 的 X-Accel-Redirect 或 Apache 的 X-Sendfile；
+# 为空时由应用通过 wsgi.file_wrapper（支持时使用 sendfile）发送
+ATTACHMENT_SENDFILE_HEADER = os.environ.get('MYBLOG_SENDFILE_HEADER', '')
+ATTACHMENT_SENDFILE_PREFIX = os.environ.get('MYBLOG_SENDFILE_PREFIX', '/protected-media/')
+
+# Markdown 渲染设置
+# 渲染器类的导入路径，可选 blog.rendering.BuiltinMarkdownRenderer（内置）
+# 或 blog.rendering.PythonMarkdownRenderer（需要安装 markdown 和 nh3）
+MARKDOWN_RENDERER = os.environ.get('MYBLOG_MARKDOWN_RENDERER', 'blog.rendering.BuiltinMarkdownRenderer')
+
+# 健康检查和监控指标设置
+READINESS_CACHE_SECONDS = 5       # /readyz 检查结果的缓存秒数
+# 多进程指标目录，各工作进程把指标写入该目录，/metrics 汇总全部进程；为空时只输出当前进程的指标
+METRICS_DIR = os.environ.get('MYBLOG_METRICS_DIR', '')
+METRICS_FLUSH_SECONDS = 1         # 工作进程写指标文件的间隔秒数
+# 访问 /metrics 需要的令牌（Authorization: Bearer <令牌>），为空时不校验
+METRICS_TOKEN = os.environ.get('MYBLOG_METRICS_TOKEN', '')
@@ -0,0 +1,77 @@
+"""
+项目的测试运行器
+
+在 Django 默认运行器的基础上：
+- 使用快速的 MD5 密码哈希，创建测试用户不再执行完整的 PBKDF2 迭代；
+- 测试数据库使用 SQLite 内存数据库（settings.py 中的 TEST NAME 配置），不读写开发数据库；
+- 测试客户端发出的请求不写访问日志，避免输出和日志文件被测试请求淹没；
+- 默认按CPU核数并行运行（--parallel auto），可以用 --parallel 1 关闭；
+- 结束时报告总耗时，设置了 MYBLOG_TEST_TIMINGS 环境变量时把结果追加到该文件，便于跟踪变化。
+"""
+
+import json
+import os
+import time
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.utils import timezone
+
+from utils.logger import logger
+
+# 测试时使用的密码哈希，只用于测试，不能用于生产环境
+FAST_PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+class TimedTestRunner(DiscoverRunner):
+    """
+    使用快速密码哈希、默认并行运行并报告总耗时的测试运行器
+    """
+
+    @classmethod
+    def add_arguments(cls, parser):
+        super().add_arguments(parser)
+        # 默认使用全部CPU核并行运行
+        parser.set_defaults(parallel='auto')
+
+    def setup_test_environment(self, **kwargs):
+        """
+        设置测试环境，替换为快速的密码哈希并关闭访问日志
+        并行运行时工作进程由主进程派生，会继承这里的设置
+        """
+        super().setup_test_environment(**kwargs)
+        self._saved_hashers = settings.PASSWORD_HASHERS
+        settings.PASSWORD_HASHERS = FAST_PASSWORD_HASHERS
+        logger.disable('myblog.middleware')
+
+    def teardown_test_environment(self, **kwargs):
+        """
+        恢复原来的密码哈希设置和访问日志
+        """
+        settings.PASSWORD_HASHERS = self._saved_hashers
+        logger.enable('myblog.middleware')
+        super().teardown_test_environment(**kwargs)
+
+    def run_tests(self, test_labels, **kwargs):
+        """
+        运行测试并报告总耗时
+
+        返回:
+            int: 失败和出错的测试数
+        """
+        started = time.perf_counter()
+        failures = super().run_tests(test_labels, **kwargs)
+        elapsed = time.perf_counter() - started
+        self.log(f'测试总耗时: {elapsed:.2f}s（并行进程数: {self.parallel}）')
+        path = os.environ.get('MYBLOG_TEST_TIMINGS')
+        if path:
+            record = {
+                'finished_at': timezone.now().isoformat(),
+                'seconds': round(elapsed, 3),
+                'parallel': self.parallel,
+                'labels': list(test_labels or []),
+                'failures': failures,
+            }
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        return failures
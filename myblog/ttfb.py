@@ -0,0 +1,59 @@
+"""
+首字节时间探针
+
+在一个全新的进程中导入 myblog.wsgi，然后直接调用 WSGI 应用处理两次请求，
+输出从进程开始到应用就绪、第一次请求的首字节时间和第二次请求的首字节时间（毫秒）。
+由 measure_ttfb 管理命令启动：python -m myblog.ttfb /
+"""
+
+import io
+import json
+import sys
+import time
+
+STARTED = time.perf_counter()
+
+
+def request(application, path):
+    """
+    调用 WSGI 应用处理一次 GET 请求
+
+    返回:
+        tuple: (状态码, 首字节耗时毫秒)
+    """
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': '',
+        'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'HTTP_HOST': 'localhost',
+        'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr, 'wsgi.url_scheme': 'http',
+        'wsgi.version': (1, 0), 'wsgi.multithread': False, 'wsgi.multiprocess': True, 'wsgi.run_once': False,
+    }
+    statuses = []
+    started = time.perf_counter()
+    body = application(environ, lambda status, headers, exc_info=None: statuses.append(status))
+    chunks = iter(body)
+    next(chunks, b'')
+    elapsed = 1000 * (time.perf_counter() - started)
+    for _ in chunks:
+        pass
+    if hasattr(body, 'close'):
+        body.close()
+    return int(statuses[0].split()[0]), elapsed
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else '/'
+    from myblog.wsgi import application
+    ready = 1000 * (time.perf_counter() - STARTED)
+    status, first = request(application, path)
+    _, second = request(application, path)
+    print(json.dumps({
+        'status': status,
+        'ready_ms': round(ready, 1),
+        'first_ms': round(first, 1),
+        'second_ms': round(second, 1),
+        'ttfb_ms': round(ready + first, 1),
+    }))
+
+
+if __name__ == '__main__':
+    main()
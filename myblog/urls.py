@@ -17,8 +17,15 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from . import views
+
 # URL模式列表，将URL路由映射到相应的视图函数
 urlpatterns = [
+    # 运维接口：存活检查、就绪检查和 Prometheus 指标
+    path('healthz', views.healthz, name='healthz'),
+    path('readyz', views.readyz, name='readyz'),
+    path('metrics', views.metrics_view, name='metrics'),
+    
     # Django管理后台路由
     path('admin/', admin.site.urls),
     
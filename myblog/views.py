@@ -0,0 +1,107 @@
+"""
+运维接口：存活检查、就绪检查和 Prometheus 指标
+
+这些视图不属于博客应用，也不经过博客的模板和查询，负载均衡器和监控系统可以高频请求。
+"""
+
+import hmac
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_GET
+
+from utils.logger import logger
+from . import metrics
+
+# 就绪检查结果的进程内缓存：(检查时间, 是否就绪, 详情)
+_readiness = {'checked_at': None, 'ready': False, 'checks': {}}
+_readiness_lock = threading.Lock()
+
+
+@never_cache
+@require_GET
+def healthz(request):
+    """
+    存活检查：进程能够处理请求即返回200，不访问数据库
+
+    参数:
+        request (HttpRequest): HTTP请求对象
+
+    返回:
+        HttpResponse: 纯文本 ok
+    """
+    return HttpResponse('ok', content_type='text/plain')
+
+
+def check_readiness():
+    """
+    检查默认数据库能否连接、迁移是否全部执行
+    结果在进程内缓存 READINESS_CACHE_SECONDS 秒，避免高频探测给数据库带来压力
+
+    返回:
+        tuple: (是否就绪, 各项检查结果)
+    """
+    with _readiness_lock:
+        now = time.monotonic()
+        checked_at = _readiness['checked_at']
+        if checked_at is not None and now - checked_at < settings.READINESS_CACHE_SECONDS:
+            return _readiness['ready'], _readiness['checks']
+        checks = {}
+        try:
+            connection = connections[DEFAULT_DB_ALIAS]
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            checks['database'] = 'ok'
+            executor = MigrationExecutor(connection)
+            plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+            checks['migrations'] = 'ok' if not plan else f'{len(plan)} 个迁移未执行'
+        except Exception as exc:
+            # 错误详情只写日志，公开的响应中不包含数据库的错误信息
+            logger.warning(f'就绪检查失败: {exc!r}')
+            checks.setdefault('database', 'error')
+            checks.setdefault('migrations', 'error')
+        ready = checks.get('database') == 'ok' and checks.get('migrations') == 'ok'
+        _readiness.update(checked_at=now, ready=ready, checks=checks)
+        return ready, checks
+
+
+@never_cache
+@require_GET
+def readyz(request):
+    """
+    就绪检查：数据库可以连接且迁移已全部执行时返回200，否则返回503
+
+    参数:
+        request (HttpRequest): HTTP请求对象
+
+    返回:
+        JsonResponse: 各项检查结果
+    """
+    ready, checks = check_readiness()
+    return JsonResponse({'ready': ready, **checks}, status=200 if ready else 503)
+
+
+@never_cache
+@require_GET
+def metrics_view(request):
+    """
+    以 Prometheus 文本格式输出所有工作进程汇总后的指标
+    配置了 METRICS_TOKEN 时要求 Authorization: Bearer <令牌>
+
+    参数:
+        request (HttpRequest): HTTP请求对象
+
+    返回:
+        HttpResponse: 指标文本，令牌不正确时返回401
+    """
+    token = settings.METRICS_TOKEN
+    if token:
+        supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+        if not hmac.compare_digest(supplied.encode(), token.encode()):
+            return HttpResponse(status=401)
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
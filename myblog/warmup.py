@@ -0,0 +1,142 @@
+"""
+工作进程预热
+
+第一次请求需要导入全部视图模块、构建URL解析表、编译模板并建立数据库连接，
+预热把这些工作提前到进程开始接收请求之前完成：
+
+- preload()：导入应用模块、构建URL解析表、编译 templates/ 下的全部模板。
+  这些结果是只读的，使用 gunicorn --preload 时在主进程完成，fork 出的工作进程通过写时复制共享内存；
+- start_worker()：配置日志、打开数据库连接并调用项目应用配置类的 start_worker() 方法
+  （如启动后台线程）。连接和线程不能跨 fork 共享，必须在每个工作进程中执行。
+
+设置环境变量 MYBLOG_WARMUP=0 可以关闭预热，用于对比首字节时间。
+"""
+
+import importlib
+import os
+import time
+from importlib.util import find_spec
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.template import engines
+from django.urls import get_resolver
+
+from myblog.routers import get_available_replicas
+from utils.logger import logger, setup_logger
+
+# 预热时尝试导入的应用子模块，第一次请求通常会用到这些模块
+APP_MODULES = ['models', 'views', 'forms', 'api', 'admin', 'urls', 'signals', 'tasks']
+
+
+def is_enabled():
+    """
+    判断是否启用预热
+    """
+    return os.environ.get('MYBLOG_WARMUP', '1') != '0'
+
+
+def import_app_modules():
+    """
+    导入项目应用（不含 django.contrib 等第三方应用）的常用子模块
+
+    返回:
+        int: 导入的模块数
+    """
+    count = 0
+    for app_config in apps.get_app_configs():
+        if not Path(app_config.path).is_relative_to(settings.BASE_DIR):
+            continue
+        for name in APP_MODULES:
+            module = f'{app_config.name}.{name}'
+            if find_spec(module) is not None:
+                importlib.import_module(module)
+                count += 1
+    return count
+
+
+def build_url_resolver():
+    """
+    构建URL解析表和反向解析表，同时导入所有URL配置引用的视图
+
+    返回:
+        int: 可以反向解析的URL名称数
+    """
+    resolver = get_resolver()
+    return len(resolver.reverse_dict) + sum(len(ns[1].reverse_dict) for ns in resolver.namespace_dict.values())
+
+
+def compile_templates():
+    """
+    编译所有模板目录下的模板，编译结果保存在模板引擎的缓存加载器中
+
+    返回:
+        int: 编译的模板数
+    """
+    count = 0
+    for engine in engines.all():
+        dirs = [Path(d) for d in engine.dirs]
+        if engine.app_dirs:
+            dirs += [
+                Path(app_config.path) / 'templates' for app_config in apps.get_app_configs()
+                if Path(app_config.path).is_relative_to(settings.BASE_DIR)
+            ]
+        for directory in dirs:
+            for path in sorted(directory.rglob('*.html')):
+                engine.get_template(path.relative_to(directory).as_posix())
+                count += 1
+    return count
+
+
+def open_connections():
+    """
+    打开主库和可用副本的数据库连接，未启用或还没有复制的副本不会被连接（避免创建空的副本文件）
+    需要配合 CONN_MAX_AGE 使用，否则连接会在第一次请求开始时被关闭
+
+    返回:
+        int: 打开的连接数
+    """
+    aliases = [DEFAULT_DB_ALIAS, *get_available_replicas()]
+    for alias in aliases:
+        connections[alias].ensure_connection()
+    return len(aliases)
+
+
+def preload():
+    """
+    预热可以在 fork 之前完成、由各工作进程共享的部分
+
+    返回:
+        dict: 各步骤的耗时（毫秒）和数量
+    """
+    report = {}
+    if not is_enabled():
+        return report
+    for name, step in (('modules', import_app_modules), ('urls', build_url_resolver), ('templates', compile_templates)):
+        started = time.perf_counter()
+        count = step()
+        report[name] = {'count': count, 'ms': round(1000 * (time.perf_counter() - started), 1)}
+    return report
+
+
+def start_worker():
+    """
+    在工作进程中执行的初始化：配置日志、打开数据库连接，
+    再调用项目应用配置类的 start_worker() 方法（不受 MYBLOG_WARMUP 影响）
+
+    返回:
+        dict: 打开连接的耗时（毫秒）和数量
+    """
+    setup_logger()
+    for app_config in apps.get_app_configs():
+        if Path(app_config.path).is_relative_to(settings.BASE_DIR) and hasattr(app_config, 'start_worker'):
+            app_config.start_worker()
+    report = {}
+    if is_enabled():
+        started = time.perf_counter()
+        count = open_connections()
+        report['connections'] = {'count': count, 'ms': round(1000 * (time.perf_counter() - started), 1)}
+        logger.info(f'工作进程 {os.getpid()} 预热完成: {report}')
+    return report
@@ -5,6 +5,11 @@ It exposes the WSGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/wsgi/
+
+导入本模块时先完成预热（导入应用模块、构建URL解析表、编译模板），再开始接收请求。
+使用 gunicorn.conf.py 预加载应用时，主进程只做可共享的预热，
+数据库连接和日志在 fork 出的工作进程中初始化（见 post_fork 钩子）；
+否则在这里直接完成工作进程的初始化。
 """
 
 import os
@@ -14,3 +19,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'myblog.settings')
 
 application = get_wsgi_application()
+
+from . import warmup  # noqa: E402  需要在 Django 初始化之后导入
+
+warmup.preload()
+if os.environ.get('MYBLOG_PRELOAD') != '1':
+    warmup.start_worker()
@@ -2,29 +2,50 @@ import os
 import sys
 from loguru import logger
 
-# 移除默认配置（避免重复输出）
-logger.remove()
+# 日志输出是否已经配置
+_configured = False
 
-# 控制台输出配置（带高亮）
-logger.add(
-    sink=sys.stdout,
-    format="<g>{time:YYYY-MM-DD HH:mm:ss}</g> | <level>{level:^8}</level> | <cyan>{module}:{line}</cyan> - <level>{message}</level>",
-    colorize=True,
-    level="DEBUG",
-    enqueue=True  # 关键：确保异步安全
-)
 
-# 文件输出配置（按天轮转）
-log_dir = "./logs"
-os.makedirs(log_dir, exist_ok=True)  # 自动创建日志目录
-
-logger.add(
-    sink=os.path.join(log_dir, "OLS_AGENT_{time:YYYY-MM-DD}.log"),  # 按天命名文件
-    rotation="00:00",           # 每日零点轮转
-    retention="7 days",         # 保留7天日志
-    format="{time:YYYY-MM-DD HH:mm:ss} | {level:^8} | {module}:{line} - {message}",
-    level="INFO",
-    enqueue=True,               # 异步安全写入
-    backtrace=True,             # 记录异常堆栈
-    diagnose=False              # 生产环境关闭敏感信息
-)
\ No newline at end of file
+def setup_logger():
+    """
+    配置日志输出：控制台（带高亮）和按天轮转的文件
+    
+    导入本模块时不再创建日志文件和后台写入线程，由进程入口（manage.py、wsgi.py、asgi.py）
+    在开始工作前调用。enqueue 的写入线程不能跨 fork 继承，预加载应用时应在 fork 出的
+    工作进程中调用。多次调用只配置一次。
+    
+    返回:
+        Logger: 配置好的 loguru logger
+    """
+    global _configured
+    if _configured:
+        return logger
+    
+    # 移除默认配置（避免重复输出）
+    logger.remove()
+    
+    # 控制台输出配置（带高亮）
+    logger.add(
+        sink=sys.stdout,
+        format="<g>{time:YYYY-MM-DD HH:mm:ss}</g> | <level>{level:^8}</level> | <cyan>{module}:{line}</cyan> - <level>{message}</level>",
+        colorize=True,
+        level="DEBUG",
+        enqueue=True  # 关键：确保异步安全
+    )
+    
+    # 文件输出配置（按天轮转）
+    log_dir = "./logs"
+    os.makedirs(log_dir, exist_ok=True)  # 自动创建日志目录
+    
+    logger.add(
+        sink=os.path.join(log_dir, "OLS_AGENT_{time:YYYY-MM-DD}.log"),  # 按天命名文件
+        rotation="00:00",           # 每日零点轮转
+        retention="7 days",         # 保留7天日志
+        format="{time:YYYY-MM-DD HH:mm:ss} | {level:^8} | {module}:{line} - {message}",
+        level="INFO",
+        enqueue=True,               # 异步安全写入
+        backtrace=True,             # 记录异常堆栈
+        diagnose=False              # 生产环境关闭敏感信息
+    )
+    _configured = True
+    return logger